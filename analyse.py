@@ -1,14 +1,94 @@
 # analyse.py
-from typing import List, Dict, Any, Tuple, Optional
-from itertools import combinations
+from typing import List, Dict, Any, Iterable, Mapping, Tuple, Optional
 from collections import defaultdict, Counter
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from matplotlib.lines import Line2D
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as pe
 import streamlit as st
 import seaborn as sns
 import numpy as np
+from database import CourseAnalysee, lire_numeros, lire_positions, NOMBRE_POSITIONS
+from course_frame import (CourseFrame, Cooccurrences, cooccurrences, frequences_positions, matrice_positions,
+                          combinaisons_positions, coder_combinaisons, decoder_combinaisons, indices_denses)
+from ecarts import Ecarts, ecarts_occurrences, ecarts_presence, par_cle
+
+# Champs des dictionnaires d'écarts par clé : {nom: attribut de ecarts.Ecarts}
+COLONNES_ECARTS = {'derniere_occurrence': 'derniere', 'ecart_actuel': 'ecart_actuel', 'ecart_max': 'ecart_max'}
+
+def _numeros(course: Mapping[str, Any], champ: str) -> Tuple[int, ...]:
+    """
+    Numéros de l'arrivée ('arrivee') ou de la synthèse ('synthese') d'une course : déjà lus dans une
+    CourseAnalysee (Database.get_courses(analysees=True), preparer_courses), sinon découpés dans la chaîne.
+    """
+    if isinstance(course, CourseAnalysee):
+        return course.numeros(champ)
+    return lire_numeros(course.get(champ, ''))
+
+def _positions(course: Mapping[str, Any], champ: str) -> Tuple[int, ...]:
+    """Numéros de l'arrivée ou de la synthèse par position, 0 pour un élément non numérique ("14 - NP - 3")."""
+    if isinstance(course, CourseAnalysee):
+        return course.positions(champ)
+    return lire_positions(course.get(champ, ''))
+
+def _premiers(course: Mapping[str, Any], champ: str, nombre: int) -> Tuple[int, ...]:
+    """Numéros des nombre premières positions : les éléments non numériques comptent comme une position."""
+    return tuple(numero for numero in _positions(course, champ)[:nombre] if numero)
+
+def _matrice(courses, champ: str) -> np.ndarray:
+    """
+    Matrice des positions de l'arrivée ou de la synthèse : colonne d'un CourseFrame, ou numéros lus course par course,
+    à leur position (0 pour un élément non numérique, comme dans un CourseFrame).
+    """
+    if isinstance(courses, CourseFrame):
+        return getattr(courses, champ)
+    return matrice_positions([_positions(course, champ) for course in courses])
+
+def _cooccurrences(courses, champ: str) -> Cooccurrences:
+    """Couples et triples de l'arrivée ou de la synthèse."""
+    return cooccurrences(_matrice(courses, champ))
+
+def _verifier_ordre(courses):
+    """Parcourt un flux annoncé chronologique en vérifiant au passage qu'aucune date ne recule."""
+    precedente = None
+    for course in courses:
+        date_course = course['date_course']
+        if precedente is not None and date_course < precedente:
+            raise ValueError(f"Courses non triées : {date_course} après {precedente} (triees=True)")
+        precedente = date_course
+        yield course
+
+def _chronologiques(courses, triees: bool = False):
+    """
+    Courses dans l'ordre chronologique : un CourseFrame l'est déjà, un flux trié (triees) est parcouru tel quel
+    mais vérifié course par course (ValueError sur une date qui recule).
+    """
+    if isinstance(courses, CourseFrame):
+        return courses
+    if triees:
+        return _verifier_ordre(courses)
+    return sorted(courses, key=lambda x: x['date_course'])
+
+def _ecarts_numeros(courses, champ: str, triees: bool = False) -> Ecarts:
+    """Écarts de chaque numéro de l'arrivée ou de la synthèse, courses dans l'ordre chronologique."""
+    matrice = _matrice(_chronologiques(courses, triees), champ)
+    lignes, colonnes = np.nonzero(matrice)
+    return ecarts_occurrences(lignes, matrice[lignes, colonnes], len(matrice))
+
+def _ecarts_combinaisons(courses, champ: str, taille: int) -> Tuple[Ecarts, List[tuple]]:
+    """Écarts de chaque couple (taille 2) ou triple (taille 3) : (écarts, combinaisons dans l'ordre de leurs clés)."""
+    matrice = _matrice(_chronologiques(courses), champ)
+    # Codes formés sur les indices denses des numéros : ils restent petits quel que soit le plus grand numéro
+    numeros, indices = indices_denses(matrice)
+    lignes, combinaisons_courses = combinaisons_positions(indices, taille)
+    ecarts = ecarts_occurrences(lignes, coder_combinaisons(combinaisons_courses, len(numeros)), len(matrice))
+    return ecarts, decoder_combinaisons(ecarts.cles, taille, len(numeros), numeros)
+
+def _pourcentages(comptes: np.ndarray, total_courses: int) -> Dict[int, float]:
+    """Pourcentages des numéros d'une colonne de frequences_positions (numéros présents, hors ligne 0)."""
+    if not total_courses:
+        return {}
+    return {num: (count / total_courses) * 100 for num, count in enumerate(comptes.tolist()) if num and count}
 
 def analyse_positions(courses: List[Dict[str, Any]], pos1: int, pos2: int) -> Dict[str, Any]:
     """
@@ -24,25 +104,21 @@ def analyse_positions(courses: List[Dict[str, Any]], pos1: int, pos2: int) -> Di
     total_courses = len(courses)
     
     for course in courses:
-        # Extraction de la synthèse
-        synthese = course.get('synthese', '')  # La synthèse est une chaîne de caractères
-        
-        # Conversion de la synthèse en liste de chaînes (avec ou sans 'e')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
+        # Numéros de la synthèse (sans le suffixe 'e')
+        numeros = _numeros(course, 'synthese')
         
         # Affichage pour vérification
-        print(f"Synthèse : {synthese_list}")
+        print(f"Synthèse : {course.get('synthese', '')}")
         
         # Vérification des positions dans la synthèse
-        if str(pos1) in [x.replace('e', '') for x in synthese_list]:
+        if pos1 in numeros:
             pos1_dans_synthese += 1
         
-        if str(pos2) in [x.replace('e', '') for x in synthese_list]:
+        if pos2 in numeros:
             pos2_dans_synthese += 1
         
         # Vérification de la double réussite
-        if (str(pos1) in [x.replace('e', '') for x in synthese_list] and
-            str(pos2) in [x.replace('e', '') for x in synthese_list]):
+        if pos1 in numeros and pos2 in numeros:
             double_reussite += 1
     
     # Calcul des pourcentages
@@ -72,21 +148,18 @@ def analyse_positions_arrivee(courses: List[Dict[str, Any]], num1: int, num2: in
     courses_double_reussite = []  # Liste des courses où les deux numéros sont arrivés
     
     for course in courses:
-        # Extraction de l'arrivée
-        arrivee = course.get('arrivee', '')  # L'arrivée est une chaîne de caractères
-        
-        # Conversion de l'arrivée en liste de numéros
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
+        # Numéros de l'arrivée
+        numeros = _numeros(course, 'arrivee')
         
         # Vérification des numéros dans l'arrivée
-        if str(num1) in arrivee_list:
+        if num1 in numeros:
             num1_dans_arrivee += 1
         
-        if str(num2) in arrivee_list:
+        if num2 in numeros:
             num2_dans_arrivee += 1
         
         # Vérification de la double réussite
-        if str(num1) in arrivee_list and str(num2) in arrivee_list:
+        if num1 in numeros and num2 in numeros:
             double_reussite += 1
             courses_double_reussite.append(course['date_course'])  # Ajouter la date de la course
     
@@ -123,28 +196,28 @@ def analyse_all_pairs(courses: List[Dict[str, Any]]) -> None:
         print(f"Position {pos2} de la synthèse : {resultats['pos2_reussite']:.1f}% de réussite dans le top 5")
         print(f"Double réussite : {resultats['double_reussite']:.1f}% des courses")
 
-def analyse_frequence_arrivee(courses: List[Dict[str, Any]], top_n: int = 3) -> Dict[int, float]:
+def analyse_frequence_arrivee(courses: Iterable[Dict[str, Any]], top_n: int = 3) -> Dict[int, float]:
     """
     Analyse la fréquence des numéros dans les top_n premières positions de l'arrivée.
-    :param courses: Liste des courses.
+    :param courses: Courses (liste ou flux de Database.iter_courses), parcourues une seule fois,
+                    ou CourseFrame, compté par frequences_positions (top_n limité à NOMBRE_POSITIONS).
     :param top_n: Nombre de positions à analyser (par défaut 3).
     :return: Dictionnaire avec les numéros et leur fréquence en pourcentage.
     """
-    if not courses:
-        return {}
-    
+    if isinstance(courses, CourseFrame):
+        comptes = frequences_positions(courses.arrivee)
+        return _pourcentages(comptes[:, :min(top_n, NOMBRE_POSITIONS)].sum(axis=1), len(courses))
+
     # Initialisation du compteur
     compteur = Counter()
+    total_courses = 0
     
     for course in courses:
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        
-        for i, num in enumerate(arrivee_list[:top_n]):
-            if num.isdigit():
-                compteur[int(num)] += 1
+        total_courses += 1
+        compteur.update(_premiers(course, 'arrivee', top_n))
     
-    total_courses = len(courses)
+    if not total_courses:
+        return {}
     return {num: (count / total_courses) * 100 for num, count in compteur.items()}
 
 def analyser_couples_arrivee(courses: List[Dict[str, Any]]) -> Dict[tuple, float]:
@@ -153,20 +226,7 @@ def analyser_couples_arrivee(courses: List[Dict[str, Any]]) -> Dict[tuple, float
     """
     if not courses:
         return {}
-    
-    couple_compteur = defaultdict(int)
-    total_courses = len(courses)
-    
-    for course in courses:
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
-        
-        for couple in combinations(numeros, 2):
-            couple_compteur[tuple(sorted(couple))] += 1
-    
-    return {couple: (count / total_courses) * 100 for couple, count in couple_compteur.items()}
+    return _cooccurrences(courses, 'arrivee').pourcentages_couples()
 
 def analyser_triples_arrivee(courses: List[Dict[str, Any]]) -> Dict[tuple, float]:
     """
@@ -174,150 +234,48 @@ def analyser_triples_arrivee(courses: List[Dict[str, Any]]) -> Dict[tuple, float
     """
     if not courses:
         return {}
-    
-    triple_compteur = defaultdict(int)
-    total_courses = len(courses)
-    
-    for course in courses:
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
-        
-        for triple in combinations(numeros, 3):
-            triple_compteur[tuple(sorted(triple))] += 1
-    
-    return {triple: (count / total_courses) * 100 for triple, count in triple_compteur.items()}
+    return _cooccurrences(courses, 'arrivee').pourcentages_triples()
 
-def analyser_ecarts_arrivee(courses: List[Dict[str, Any]]) -> Dict[int, float]:
+def analyser_ecarts_arrivee(courses: Iterable[Dict[str, Any]]) -> Dict[int, float]:
     """
     Analyse la fréquence des écarts entre les numéros dans l'arrivée.
+    Les courses (liste ou flux) sont parcourues une seule fois.
     """
-    if not courses:
-        return {}
-    
     ecart_compteur = defaultdict(int)
-    total_courses = len(courses)
+    total_courses = 0
     
     for course in courses:
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
+        total_courses += 1
+        numeros = _numeros(course, 'arrivee')
         
         for i in range(len(numeros) - 1):
             ecart = abs(numeros[i] - numeros[i + 1])
             ecart_compteur[ecart] += 1
     
+    if not total_courses:
+        return {}
     return {ecart: (count / total_courses) * 100 for ecart, count in ecart_compteur.items()}
 
-def calculer_ecarts_numeros_arrivee(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
+def calculer_ecarts_numeros_arrivee(courses: Iterable[Dict[str, Any]], triees: bool = False) -> Dict[int, Dict[str, int]]:
     """
     Calcule l'écart et l'écart maximum pour chaque numéro dans l'arrivée.
+    :param triees: Courses déjà dans l'ordre chronologique (flux de Database.iter_courses) : parcourues
+                   une seule fois, sans être chargées en mémoire ; ValueError si une date recule.
     """
-    courses_triees = sorted(courses, key=lambda x: x['date_course'])
-    
-    ecarts_numeros = defaultdict(lambda: {"derniere_occurrence": -1, "ecart_actuel": 0, "ecart_max": 0})
-    total_courses = len(courses_triees)
-    
-    for index, course in enumerate(courses_triees):
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
-        
-        for num in numeros:
-            if ecarts_numeros[num]["derniere_occurrence"] != -1:
-                ecart = index - ecarts_numeros[num]["derniere_occurrence"] - 1
-                if ecart > ecarts_numeros[num]["ecart_max"]:
-                    ecarts_numeros[num]["ecart_max"] = ecart
-            ecarts_numeros[num]["derniere_occurrence"] = index
-    
-    dernier_index = len(courses_triees) - 1
-    for num in ecarts_numeros:
-        if ecarts_numeros[num]["derniere_occurrence"] == dernier_index:
-            ecarts_numeros[num]["ecart_actuel"] = 0
-        else:
-            ecarts_numeros[num]["ecart_actuel"] = dernier_index - ecarts_numeros[num]["derniere_occurrence"]
-        
-        if ecarts_numeros[num]["derniere_occurrence"] == -1:
-            ecarts_numeros[num]["ecart_max"] = total_courses
-        elif ecarts_numeros[num]["ecart_actuel"] > ecarts_numeros[num]["ecart_max"]:
-            ecarts_numeros[num]["ecart_max"] = ecarts_numeros[num]["ecart_actuel"]
-    
-    return ecarts_numeros
+    ecarts = _ecarts_numeros(courses, 'arrivee', triees)
+    return par_cle(ecarts, ecarts.cles.tolist(), COLONNES_ECARTS)
 
 def calculer_ecarts_couples_arrivee(courses: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, int]]:
     """
     Calcule l'écart et l'écart maximum pour chaque couple de numéros dans l'arrivée.
     """
-    courses_triees = sorted(courses, key=lambda x: x['date_course'])
-    ecarts_couples = defaultdict(lambda: {"derniere_occurrence": -1, "ecart_actuel": 0, "ecart_max": 0})
-    total_courses = len(courses_triees)
-    
-    for index, course in enumerate(courses_triees):
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
-        
-        # Générer tous les couples possibles
-        for couple in combinations(numeros, 2):
-            couple_trié = tuple(sorted(couple))
-            if ecarts_couples[couple_trié]["derniere_occurrence"] != -1:
-                ecart = index - ecarts_couples[couple_trié]["derniere_occurrence"] - 1
-                if ecart > ecarts_couples[couple_trié]["ecart_max"]:
-                    ecarts_couples[couple_trié]["ecart_max"] = ecart
-            ecarts_couples[couple_trié]["derniere_occurrence"] = index
-    
-    dernier_index = len(courses_triees) - 1
-    for couple in ecarts_couples:
-        if ecarts_couples[couple]["derniere_occurrence"] == dernier_index:
-            ecarts_couples[couple]["ecart_actuel"] = 0
-        else:
-            ecarts_couples[couple]["ecart_actuel"] = dernier_index - ecarts_couples[couple]["derniere_occurrence"]
-        
-        if ecarts_couples[couple]["derniere_occurrence"] == -1:
-            ecarts_couples[couple]["ecart_max"] = total_courses
-        elif ecarts_couples[couple]["ecart_actuel"] > ecarts_couples[couple]["ecart_max"]:
-            ecarts_couples[couple]["ecart_max"] = ecarts_couples[couple]["ecart_actuel"]
-    
-    return ecarts_couples
+    return par_cle(*_ecarts_combinaisons(courses, 'arrivee', 2), COLONNES_ECARTS)
 
 def calculer_ecarts_triples_arrivee(courses: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, int]]:
     """
     Calcule l'écart et l'écart maximum pour chaque triple de numéros dans l'arrivée.
     """
-    courses_triees = sorted(courses, key=lambda x: x['date_course'])
-    ecarts_triples = defaultdict(lambda: {"derniere_occurrence": -1, "ecart_actuel": 0, "ecart_max": 0})
-    total_courses = len(courses_triees)
-    
-    for index, course in enumerate(courses_triees):
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
-        
-        # Générer tous les triples possibles
-        for triple in combinations(numeros, 3):
-            triple_trié = tuple(sorted(triple))
-            if ecarts_triples[triple_trié]["derniere_occurrence"] != -1:
-                ecart = index - ecarts_triples[triple_trié]["derniere_occurrence"] - 1
-                if ecart > ecarts_triples[triple_trié]["ecart_max"]:
-                    ecarts_triples[triple_trié]["ecart_max"] = ecart
-            ecarts_triples[triple_trié]["derniere_occurrence"] = index
-    
-    dernier_index = len(courses_triees) - 1
-    for triple in ecarts_triples:
-        if ecarts_triples[triple]["derniere_occurrence"] == dernier_index:
-            ecarts_triples[triple]["ecart_actuel"] = 0
-        else:
-            ecarts_triples[triple]["ecart_actuel"] = dernier_index - ecarts_triples[triple]["derniere_occurrence"]
-        
-        if ecarts_triples[triple]["derniere_occurrence"] == -1:
-            ecarts_triples[triple]["ecart_max"] = total_courses
-        elif ecarts_triples[triple]["ecart_actuel"] > ecarts_triples[triple]["ecart_max"]:
-            ecarts_triples[triple]["ecart_max"] = ecarts_triples[triple]["ecart_actuel"]
-    
-    return ecarts_triples
+    return par_cle(*_ecarts_combinaisons(courses, 'arrivee', 3), COLONNES_ECARTS)
 
 def calculer_ecarts_numeros_arrivee_avec_participation(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
     """
@@ -325,38 +283,8 @@ def calculer_ecarts_numeros_arrivee_avec_participation(courses: List[Dict[str, A
     :param courses: Liste des courses.
     :return: Dictionnaire contenant les écarts pour chaque numéro.
     """
-    courses_triees = sorted(courses, key=lambda x: x['date_course'])
-    
-    ecarts_numeros = defaultdict(lambda: {"derniere_occurrence": -1, "ecart_actuel": 0, "ecart_max": 0, "courses_participées": 0})
-    total_courses = len(courses_triees)
-    
-    for index, course in enumerate(courses_triees):
-        arrivee = course.get('arrivee', '')
-        arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-        
-        numeros = [int(x.replace('e', '')) for x in arrivee_list if x.replace('e', '').isdigit()]
-        
-        for num in numeros:
-            if ecarts_numeros[num]["derniere_occurrence"] != -1:
-                ecart = index - ecarts_numeros[num]["derniere_occurrence"] - 1
-                if ecart > ecarts_numeros[num]["ecart_max"]:
-                    ecarts_numeros[num]["ecart_max"] = ecart
-            ecarts_numeros[num]["derniere_occurrence"] = index
-            ecarts_numeros[num]["courses_participées"] += 1
-    
-    dernier_index = len(courses_triees) - 1
-    for num in ecarts_numeros:
-        if ecarts_numeros[num]["derniere_occurrence"] == dernier_index:
-            ecarts_numeros[num]["ecart_actuel"] = 0
-        else:
-            ecarts_numeros[num]["ecart_actuel"] = dernier_index - ecarts_numeros[num]["derniere_occurrence"]
-        
-        if ecarts_numeros[num]["derniere_occurrence"] == -1:
-            ecarts_numeros[num]["ecart_max"] = total_courses
-        elif ecarts_numeros[num]["ecart_actuel"] > ecarts_numeros[num]["ecart_max"]:
-            ecarts_numeros[num]["ecart_max"] = ecarts_numeros[num]["ecart_actuel"]
-    
-    return ecarts_numeros
+    ecarts = _ecarts_numeros(courses, 'arrivee')
+    return par_cle(ecarts, ecarts.cles.tolist(), dict(COLONNES_ECARTS, courses_participées='apparitions'))
 
 def analyser_par_discipline_et_distance_arrivee(courses: List[Dict[str, Any]], discipline: str, distance: str) -> Dict[str, Any]:
     """
@@ -397,12 +325,9 @@ def analyser_numero_synthese(courses: List[Dict[str, Any]], numero_cible: int) -
     for idx, course in enumerate(courses):
         stats['total_courses'] += 1
         
-        synthese = course.get('synthese', '')
-        elements = [x.strip().lower().rstrip('e') for x in synthese.split('-') if x.strip()]
-        
-        try:
-            top3 = list(map(int, elements[:3]))
-        except (ValueError, IndexError):
+        # Une course dont l'une des trois premières positions n'est pas un numéro est écartée
+        top3 = list(_positions(course, 'synthese')[:3])
+        if 0 in top3:
             continue
             
         if numero_cible in top3:
@@ -427,28 +352,27 @@ def analyser_numero_synthese(courses: List[Dict[str, Any]], numero_cible: int) -
     stats['ecarts']['actuel'] = len(courses) - dernier_index - 1 if dernier_index != -1 else 0
     return stats
 
-def analyse_frequence_synthese(courses: List[Dict[str, Any]]) -> Dict[int, float]:
+def analyse_frequence_synthese(courses: Iterable[Dict[str, Any]]) -> Dict[int, float]:
     """
     Analyse la fréquence d'apparition de chaque numéro dans la synthèse.
-    :param courses: Liste des courses.
+    :param courses: Courses (liste ou flux de Database.iter_courses), parcourues une seule fois,
+                    ou CourseFrame, compté par frequences_positions.
     :return: Dictionnaire avec les numéros et leur fréquence en pourcentage.
     """
-    if not courses:
-        return {}
-    
+    if isinstance(courses, CourseFrame):
+        comptes = frequences_positions(courses.synthese)
+        return _pourcentages(comptes[:, :NOMBRE_POSITIONS].sum(axis=1), len(courses))
+
     # Initialisation du compteur
     compteur = Counter()
+    total_courses = 0
     
     for course in courses:
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        
-        for element in synthese_list:
-            num = element.replace('e', '')
-            if num.isdigit():
-                compteur[int(num)] += 1
+        total_courses += 1
+        compteur.update(_numeros(course, 'synthese'))
     
-    total_courses = len(courses)
+    if not total_courses:
+        return {}
     return {num: (count / total_courses) * 100 for num, count in compteur.items()}
 
 def analyser_couples_synthese(courses: List[Dict[str, Any]]) -> Dict[tuple, float]:
@@ -457,24 +381,7 @@ def analyser_couples_synthese(courses: List[Dict[str, Any]]) -> Dict[tuple, floa
     """
     if not courses:
         return {}
-    
-    # Initialisation du compteur pour les couples
-    couple_compteur = defaultdict(int)
-    total_courses = len(courses)
-    
-    for course in courses:
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        
-        # Extraction des numéros de la synthèse
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
-        
-        # Génération de toutes les paires possibles
-        for couple in combinations(numeros, 2):
-            couple_compteur[tuple(sorted(couple))] += 1
-    
-    # Calcul des pourcentages
-    return {couple: (count / total_courses) * 100 for couple, count in couple_compteur.items()}
+    return _cooccurrences(courses, 'synthese').pourcentages_couples()
 
 def analyser_triples_synthese(courses: List[Dict[str, Any]]) -> Dict[tuple, float]:
     """
@@ -482,42 +389,20 @@ def analyser_triples_synthese(courses: List[Dict[str, Any]]) -> Dict[tuple, floa
     """
     if not courses:
         return {}
-    
-    # Initialisation du compteur pour les triples
-    triple_compteur = defaultdict(int)
-    total_courses = len(courses)
-    
-    for course in courses:
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        
-        # Extraction des numéros de la synthèse
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
-        
-        # Génération de toutes les combinaisons de 3 numéros
-        for triple in combinations(numeros, 3):
-            triple_compteur[tuple(sorted(triple))] += 1
-    
-    # Calcul des pourcentages
-    return {triple: (count / total_courses) * 100 for triple, count in triple_compteur.items()}
+    return _cooccurrences(courses, 'synthese').pourcentages_triples()
 
-def analyser_ecarts_synthese(courses: List[Dict[str, Any]]) -> Dict[int, float]:
+def analyser_ecarts_synthese(courses: Iterable[Dict[str, Any]]) -> Dict[int, float]:
     """
     Analyse la fréquence des écarts entre les numéros dans la synthèse.
+    Les courses (liste ou flux) sont parcourues une seule fois.
     """
-    if not courses:
-        return {}
-    
     # Initialisation du compteur pour les écarts
     ecart_compteur = defaultdict(int)
-    total_courses = len(courses)
+    total_courses = 0
     
     for course in courses:
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        
-        # Extraction des numéros de la synthèse
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+        total_courses += 1
+        numeros = _numeros(course, 'synthese')
         
         # Calcul des écarts entre les numéros
         for i in range(len(numeros) - 1):
@@ -525,115 +410,34 @@ def analyser_ecarts_synthese(courses: List[Dict[str, Any]]) -> Dict[int, float]:
             ecart_compteur[ecart] += 1
     
     # Calcul des pourcentages
+    if not total_courses:
+        return {}
     return {ecart: (count / total_courses) * 100 for ecart, count in ecart_compteur.items()}
 
-def calculer_ecarts_numeros(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
+def calculer_ecarts_numeros(courses: Iterable[Dict[str, Any]], triees: bool = False) -> Dict[int, Dict[str, int]]:
     """
     Calcule l'écart et l'écart maximum pour chaque numéro dans la synthèse.
     :param courses: Liste des courses.
+    :param triees: Courses déjà dans l'ordre chronologique (flux de Database.iter_courses) : parcourues
+                   une seule fois, sans être chargées en mémoire ; ValueError si une date recule.
     :return: Dictionnaire contenant les écarts pour chaque numéro.
     """
-    # Tri des courses par date
-    courses_triees = sorted(courses, key=lambda x: x['date_course'])
-    
-    # Dictionnaire pour stocker les écarts
-    ecarts_numeros = defaultdict(lambda: {"derniere_occurrence": -1, "ecart_actuel": 0, "ecart_max": 0})
-    total_courses = len(courses_triees)
-    
-    for index, course in enumerate(courses_triees):
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        
-        # Extraction des numéros de la synthèse
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
-        
-        # Mise à jour des écarts pour chaque numéro
-        for num in numeros:
-            if ecarts_numeros[num]["derniere_occurrence"] != -1:
-                ecart = index - ecarts_numeros[num]["derniere_occurrence"] - 1
-                if ecart > ecarts_numeros[num]["ecart_max"]:
-                    ecarts_numeros[num]["ecart_max"] = ecart
-            ecarts_numeros[num]["derniere_occurrence"] = index
-    
-    # Calcul de l'écart actuel pour la dernière course
-    dernier_index = len(courses_triees) - 1
-    for num in ecarts_numeros:
-        if ecarts_numeros[num]["derniere_occurrence"] == dernier_index:
-            ecarts_numeros[num]["ecart_actuel"] = 0  # Apparu dans la dernière course
-        else:
-            ecarts_numeros[num]["ecart_actuel"] = dernier_index - ecarts_numeros[num]["derniere_occurrence"]
-        
-        # Si le numéro n'est jamais apparu, l'écart maximum est égal au nombre total de courses
-        if ecarts_numeros[num]["derniere_occurrence"] == -1:
-            ecarts_numeros[num]["ecart_max"] = total_courses
-        # Sinon, s'assurer que l'écart actuel ne dépasse pas l'écart maximum
-        elif ecarts_numeros[num]["ecart_actuel"] > ecarts_numeros[num]["ecart_max"]:
-            ecarts_numeros[num]["ecart_max"] = ecarts_numeros[num]["ecart_actuel"]
-    
-    return ecarts_numeros
+    ecarts = _ecarts_numeros(courses, 'synthese', triees)
+    return par_cle(ecarts, ecarts.cles.tolist(), COLONNES_ECARTS)
 
 def calculer_ecarts_combinaisons(courses, taille_combinaison=2):
     """
-    Calcule l'écart et l'écart maximum pour chaque combinaison de numéros (couple ou triple).
+    Calcule l'écart et l'écart maximum pour chaque combinaison de numéros (couple ou triple) de la synthèse.
+    L'écart maximum compte aussi l'écart avant la première occurrence ; occurrences liste les indices
+    des courses (dans l'ordre chronologique) où figure la combinaison.
     """
     if not courses:
         return {}
-
-    # Tri des courses par date
-    courses_triees = sorted(courses, key=lambda x: x['date_course'])
-
-    # Dictionnaire pour stocker les écarts
-    ecarts_combinaisons = defaultdict(lambda: {"derniere_occurrence": -1, "ecart_actuel": 0, "ecart_max": 0, "occurrences": []})
-
-    # Parcourir les courses triées par date
-    for index, course in enumerate(courses_triees):
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-
-        # Extraction des numéros de la synthèse
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
-
-        # Génération de toutes les combinaisons possibles
-        for combinaison in combinations(numeros, taille_combinaison):
-            combinaison_triee = tuple(sorted(combinaison))
-            ecarts_combinaisons[combinaison_triee]["occurrences"].append(index)
-
-    # Calcul des écarts pour chaque combinaison
-    for combinaison, data in ecarts_combinaisons.items():
-        occurrences = data["occurrences"]
-        if not occurrences:
-            # Si la combinaison n'est jamais apparue
-            data["ecart_actuel"] = len(courses_triees)
-            data["ecart_max"] = len(courses_triees)
-        else:
-            # Calcul des écarts entre les occurrences
-            ecarts = []
-            prev_occurrence = -1
-            for occurrence in occurrences:
-                if prev_occurrence != -1:
-                    ecart = occurrence - prev_occurrence - 1
-                    ecarts.append(ecart)
-                prev_occurrence = occurrence
-
-            # Ajouter l'écart entre la première occurrence et le début
-            ecarts.append(occurrences[0])  # Écart avant la première occurrence
-
-            # Ajouter l'écart entre la dernière occurrence et la fin
-            ecarts.append(len(courses_triees) - 1 - occurrences[-1])
-
-            # L'écart maximum est le plus grand écart observé
-            data["ecart_max"] = max(ecarts) if ecarts else 0
-
-            # Calcul de l'écart actuel
-            derniere_occurrence = occurrences[-1]
-            if derniere_occurrence == len(courses_triees) - 1:
-                # Si la combinaison est apparue dans la dernière course
-                data["ecart_actuel"] = 0
-            else:
-                # Sinon, l'écart actuel est le nombre de courses depuis la dernière occurrence
-                data["ecart_actuel"] = len(courses_triees) - 1 - derniere_occurrence
-
-    return ecarts_combinaisons
+    ecarts, combinaisons_synthese = _ecarts_combinaisons(courses, 'synthese', taille_combinaison)
+    resultat = par_cle(ecarts, combinaisons_synthese, dict(COLONNES_ECARTS, ecart_max='ecart_max_complet'))
+    for indice, donnees in enumerate(resultat.values()):
+        donnees['occurrences'] = ecarts.lignes_cle(indice, repetitions=True).tolist()
+    return resultat
 
 def afficher_graphique_frequence(frequence: Dict[int, float]):
     """
@@ -982,9 +786,7 @@ def afficher_graphique_tranches_synthese(courses):
     dates = []
 
     for course in courses:
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+        numeros = _numeros(course, 'synthese')
 
         # Comptage des numéros dans chaque tranche
         tranche_1.append(len([num for num in numeros if 1 <= num <= 5]))
@@ -1019,9 +821,7 @@ def afficher_graphique_tranches_synthese_tierce(courses):
     dates = []
 
     for course in courses:
-        synthese = course.get('synthese', '')
-        synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-        numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+        numeros = _numeros(course, 'synthese')
         # Limiter l'analyse aux trois premiers numéros
         numeros = numeros[:3]
         # Comptage des numéros dans chaque tranche
@@ -1066,15 +866,13 @@ def analyser_premiers_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_historique = 0
     
     for course in courses_triées:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            premier = arrivee.split('-')[0].strip()
-            if premier.isdigit():
-                num = int(premier)
-                if num % 2 == 0:
-                    pairs_historique += 1
-                else:
-                    impairs_historique += 1
+        arrivee = _positions(course, 'arrivee')
+        if arrivee and arrivee[0]:
+            num = arrivee[0]
+            if num % 2 == 0:
+                pairs_historique += 1
+            else:
+                impairs_historique += 1
                     
     ax1.pie([pairs_historique, impairs_historique], 
             labels=[f'Pairs\n{pairs_historique}', f'Impairs\n{impairs_historique}'],
@@ -1089,15 +887,13 @@ def analyser_premiers_paire_impaire(courses: List[Dict[str, Any]]):
     pairs_30 = 0
     impairs_30 = 0
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            premier = arrivee.split('-')[0].strip()
-            if premier.isdigit():
-                num = int(premier)
-                if num % 2 == 0:
-                    pairs_30 += 1
-                else:
-                    impairs_30 += 1
+        arrivee = _positions(course, 'arrivee')
+        if arrivee and arrivee[0]:
+            num = arrivee[0]
+            if num % 2 == 0:
+                pairs_30 += 1
+            else:
+                impairs_30 += 1
                     
     ax2.pie([pairs_30, impairs_30],
             labels=[f'Pairs\n{pairs_30}', f'Impairs\n{impairs_30}'],
@@ -1113,13 +909,11 @@ def analyser_premiers_paire_impaire(courses: List[Dict[str, Any]]):
     couleurs = []
     
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            premier = arrivee.split('-')[0].strip()
-            if premier.isdigit():
-                num = int(premier)
-                valeurs.append(num)
-                couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
+        arrivee = _positions(course, 'arrivee')
+        if arrivee and arrivee[0]:
+            num = arrivee[0]
+            valeurs.append(num)
+            couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
     
     # Création des barres horizontales (ancien en bas)
     bars = ax3.barh(dates, valeurs, color=couleurs, height=0.8, edgecolor='black')
@@ -1169,15 +963,13 @@ def analyser_deuxieme_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_historique = 0
     
     for course in courses_triées:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            deuxieme = arrivee.split('-')[1].strip()
-            if deuxieme.isdigit():
-                num = int(deuxieme)
-                if num % 2 == 0:
-                    pairs_historique += 1
-                else:
-                    impairs_historique += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 1 and arrivee[1]:
+            num = arrivee[1]
+            if num % 2 == 0:
+                pairs_historique += 1
+            else:
+                impairs_historique += 1
                     
     ax1.pie([pairs_historique, impairs_historique], 
             labels=[f'Pairs\n{pairs_historique}', f'Impairs\n{impairs_historique}'],
@@ -1192,15 +984,13 @@ def analyser_deuxieme_paire_impaire(courses: List[Dict[str, Any]]):
     pairs_30 = 0
     impairs_30 = 0
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            deuxieme = arrivee.split('-')[1].strip()
-            if deuxieme.isdigit():
-                num = int(deuxieme)
-                if num % 2 == 0:
-                    pairs_30 += 1
-                else:
-                    impairs_30 += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 1 and arrivee[1]:
+            num = arrivee[1]
+            if num % 2 == 0:
+                pairs_30 += 1
+            else:
+                impairs_30 += 1
                     
     ax2.pie([pairs_30, impairs_30],
             labels=[f'Pairs\n{pairs_30}', f'Impairs\n{impairs_30}'],
@@ -1216,13 +1006,11 @@ def analyser_deuxieme_paire_impaire(courses: List[Dict[str, Any]]):
     couleurs = []
     
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            deuxieme = arrivee.split('-')[1].strip()
-            if deuxieme.isdigit():
-                num = int(deuxieme)
-                valeurs.append(num)
-                couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 1 and arrivee[1]:
+            num = arrivee[1]
+            valeurs.append(num)
+            couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
     
     # Création des barres horizontales (ancien en bas)
     bars = ax3.barh(dates, valeurs, color=couleurs, height=0.8, edgecolor='black')
@@ -1271,15 +1059,13 @@ def analyser_troisieme_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_historique = 0
     
     for course in courses_triées:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            troisieme = arrivee.split('-')[2].strip()
-            if troisieme.isdigit():
-                num = int(troisieme)
-                if num % 2 == 0:
-                    pairs_historique += 1
-                else:
-                    impairs_historique += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 2 and arrivee[2]:
+            num = arrivee[2]
+            if num % 2 == 0:
+                pairs_historique += 1
+            else:
+                impairs_historique += 1
                     
     ax1.pie([pairs_historique, impairs_historique], 
             labels=[f'Pairs\n{pairs_historique}', f'Impairs\n{impairs_historique}'],
@@ -1294,15 +1080,13 @@ def analyser_troisieme_paire_impaire(courses: List[Dict[str, Any]]):
     pairs_30 = 0
     impairs_30 = 0
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            troisieme = arrivee.split('-')[2].strip()
-            if troisieme.isdigit():
-                num = int(troisieme)
-                if num % 2 == 0:
-                    pairs_30 += 1
-                else:
-                    impairs_30 += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 2 and arrivee[2]:
+            num = arrivee[2]
+            if num % 2 == 0:
+                pairs_30 += 1
+            else:
+                impairs_30 += 1
                     
     ax2.pie([pairs_30, impairs_30],
             labels=[f'Pairs\n{pairs_30}', f'Impairs\n{impairs_30}'],
@@ -1318,13 +1102,11 @@ def analyser_troisieme_paire_impaire(courses: List[Dict[str, Any]]):
     couleurs = []
     
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            troisieme = arrivee.split('-')[2].strip()
-            if troisieme.isdigit():
-                num = int(troisieme)
-                valeurs.append(num)
-                couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 2 and arrivee[2]:
+            num = arrivee[2]
+            valeurs.append(num)
+            couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
     
     # Création des barres horizontales (ancien en bas)
     bars = ax3.barh(dates, valeurs, color=couleurs, height=0.8, edgecolor='black')
@@ -1374,15 +1156,13 @@ def analyser_quatrieme_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_historique = 0
     
     for course in courses_triées:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            quatrieme = arrivee.split('-')[3].strip()
-            if quatrieme.isdigit():
-                num = int(quatrieme)
-                if num % 2 == 0:
-                    pairs_historique += 1
-                else:
-                    impairs_historique += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 3 and arrivee[3]:
+            num = arrivee[3]
+            if num % 2 == 0:
+                pairs_historique += 1
+            else:
+                impairs_historique += 1
                     
     ax1.pie([pairs_historique, impairs_historique], 
             labels=[f'Pairs\n{pairs_historique}', f'Impairs\n{impairs_historique}'],
@@ -1397,15 +1177,13 @@ def analyser_quatrieme_paire_impaire(courses: List[Dict[str, Any]]):
     pairs_30 = 0
     impairs_30 = 0
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            quatrieme = arrivee.split('-')[3].strip()
-            if quatrieme.isdigit():
-                num = int(quatrieme)
-                if num % 2 == 0:
-                    pairs_30 += 1
-                else:
-                    impairs_30 += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 3 and arrivee[3]:
+            num = arrivee[3]
+            if num % 2 == 0:
+                pairs_30 += 1
+            else:
+                impairs_30 += 1
                     
     ax2.pie([pairs_30, impairs_30],
             labels=[f'Pairs\n{pairs_30}', f'Impairs\n{impairs_30}'],
@@ -1421,13 +1199,11 @@ def analyser_quatrieme_paire_impaire(courses: List[Dict[str, Any]]):
     couleurs = []
     
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            quatrieme = arrivee.split('-')[3].strip()
-            if quatrieme.isdigit():
-                num = int(quatrieme)
-                valeurs.append(num)
-                couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 3 and arrivee[3]:
+            num = arrivee[3]
+            valeurs.append(num)
+            couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
     
     # Création des barres horizontales (ancien en bas)
     bars = ax3.barh(dates, valeurs, color=couleurs, height=0.8, edgecolor='black')
@@ -1477,15 +1253,13 @@ def analyser_cinquieme_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_historique = 0
     
     for course in courses_triées:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            cinquieme = arrivee.split('-')[4].strip()
-            if cinquieme.isdigit():
-                num = int(cinquieme)
-                if num % 2 == 0:
-                    pairs_historique += 1
-                else:
-                    impairs_historique += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 4 and arrivee[4]:
+            num = arrivee[4]
+            if num % 2 == 0:
+                pairs_historique += 1
+            else:
+                impairs_historique += 1
                     
     ax1.pie([pairs_historique, impairs_historique], 
             labels=[f'Pairs\n{pairs_historique}', f'Impairs\n{impairs_historique}'],
@@ -1500,15 +1274,13 @@ def analyser_cinquieme_paire_impaire(courses: List[Dict[str, Any]]):
     pairs_30 = 0
     impairs_30 = 0
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            cinquieme = arrivee.split('-')[4].strip()
-            if cinquieme.isdigit():
-                num = int(cinquieme)
-                if num % 2 == 0:
-                    pairs_30 += 1
-                else:
-                    impairs_30 += 1
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 4 and arrivee[4]:
+            num = arrivee[4]
+            if num % 2 == 0:
+                pairs_30 += 1
+            else:
+                impairs_30 += 1
                     
     ax2.pie([pairs_30, impairs_30],
             labels=[f'Pairs\n{pairs_30}', f'Impairs\n{impairs_30}'],
@@ -1524,13 +1296,11 @@ def analyser_cinquieme_paire_impaire(courses: List[Dict[str, Any]]):
     couleurs = []
     
     for course in derniers_30:
-        arrivee = course.get('arrivee', '')
-        if arrivee:
-            cinquieme = arrivee.split('-')[4].strip()
-            if cinquieme.isdigit():
-                num = int(cinquieme)
-                valeurs.append(num)
-                couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
+        arrivee = _positions(course, 'arrivee')
+        if len(arrivee) > 4 and arrivee[4]:
+            num = arrivee[4]
+            valeurs.append(num)
+            couleurs.append('#1f77b4' if num%2 ==0 else '#ff7f0e')
     
     # Création des barres horizontales (ancien en bas)
     bars = ax3.barh(dates, valeurs, color=couleurs, height=0.8, edgecolor='black')
@@ -1580,7 +1350,7 @@ def analyser_tierce_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_total = 0
     
     for course in courses_triées:
-        arrivees = list(map(int, course.get('arrivee', '').split('-')[:3]))  # 3 premiers
+        arrivees = _premiers(course, 'arrivee', 3)  # 3 premiers
         for num in arrivees:
             if num % 2 == 0: 
                 pairs_total += 1
@@ -1600,7 +1370,7 @@ def analyser_tierce_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_30 = 0
     
     for course in derniers_30:
-        arrivees = list(map(int, course.get('arrivee', '').split('-')[:3]))
+        arrivees = _premiers(course, 'arrivee', 3)
         for num in arrivees:
             if num % 2 == 0: 
                 pairs_30 += 1
@@ -1621,7 +1391,7 @@ def analyser_tierce_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_counts = []
 
     for course in derniers_30:
-        arrivees = list(map(int, course.get('arrivee', '').split('-')[:3]))
+        arrivees = _premiers(course, 'arrivee', 3)
         pairs = sum(1 for num in arrivees if num % 2 == 0)
         impairs = len(arrivees) - pairs
         pairs_counts.append(pairs)
@@ -1678,7 +1448,7 @@ def analyser_quinte_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_total = 0
     
     for course in courses_triées:
-        arrivees = list(map(int, course.get('arrivee', '').split('-')[:5]))  # 3 premiers
+        arrivees = _premiers(course, 'arrivee', 5)  # 3 premiers
         for num in arrivees:
             if num % 2 == 0: 
                 pairs_total += 1
@@ -1698,7 +1468,7 @@ def analyser_quinte_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_30 = 0
     
     for course in derniers_30:
-        arrivees = list(map(int, course.get('arrivee', '').split('-')[:5]))
+        arrivees = _premiers(course, 'arrivee', 5)
         for num in arrivees:
             if num % 2 == 0: 
                 pairs_30 += 1
@@ -1719,7 +1489,7 @@ def analyser_quinte_paire_impaire(courses: List[Dict[str, Any]]):
     impairs_counts = []
 
     for course in derniers_30:
-        arrivees = list(map(int, course.get('arrivee', '').split('-')[:5]))
+        arrivees = _premiers(course, 'arrivee', 5)
         pairs = sum(1 for num in arrivees if num % 2 == 0)
         impairs = len(arrivees) - pairs
         pairs_counts.append(pairs)
@@ -1782,14 +1552,13 @@ def analyser_paire_impaire_par_tranche_synthese(courses: List[Dict[str, Any]]):
 
     for index, course in enumerate(courses_triees):
         # Extraction des données
-        arrivee = course.get('arrivee', '').split('-')
-        premier_arrivee = int(arrivee[0].strip()) if arrivee and arrivee[0].strip().isdigit() else None
-        synthese = course.get('synthese', '').split('-')
+        arrivee = _positions(course, 'arrivee')
+        premier_arrivee = arrivee[0] if arrivee and arrivee[0] else None
+        synthese = _positions(course, 'synthese')
         
-        try:
-            premier_synthese = int(synthese[0].strip().replace('e', ''))
-        except (IndexError, ValueError, AttributeError):
+        if not synthese or not synthese[0]:
             continue
+        premier_synthese = synthese[0]
 
         # Détermination de la tranche
         if 1 <= premier_synthese <= 2:
@@ -1868,281 +1637,93 @@ def analyser_paire_impaire_par_tranche_synthese(courses: List[Dict[str, Any]]):
     plt.show()
 
 
-def calculer_ecarts_premiers_synthese(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
-    """Version améliorée avec gestion complète des numéros"""
-    ecarts = defaultdict(lambda: {'derniere_occurrence': -1, 
-                                 'ecart_actuel': 0, 
-                                 'ecart_max': 0,
-                                 'occurrences': []})
-    
-    courses_valides = sorted(
-        [c for c in courses 
-         if c.get('date_course') and c.get('synthese')],
-        key=lambda x: x['date_course']
-    )
-
-    for idx, course in enumerate(courses_valides):
-        try:
-            # Extraction et nettoyage du premier élément
-            premier = course['synthese'].split('-')[0].strip().lower()
-            num = int(''.join(filter(str.isdigit, premier)))  # Conversion robuste
-            
-            # Mise à jour des statistiques
-            if ecarts[num]['derniere_occurrence'] != -1:
-                ecart = idx - ecarts[num]['derniere_occurrence'] - 1
-                ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecart)
-            
-            ecarts[num]['derniere_occurrence'] = idx
-            ecarts[num]['occurrences'].append(course['date_course'])
-            
-        except (ValueError, IndexError, KeyError):
-            continue
+def _ecarts_position_synthese(courses, position: int) -> Dict[int, Dict[str, Any]]:
+    """
+    Écarts des numéros à une position de la synthèse, sur les courses datées qui ont une synthèse, par date.
+    Une course a une synthèse si l'une de ses positions est un numéro, quelle qu'elle soit ("NP - 5e - 7e" compte).
+    Pour chaque numéro : écarts (initial exclu de l'écart maximum), dates de ses occurrences, nombre et fréquence.
+    """
+    if isinstance(courses, CourseFrame):
+        valides = (courses.jours != 0) & (courses.synthese != 0).any(axis=1)
+        matrice = courses.synthese[valides]
+        dates = [date.fromordinal(jour).isoformat() for jour in courses.jours[valides].tolist()]
+    else:
+        courses_valides = sorted([c for c in courses if c.get('date_course') and any(_positions(c, 'synthese'))],
+                                 key=lambda x: x['date_course'])
+        matrice = _matrice(courses_valides, 'synthese')
+        dates = [course['date_course'] for course in courses_valides]
+    if matrice.shape[1] <= position:
+        return {}
 
-    # Calcul final pour tous les numéros
-    total_courses = len(courses_valides)
-    for num in ecarts:
-        derniere_occ = ecarts[num]['derniere_occurrence']
-        
-        ecarts[num]['ecart_actuel'] = total_courses - derniere_occ - 1 if derniere_occ != -1 else total_courses
-        ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecarts[num]['ecart_actuel'])
-        
-        # Ajout des données historiques complètes
-        ecarts[num]['total_occurrences'] = len(ecarts[num]['occurrences'])
-        ecarts[num]['frequence'] = len(ecarts[num]['occurrences']) / total_courses * 100 if total_courses > 0 else 0
+    colonne = matrice[:, position]
+    lignes = np.flatnonzero(colonne)
+    ecarts = ecarts_occurrences(lignes, colonne[lignes], len(matrice))
+    resultat = par_cle(ecarts, ecarts.cles.tolist(), dict(COLONNES_ECARTS, total_occurrences='occurrences'))
+    for indice, donnees in enumerate(resultat.values()):
+        donnees['occurrences'] = [dates[ligne] for ligne in ecarts.lignes_cle(indice).tolist()]
+        donnees['frequence'] = donnees['total_occurrences'] / len(matrice) * 100
+    return resultat
 
-    return dict(ecarts)
+def calculer_ecarts_premiers_synthese(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
+    """Écarts des numéros en première position de la synthèse (voir _ecarts_position_synthese)."""
+    return _ecarts_position_synthese(courses, 0)
 
 def calculer_ecarts_deuxiemes_synthese(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
-    """Version améliorée avec gestion complète des numéros"""
-    ecarts = defaultdict(lambda: {'derniere_occurrence': -1, 
-                                 'ecart_actuel': 0, 
-                                 'ecart_max': 0,
-                                 'occurrences': []})
-    
-    courses_valides = sorted(
-        [c for c in courses 
-         if c.get('date_course') and c.get('synthese')],
-        key=lambda x: x['date_course']
-    )
-
-    for idx, course in enumerate(courses_valides):
-        try:
-            # Extraction et nettoyage du deuxieme élément
-            deuxieme = course['synthese'].split('-')[1].strip().lower()
-            num = int(''.join(filter(str.isdigit, deuxieme)))  # Conversion robuste
-            
-            # Mise à jour des statistiques
-            if ecarts[num]['derniere_occurrence'] != -1:
-                ecart = idx - ecarts[num]['derniere_occurrence'] - 1
-                ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecart)
-            
-            ecarts[num]['derniere_occurrence'] = idx
-            ecarts[num]['occurrences'].append(course['date_course'])
-            
-        except (ValueError, IndexError, KeyError):
-            continue
-
-    # Calcul final pour tous les numéros
-    total_courses = len(courses_valides)
-    for num in ecarts:
-        derniere_occ = ecarts[num]['derniere_occurrence']
-        
-        ecarts[num]['ecart_actuel'] = total_courses - derniere_occ - 1 if derniere_occ != -1 else total_courses
-        ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecarts[num]['ecart_actuel'])
-        
-        # Ajout des données historiques complètes
-        ecarts[num]['total_occurrences'] = len(ecarts[num]['occurrences'])
-        ecarts[num]['frequence'] = len(ecarts[num]['occurrences']) / total_courses * 100 if total_courses > 0 else 0
-
-    return dict(ecarts)
+    """Écarts des numéros en deuxième position de la synthèse (voir _ecarts_position_synthese)."""
+    return _ecarts_position_synthese(courses, 1)
 
 def calculer_ecarts_troisiemes_synthese(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
-    """Version améliorée avec gestion complète des numéros"""
-    ecarts = defaultdict(lambda: {'derniere_occurrence': -1, 
-                                 'ecart_actuel': 0, 
-                                 'ecart_max': 0,
-                                 'occurrences': []})
-    
-    courses_valides = sorted(
-        [c for c in courses 
-         if c.get('date_course') and c.get('synthese')],
-        key=lambda x: x['date_course']
-    )
-
-    for idx, course in enumerate(courses_valides):
-        try:
-            # Extraction et nettoyage du deuxieme élément
-            troisieme = course['synthese'].split('-')[2].strip().lower()
-            num = int(''.join(filter(str.isdigit, troisieme)))  # Conversion robuste
-            
-            # Mise à jour des statistiques
-            if ecarts[num]['derniere_occurrence'] != -1:
-                ecart = idx - ecarts[num]['derniere_occurrence'] - 1
-                ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecart)
-            
-            ecarts[num]['derniere_occurrence'] = idx
-            ecarts[num]['occurrences'].append(course['date_course'])
-            
-        except (ValueError, IndexError, KeyError):
-            continue
-
-    # Calcul final pour tous les numéros
-    total_courses = len(courses_valides)
-    for num in ecarts:
-        derniere_occ = ecarts[num]['derniere_occurrence']
-        
-        ecarts[num]['ecart_actuel'] = total_courses - derniere_occ - 1 if derniere_occ != -1 else total_courses
-        ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecarts[num]['ecart_actuel'])
-        
-        # Ajout des données historiques complètes
-        ecarts[num]['total_occurrences'] = len(ecarts[num]['occurrences'])
-        ecarts[num]['frequence'] = len(ecarts[num]['occurrences']) / total_courses * 100 if total_courses > 0 else 0
-
-    return dict(ecarts)
+    """Écarts des numéros en troisième position de la synthèse (voir _ecarts_position_synthese)."""
+    return _ecarts_position_synthese(courses, 2)
 
 def calculer_ecarts_quatriemes_synthese(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
-    """Version améliorée avec gestion complète des numéros"""
-    ecarts = defaultdict(lambda: {'derniere_occurrence': -1, 
-                                 'ecart_actuel': 0, 
-                                 'ecart_max': 0,
-                                 'occurrences': []})
-    
-    courses_valides = sorted(
-        [c for c in courses 
-         if c.get('date_course') and c.get('synthese')],
-        key=lambda x: x['date_course']
-    )
-
-    for idx, course in enumerate(courses_valides):
-        try:
-            # Extraction et nettoyage du deuxieme élément
-            quatrieme = course['synthese'].split('-')[3].strip().lower()
-            num = int(''.join(filter(str.isdigit, quatrieme)))  # Conversion robuste
-            
-            # Mise à jour des statistiques
-            if ecarts[num]['derniere_occurrence'] != -1:
-                ecart = idx - ecarts[num]['derniere_occurrence'] - 1
-                ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecart)
-            
-            ecarts[num]['derniere_occurrence'] = idx
-            ecarts[num]['occurrences'].append(course['date_course'])
-            
-        except (ValueError, IndexError, KeyError):
-            continue
-
-    # Calcul final pour tous les numéros
-    total_courses = len(courses_valides)
-    for num in ecarts:
-        derniere_occ = ecarts[num]['derniere_occurrence']
-        
-        ecarts[num]['ecart_actuel'] = total_courses - derniere_occ - 1 if derniere_occ != -1 else total_courses
-        ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecarts[num]['ecart_actuel'])
-        
-        # Ajout des données historiques complètes
-        ecarts[num]['total_occurrences'] = len(ecarts[num]['occurrences'])
-        ecarts[num]['frequence'] = len(ecarts[num]['occurrences']) / total_courses * 100 if total_courses > 0 else 0
-
-    return dict(ecarts)
+    """Écarts des numéros en quatrième position de la synthèse (voir _ecarts_position_synthese)."""
+    return _ecarts_position_synthese(courses, 3)
 
 def calculer_ecarts_cinquiemes_synthese(courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
-    """Version améliorée avec gestion complète des numéros"""
-    ecarts = defaultdict(lambda: {'derniere_occurrence': -1, 
-                                 'ecart_actuel': 0, 
-                                 'ecart_max': 0,
-                                 'occurrences': []})
-    
-    courses_valides = sorted(
-        [c for c in courses 
-         if c.get('date_course') and c.get('synthese')],
-        key=lambda x: x['date_course']
-    )
-
-    for idx, course in enumerate(courses_valides):
-        try:
-            # Extraction et nettoyage du deuxieme élément
-            cinquiemes = course['synthese'].split('-')[4].strip().lower()
-            num = int(''.join(filter(str.isdigit, cinquiemes)))  # Conversion robuste
-            
-            # Mise à jour des statistiques
-            if ecarts[num]['derniere_occurrence'] != -1:
-                ecart = idx - ecarts[num]['derniere_occurrence'] - 1
-                ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecart)
-            
-            ecarts[num]['derniere_occurrence'] = idx
-            ecarts[num]['occurrences'].append(course['date_course'])
-            
-        except (ValueError, IndexError, KeyError):
-            continue
-
-    # Calcul final pour tous les numéros
-    total_courses = len(courses_valides)
-    for num in ecarts:
-        derniere_occ = ecarts[num]['derniere_occurrence']
-        
-        ecarts[num]['ecart_actuel'] = total_courses - derniere_occ - 1 if derniere_occ != -1 else total_courses
-        ecarts[num]['ecart_max'] = max(ecarts[num]['ecart_max'], ecarts[num]['ecart_actuel'])
-        
-        # Ajout des données historiques complètes
-        ecarts[num]['total_occurrences'] = len(ecarts[num]['occurrences'])
-        ecarts[num]['frequence'] = len(ecarts[num]['occurrences']) / total_courses * 100 if total_courses > 0 else 0
-
-    return dict(ecarts)
+    """Écarts des numéros en cinquième position de la synthèse (voir _ecarts_position_synthese)."""
+    return _ecarts_position_synthese(courses, 4)
+
+def _ecarts_numero_positions(courses, numero: int, positions: List[int]) -> Tuple[List[Dict[str, Any]], Optional[Ecarts]]:
+    """
+    Écarts d'un numéro présent à l'une des positions données de la synthèse, courses dans l'ordre reçu.
+    :return: (apparitions, écarts du noyau, réduits à ce numéro) ; ([], None) s'il n'apparaît jamais.
+    """
+    matrice = _matrice(courses, 'synthese')
+    colonnes = [position for position in positions if position < matrice.shape[1]]
+    ecarts = ecarts_presence((matrice[:, colonnes] == numero).any(axis=1)[:, None])
+    if not len(ecarts):
+        return [], None
+    lignes = ecarts.lignes_cle(0).tolist()
+    gaps = ecarts.ecarts_cle(0)
+    apparitions = [{
+        'date': courses[ligne]['date_course'],
+        'course_id': ligne + 1,
+        'depuis_derniere': gaps[rang] if rang else None,
+    } for rang, ligne in enumerate(lignes)]
+    return apparitions, ecarts
+
+def _statistiques_ecarts(ecarts: Ecarts) -> Dict[str, Any]:
+    """Statistiques d'écarts des analyses détaillées d'un numéro (clé unique du noyau)."""
+    return {
+        'total_apparitions': int(ecarts.occurrences[0]),
+        'ecarts': ecarts.histogramme(0),
+        'ecart_initial': int(ecarts.ecart_initial[0]),
+        'ecart_actuel': int(ecarts.ecart_actuel[0]),
+        'ecart_moyen_complet': float(ecarts.ecart_moyen[0]),
+        'ecart_moyen_interne': float(ecarts.ecart_moyen_interne[0]) if ecarts.occurrences[0] > 1 else 0,
+        'ecart_max': int(ecarts.ecart_max_complet[0]),
+        'ecart_min': int(ecarts.ecart_min[0]),
+    }
 
 def analyse_ecart_position_generique(courses, numero, position):
     """
     Analyse complète des écarts avec gestion de l'historique complet
     Version 2.0 - Prend en compte écart initial et actuel dans les stats
     """
-    apparitions = []
-    gaps = []
-    first_index = None
-    last_index = None
+    apparitions, ecarts = _ecarts_numero_positions(courses, numero, [position])
     total_courses = len(courses)
 
-    for idx, course in enumerate(courses):
-        try:
-            # Extraction et validation de la position
-            synthese = course.get('synthese', '')
-            parts = synthese.split('-')
-            
-            if len(parts) <= position:
-                continue
-                
-            # Nettoyage et conversion du numéro
-            num_str = parts[position].strip().lower().rstrip('e')
-            if not num_str.isdigit():
-                continue
-                
-            current_num = int(num_str)
-            
-            if current_num == numero:
-                # Première apparition
-                if first_index is None:
-                    first_index = idx
-                    gaps.append(idx)  # Écart depuis le début
-                
-                # Calcul écart depuis dernière apparition
-                if last_index is not None:
-                    gaps.append(idx - last_index - 1)
-                
-                last_index = idx
-                
-                # Enregistrement des données
-                apparitions.append({
-                    'date': course['date_course'],
-                    'course_id': idx + 1,
-                    'depuis_derniere': idx - last_index - 1 if last_index != idx else None
-                })
-
-        except Exception as e:
-            print(f"Erreur course {idx} : {str(e)}")
-            continue
-
-    # Calcul écart actuel
-    ecart_actuel = total_courses - last_index - 1 if last_index is not None else total_courses
-    if last_index is not None:
-        gaps.append(ecart_actuel)
-
     # Validation des données
     if not apparitions:
         print(f"\n⚠️ Le numéro {numero} n'est jamais apparu en position {position + 1}")
@@ -2152,15 +1733,8 @@ def analyse_ecart_position_generique(courses, numero, position):
     stats = {
         'numero': numero,
         'position': ['premier', 'deuxième', 'troisieme'][position],
-        'total_apparitions': len(apparitions),
-        'ecarts': Counter(gaps),
         'apparitions': apparitions,
-        'ecart_initial': first_index if first_index is not None else 0,
-        'ecart_actuel': ecart_actuel,
-        'ecart_moyen_complet': sum(gaps)/len(gaps) if gaps else 0,
-        'ecart_moyen_interne': sum(gaps[1:-1])/len(gaps[1:-1]) if len(gaps) > 2 else 0,
-        'ecart_max': max(gaps) if gaps else 0,
-        'ecart_min': min(gaps) if gaps else 0
+        **_statistiques_ecarts(ecarts),
     }
 
     # Affichage détaillé
@@ -2191,59 +1765,9 @@ def analyse_ecart_positions_combinees(courses, numero, positions):
     """
     Analyse combinée des écarts pour plusieurs positions avec affichage détaillé.
     """
-    apparitions = []
-    gaps = []
-    first_index = None
-    last_index = None
+    apparitions, ecarts = _ecarts_numero_positions(courses, numero, positions)
     total_courses = len(courses)
 
-    for idx, course in enumerate(courses):
-        try:
-            # Extraction et validation de la position
-            synthese = course.get('synthese', '')
-            parts = synthese.split('-')
-
-            # Vérifier chaque position
-            for position in positions:
-                if len(parts) <= position:
-                    continue
-
-                # Nettoyage et conversion du numéro
-                num_str = parts[position].strip().lower().rstrip('e')
-                if not num_str.isdigit():
-                    continue
-
-                current_num = int(num_str)
-
-                if current_num == numero:
-                    # Première apparition
-                    if first_index is None:
-                        first_index = idx
-                        gaps.append(idx)  # Écart depuis le début
-
-                    # Calcul écart depuis dernière apparition
-                    if last_index is not None:
-                        gaps.append(idx - last_index - 1)
-
-                    last_index = idx
-
-                    # Enregistrement des données
-                    apparitions.append({
-                        'date': course['date_course'],
-                        'course_id': idx + 1,
-                        'depuis_derniere': idx - last_index - 1 if last_index != idx else None
-                    })
-                    break  # Passer à la course suivante après avoir trouvé le numéro
-
-        except Exception as e:
-            print(f"Erreur course {idx} : {str(e)}")
-            continue
-
-    # Calcul écart actuel
-    ecart_actuel = total_courses - last_index - 1 if last_index is not None else total_courses
-    if last_index is not None:
-        gaps.append(ecart_actuel)
-
     # Validation des données
     if not apparitions:
         print(f"\n⚠️ Le numéro {numero} n'est jamais apparu dans les positions {positions}")
@@ -2253,15 +1777,8 @@ def analyse_ecart_positions_combinees(courses, numero, positions):
     stats = {
         'numero': numero,
         'positions': positions,
-        'total_apparitions': len(apparitions),
-        'ecarts': Counter(gaps),
         'apparitions': apparitions,
-        'ecart_initial': first_index if first_index is not None else 0,
-        'ecart_actuel': ecart_actuel,
-        'ecart_moyen_complet': sum(gaps)/len(gaps) if gaps else 0,
-        'ecart_moyen_interne': sum(gaps[1:-1])/len(gaps[1:-1]) if len(gaps) > 2 else 0,
-        'ecart_max': max(gaps) if gaps else 0,
-        'ecart_min': min(gaps) if gaps else 0
+        **_statistiques_ecarts(ecarts),
     }
 
     # Affichage détaillé
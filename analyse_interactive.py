@@ -179,7 +179,7 @@ def analyser_statistiques_courses(db_path: str) -> Dict[str, Any]:
             cur.execute("""
                 SELECT date_course, arrivee, partants
                 FROM courses
-                ORDER BY date(date_course) ASC
+                ORDER BY date_course ASC
             """)
             courses = [dict(row) for row in cur.fetchall()]
             
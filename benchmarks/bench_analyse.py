@@ -0,0 +1,120 @@
+# bench_analyse.py
+"""
+Durée d'un passage complet des analyses de analyse.py (fréquences, couples, triples, écarts des numéros,
+des combinaisons et par position) sur les courses de Database.get_courses, selon leur format :
+- dictionnaires : chaque fonction redécoupe les chaînes d'arrivée et de synthèse de chaque course ;
+- CourseAnalysee (get_courses(analysees=True)) : les courses sont lues une fois, puis partagées ;
+- CourseFrame (CourseFrame.depuis_base) : colonnes NumPy ; fréquences, combinaisons et écarts lisent les matrices
+  des positions, les autres analyses parcourent le corpus comme une liste de dictionnaires.
+
+Avec --profil, affiche aussi les fonctions les plus coûteuses (cProfile) du passage sur chaque format.
+
+Usage : python benchmarks/bench_analyse.py [nombre_courses] [repetitions] [--profil]
+"""
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analyse
+from course_frame import CourseFrame
+from database import Database
+from bench_wal import _course
+
+# Analyses des menus, sans affichage (nom de la fonction, arguments après les courses)
+MENU = [
+    ('analyse_positions_arrivee', (3, 7)),
+    ('analyse_frequence_arrivee', ()),
+    ('analyser_couples_arrivee', ()),
+    ('analyser_triples_arrivee', ()),
+    ('analyser_ecarts_arrivee', ()),
+    ('calculer_ecarts_numeros_arrivee', ()),
+    ('calculer_ecarts_couples_arrivee', ()),
+    ('calculer_ecarts_triples_arrivee', ()),
+    ('calculer_ecarts_numeros_arrivee_avec_participation', ()),
+    ('analyser_numero_synthese', (4,)),
+    ('analyse_frequence_synthese', ()),
+    ('analyser_couples_synthese', ()),
+    ('analyser_triples_synthese', ()),
+    ('analyser_ecarts_synthese', ()),
+    ('calculer_ecarts_numeros', ()),
+    ('calculer_ecarts_combinaisons', (2,)),
+    ('calculer_ecarts_combinaisons', (3,)),
+    ('calculer_ecarts_premiers_synthese', ()),
+    ('calculer_ecarts_deuxiemes_synthese', ()),
+    ('calculer_ecarts_troisiemes_synthese', ()),
+    ('calculer_ecarts_quatriemes_synthese', ()),
+    ('calculer_ecarts_cinquiemes_synthese', ()),
+]
+FORMATS = ('dictionnaires', 'CourseAnalysee', 'CourseFrame')
+
+def passage_menu(courses):
+    """Exécute toutes les analyses du menu sur la même liste de courses : durée de chacune en ms."""
+    durees = {}
+    for nom, args in MENU:
+        debut = time.perf_counter()
+        getattr(analyse, nom)(courses, *args)
+        durees[f"{nom}{args if args else ''}"] = (time.perf_counter() - debut) * 1000
+    return durees
+
+def charger(db, format_courses):
+    """Courses lues sans cache de get_courses : le coût de lecture (et d'analyse des chaînes) est compté à chaque fois."""
+    debut = time.perf_counter()
+    if format_courses == 'CourseFrame':
+        courses = CourseFrame.depuis_base(db)
+    else:
+        courses = db.get_courses(analysees=format_courses == 'CourseAnalysee')
+    return courses, (time.perf_counter() - debut) * 1000
+
+def profiler(db, format_courses, lignes=8):
+    courses, _ = charger(db, format_courses)
+    profil = cProfile.Profile()
+    profil.runcall(passage_menu, courses)
+    sortie = io.StringIO()
+    pstats.Stats(profil, stream=sortie).sort_stats('tottime').print_stats(lignes)
+    print(f"\n--- {format_courses} : fonctions les plus coûteuses (temps propre) ---")
+    print('\n'.join(ligne for ligne in sortie.getvalue().splitlines() if ligne.strip())[:4000])
+
+def main():
+    arguments = [a for a in sys.argv[1:] if not a.startswith('--')]
+    nombre_courses = int(arguments[0]) if arguments else 20000
+    repetitions = int(arguments[1]) if len(arguments) > 1 else 3
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        chemin = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(chemin, taille_cache=0)
+            db.save_courses_bulk(_course(i) for i in range(nombre_courses))
+        print(f"Passage complet du menu d'analyses sur {nombre_courses} courses, médiane sur {repetitions} passages")
+
+        chargements = {format_courses: [] for format_courses in FORMATS}
+        mesures = {format_courses: [] for format_courses in FORMATS}
+        for _ in range(repetitions):
+            for format_courses in FORMATS:
+                courses, duree = charger(db, format_courses)
+                chargements[format_courses].append(duree)
+                mesures[format_courses].append(passage_menu(courses))
+        if '--profil' in sys.argv:
+            for format_courses in FORMATS:
+                profiler(db, format_courses)
+        db.fermer()
+
+    print(f"\n{'analyse (ms)':<62}" + ''.join(f"{f:>16}" for f in FORMATS))
+    medianes = {f: {nom: statistics.median(m[nom] for m in mesures[f]) for nom in mesures[f][0]} for f in FORMATS}
+    for nom in medianes[FORMATS[0]]:
+        print(f"{nom:<62}" + ''.join(f"{medianes[f][nom]:>16.1f}" for f in FORMATS))
+    print(f"{'lecture des courses (get_courses)':<62}" + ''.join(f"{statistics.median(chargements[f]):>16.1f}" for f in FORMATS))
+    print(f"{'total du menu (lecture comprise)':<62}" +
+          ''.join(f"{sum(medianes[f].values()) + statistics.median(chargements[f]):>16.1f}" for f in FORMATS))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_etat_ecarts.py
+"""
+Latence des menus d'écarts de GestionnaireCourses après l'enregistrement d'une course, selon la taille de l'historique :
+- recalcul : ce que faisaient les menus, get_courses(analysees=True) (cache périmé par l'écriture) puis les écarts
+  des numéros, couples et triples de l'arrivée et de la synthèse et des numéros à chaque position de la synthèse,
+  recalculés depuis la première course par le noyau d'écarts ;
+- état incrémental : Database.etat_ecarts, qui n'ajoute que la course nouvelle (ses clés et les compteurs),
+  puis les mêmes vues (EtatEcarts.ecarts).
+Chaque passage enregistre une course postérieure aux autres (save_course, non compté) puis interroge les menus.
+Le benchmark relève aussi le calcul initial de l'état (premier appel).
+
+Usage : python benchmarks/bench_etat_ecarts.py [tailles séparées par des virgules] [repetitions]
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analyse
+from database import Database, NOMBRE_POSITIONS
+from bench_wal import _course
+
+POSITIONS = ['premiers', 'deuxiemes', 'troisiemes', 'quatriemes', 'cinquiemes']
+
+def recalcul(db):
+    courses = db.get_courses(analysees=True)
+    analyse.calculer_ecarts_numeros_arrivee(courses)
+    analyse.calculer_ecarts_couples_arrivee(courses)
+    analyse.calculer_ecarts_triples_arrivee(courses)
+    analyse.calculer_ecarts_numeros(courses)
+    analyse.calculer_ecarts_combinaisons(courses, 2)
+    analyse.calculer_ecarts_combinaisons(courses, 3)
+    for position in POSITIONS:
+        getattr(analyse, f"calculer_ecarts_{position}_synthese")(courses)
+
+def etat_incremental(db):
+    etat = db.etat_ecarts()
+    for champ in ('arrivee', 'synthese'):
+        for taille in (1, 2, 3):
+            etat.ecarts(champ, taille, ecart_initial=champ == 'synthese' and taille > 1)
+    for rang in range(1, NOMBRE_POSITIONS + 1):
+        etat.ecarts('synthese', rang=rang)
+
+def mesurer(nombre_courses, repetitions):
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(os.path.join(tmp, "bench.db"))
+            db.save_courses_bulk(_course(i) for i in range(nombre_courses))
+        debut = time.perf_counter()
+        db.etat_ecarts()
+        initial = (time.perf_counter() - debut) * 1000
+        durees = {'recalcul': [], 'état incrémental': []}
+        for i in range(repetitions):
+            for nom, menus in (('recalcul', recalcul), ('état incrémental', etat_incremental)):
+                nom_fichier, donnees = _course(nombre_courses + 2 * i + (nom == 'recalcul'))
+                donnees['date'] = '2030-01-01'  # Après toutes les courses de l'historique
+                with contextlib.redirect_stdout(io.StringIO()):
+                    db.save_course(nom_fichier, donnees)
+                debut = time.perf_counter()
+                menus(db)
+                durees[nom].append((time.perf_counter() - debut) * 1000)
+        db.fermer()
+    return initial, {nom: statistics.median(valeurs) for nom, valeurs in durees.items()}
+
+def main():
+    tailles = [int(t) for t in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10000, 50000, 100000]
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"Menus d'écarts après l'enregistrement d'une course, médiane sur {repetitions} passages")
+    print(f"\n{'courses':>10}{'recalcul (ms)':>18}{'état (ms)':>14}{'gain':>10}{'calcul initial (ms)':>24}")
+    for nombre_courses in tailles:
+        initial, medianes = mesurer(nombre_courses, repetitions)
+        gain = medianes['recalcul'] / medianes['état incrémental']
+        print(f"{nombre_courses:>10}{medianes['recalcul']:>18.1f}{medianes['état incrémental']:>14.2f}{gain:>9.0f}x{initial:>24.0f}")
+
+if __name__ == "__main__":
+    main()
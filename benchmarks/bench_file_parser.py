@@ -0,0 +1,112 @@
+# bench_file_parser.py
+"""
+Microbenchmark du parser de notes sur le corpus dist/notes.
+
+Compare l'ancienne extraction (ancienne_extraction : une recherche regex par champ, puis re.match sur
+chaque ligne) au parser en une passe, sur les contenus déjà en mémoire, puis à résultat égal
+(ancienne extraction complétée de la lecture du tableau), puis de bout en bout (lecture et détection
+d'encodage comprises). La ligne "Encodage" compare chardet seul au décodage strict UTF-8 / cp1252.
+
+Le parser en une passe lit aussi le tableau du classement : à extraction égale, il n'est pas plus rapide
+que l'ancien (rapport entre 0,9 et 1,1 d'un passage à l'autre) ; le gain ne vaut qu'à résultat égal.
+
+Usage : python benchmarks/bench_file_parser.py [dossier_notes] [repetitions]
+"""
+import re
+import sys
+import timeit
+import chardet
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from file_parser import parse_file, parse_contenu, detect_encoding, _lire_ligne_classement
+from file_parser import resoudre_encodage, TAILLE_DETECTION
+
+def ancienne_extraction(content: str, file_path: str = "") -> Dict[str, Any]:
+    """
+    Extraction de file_parser avant le parser en une passe (une recherche regex par champ, puis re.match
+    sur chaque ligne), sans le tableau : référence de ce benchmark et du test d'équivalence de test_file_parser.
+    """
+    if not content.strip():
+        raise ValueError("Le fichier est vide ou mal formaté.")
+
+    # Extraction de la date avec formatage robuste
+    date_match = re.search(r'(\d{2}/\d{2}/\d{4})', content)
+    if not date_match:
+        raise ValueError("Date non trouvée dans le fichier.")
+    date = datetime.strptime(date_match.group(1), '%d/%m/%Y').strftime('%Y-%m-%d')
+
+    # Extraction du lieu
+    lieu_match = re.search(r'^(.*?) /', content, re.MULTILINE)
+    lieu = lieu_match.group(1).strip() if lieu_match else "Inconnu"
+    # Extraction de la discipline
+    discipline_match = re.search(r'^\s*(Attelé|Steeple-chase|Haies|Plat|Monté)\s*', content, re.MULTILINE)
+    discipline = discipline_match.group(1).strip() if discipline_match else "Inconnu"
+    # Extraction de la distance
+    distance_match = re.search(r'Tiercé Quarté\+ Quinté\+ Multi / (\d+m)', content)
+    distance = distance_match.group(1).strip() if distance_match else "Inconnu"
+    # Extraction de l'arrivée
+    arrivee_match = re.search(r'Arrivée du Tiercé/Quarté\+/Quinté\+\s*([\d\s-]+)', content)
+    arrivee = arrivee_match.group(1).strip() if arrivee_match else ""
+    # Extraction de la synthèse
+    synthese_match = re.search(r'Place des 5 premiers dans la synthèse\s*([\d\w\s-]+)', content)
+    synthese = synthese_match.group(1).strip() if synthese_match else ""
+    # Extraction des partants
+    partants = set()
+    for line in content.splitlines():
+        match = re.match(r'(\d{1,2})(?:er|e)?\s+(\d+)', line)  # Gère "1er", "2e", etc.
+        if match:
+            partants.add(int(match.group(2)))  # Le numéro du cheval est le deuxième élément
+
+    if not partants:
+        raise ValueError(f"Aucun partant trouvé dans le fichier {file_path}")
+
+    return {
+        'date': date,
+        'lieu': lieu,
+        'type': discipline,
+        'distance': distance,
+        'arrivée': arrivee,
+        'synthese': synthese,
+        'partants': list(partants)  # Convertir en liste pour stockage
+    }
+
+def _parse_file_regex(chemin):
+    with open(chemin, 'r', encoding=detect_encoding(chemin), errors='replace') as f:
+        return ancienne_extraction(f.read(), str(chemin))
+
+def _parse_contenu_regex_avec_tableau(contenu):
+    # Ancienne extraction complétée d'une lecture du tableau : même résultat que parse_contenu
+    donnees = ancienne_extraction(contenu)
+    lignes = (_lire_ligne_classement(line) for line in contenu.splitlines())
+    donnees['classement'] = [ligne[1] for ligne in lignes if ligne is not None and ligne[1] is not None]
+    return donnees
+
+def main():
+    dossier = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent.parent / "dist" / "notes"
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    chemins = sorted(dossier.glob('*.txt'))
+    contenus = []
+    for chemin in chemins:
+        with open(chemin, 'r', encoding=detect_encoding(chemin), errors='replace') as f:
+            contenus.append(f.read())
+
+    print(f"Corpus : {len(chemins)} notes ({sum(len(c) for c in contenus) / 1024:.0f} Ko), {repetitions} répétitions")
+    bruts = [chemin.read_bytes()[:TAILLE_DETECTION] for chemin in chemins]
+    mesures = [
+        ("Encodage", lambda: [chardet.detect(b) for b in bruts], lambda: [resoudre_encodage(b) for b in bruts]),
+        ("Extraction seule", lambda: [ancienne_extraction(c) for c in contenus], lambda: [parse_contenu(c) for c in contenus]),
+        ("Avec le tableau", lambda: [_parse_contenu_regex_avec_tableau(c) for c in contenus], lambda: [parse_contenu(c) for c in contenus]),
+        ("Bout en bout", lambda: [_parse_file_regex(c) for c in chemins], lambda: [parse_file(c) for c in chemins]),
+    ]
+    for libelle, ancien, nouveau in mesures:
+        t_ancien = min(timeit.repeat(ancien, number=1, repeat=repetitions))
+        t_nouveau = min(timeit.repeat(nouveau, number=1, repeat=repetitions))
+        print(f"{libelle:<18} ancien : {t_ancien * 1000 / len(chemins):.3f} ms/note | "
+              f"nouveau : {t_nouveau * 1000 / len(chemins):.3f} ms/note | x{t_ancien / t_nouveau:.2f}")
+
+if __name__ == "__main__":
+    main()
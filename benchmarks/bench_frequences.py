@@ -0,0 +1,139 @@
+# bench_frequences.py
+"""
+Fréquences des numéros par position, des couples et des triples sur un grand corpus :
+boucles Python (Counter et itertools.combinations sur chaque course) contre les moteurs vectorisés
+de course_frame (frequences_positions : un np.bincount sur la matrice N x 5 des positions ;
+cooccurrences : produit de la matrice de présence pour les couples, bincount des triples).
+
+Pour chaque format, le benchmark calcule la même chose : fréquences de l'arrivée (3 premiers),
+de la synthèse, comptes de chaque numéro à chaque position de la synthèse, mêmes fréquences
+restreintes à une discipline, une distance et un lieu, puis couples et triples de l'arrivée.
+- dictionnaires : courses de Database.get_courses, chaînes découpées à chaque passage, boucles ;
+- CourseAnalysee : courses de get_courses(analysees=True), lues une fois, boucles ;
+- CourseAnalysee, moteur : matrice des positions formée à chaque passage (matrice_positions), puis moteurs,
+  comme analyser_couples_* et analyser_triples_* sur une liste de courses ;
+- CourseFrame : colonnes NumPy de CourseFrame.depuis_base, moteurs seuls.
+Les durées ne comprennent pas la lecture des courses.
+
+Usage : python benchmarks/bench_frequences.py [nombre_courses] [repetitions]
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analyse import _numeros, _positions, _premiers
+from course_frame import CourseFrame, cooccurrences, frequences_positions, matrice_positions
+from database import Database, NOMBRE_POSITIONS
+from bench_wal import _course
+
+FILTRES = {'type_course': 'Attelé', 'distance': '2700m', 'lieu': 'Vincennes'}
+
+def frequences_boucle(courses, champ, top_n=NOMBRE_POSITIONS):
+    """Boucle de analyse_frequence_arrivee et analyse_frequence_synthese."""
+    compteur = Counter()
+    for course in courses:
+        compteur.update(_premiers(course, champ, top_n))
+    return {num: count / len(courses) * 100 for num, count in compteur.items()}
+
+def comptes_par_position(courses):
+    """Ce que comptent les boucles des calculer_ecarts_*_synthese : un Counter par position."""
+    comptes = [Counter() for _ in range(NOMBRE_POSITIONS)]
+    for course in courses:
+        for position, numero in enumerate(_positions(course, 'synthese')[:NOMBRE_POSITIONS]):
+            if numero:
+                comptes[position][numero] += 1
+    return comptes
+
+def combinaisons_boucle(courses, champ, taille):
+    """Boucle de analyser_couples_* et analyser_triples_* avant le moteur de cooccurrences."""
+    compteur = defaultdict(int)
+    for course in courses:
+        for combinaison in combinations(_numeros(course, champ), taille):
+            compteur[tuple(sorted(combinaison))] += 1
+    return {combinaison: count / len(courses) * 100 for combinaison, count in compteur.items()}
+
+def filtrer(courses):
+    return [c for c in courses if c['type_course'] == FILTRES['type_course']
+            and c['distance'] == FILTRES['distance'] and c['lieu'] == FILTRES['lieu']]
+
+def operations_boucles(courses):
+    return {
+        'fréquences arrivée (3 premiers)': lambda: frequences_boucle(courses, 'arrivee', 3),
+        'fréquences synthèse': lambda: frequences_boucle(courses, 'synthese'),
+        'comptes par position (synthèse)': lambda: comptes_par_position(courses),
+        'discipline + distance + lieu (2 champs)': lambda: [frequences_boucle(filtrer(courses), champ)
+                                                            for champ in ('arrivee', 'synthese')],
+        'couples arrivée': lambda: combinaisons_boucle(courses, 'arrivee', 2),
+        'triples arrivée': lambda: combinaisons_boucle(courses, 'arrivee', 3),
+    }
+
+def operations_matrice(courses):
+    def matrice(champ, liste=courses):
+        return matrice_positions([_positions(course, champ) for course in liste])
+    return {
+        'fréquences arrivée (3 premiers)': lambda: frequences_positions(matrice('arrivee')),
+        'fréquences synthèse': lambda: frequences_positions(matrice('synthese')),
+        'comptes par position (synthèse)': lambda: frequences_positions(matrice('synthese')),
+        'discipline + distance + lieu (2 champs)': lambda: [frequences_positions(matrice(champ, filtrer(courses)))
+                                                            for champ in ('arrivee', 'synthese')],
+        'couples arrivée': lambda: cooccurrences(matrice('arrivee')).pourcentages_couples(),
+        'triples arrivée': lambda: cooccurrences(matrice('arrivee')).pourcentages_triples(),
+    }
+
+def operations_moteur(corpus):
+    return {
+        'fréquences arrivée (3 premiers)': lambda: frequences_positions(corpus.arrivee),
+        'fréquences synthèse': lambda: frequences_positions(corpus.synthese),
+        'comptes par position (synthèse)': lambda: corpus.frequences('synthese'),
+        'discipline + distance + lieu (2 champs)': lambda: [corpus.frequences(champ, **FILTRES)
+                                                            for champ in ('arrivee', 'synthese')],
+        'couples arrivée': lambda: corpus.cooccurrences('arrivee').pourcentages_couples(),
+        'triples arrivée': lambda: corpus.cooccurrences('arrivee').pourcentages_triples(),
+    }
+
+def chronometrer(operation, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        operation()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(durees)
+
+def main():
+    nombre_courses = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        chemin = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(chemin, taille_cache=0)
+            db.save_courses_bulk(_course(i) for i in range(nombre_courses))
+        analysees = db.get_courses(analysees=True)
+        formats = {
+            'dictionnaires': operations_boucles(db.get_courses()),
+            'CourseAnalysee': operations_boucles(analysees),
+            'CourseAnalysee, moteur': operations_matrice(analysees),
+            'CourseFrame': operations_moteur(CourseFrame.depuis_base(db)),
+        }
+        db.fermer()
+
+    print(f"Fréquences et combinaisons sur {nombre_courses} courses, médiane sur {repetitions} passages")
+    mesures = {nom: {operation: chronometrer(fonction, repetitions) for operation, fonction in operations.items()}
+               for nom, operations in formats.items()}
+    print(f"\n{'ms':<42}" + ''.join(f"{nom:>24}" for nom in formats) + f"{'gain':>10}")
+    for operation in mesures['dictionnaires']:
+        gain = mesures['dictionnaires'][operation] / mesures['CourseFrame'][operation]
+        print(f"{operation:<42}" + ''.join(f"{mesures[nom][operation]:>24.2f}" for nom in formats) + f"{gain:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
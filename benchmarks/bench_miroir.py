@@ -0,0 +1,106 @@
+# bench_miroir.py
+"""
+Latence des lectures des menus sur une base de 50 000 courses, lues sur le disque ou dans la copie
+en mémoire du mode miroir (Database(..., miroir=True)).
+
+La base est créée une fois, puis ouverte dans les deux modes, avec les profils "defaut" et "performance",
+sans cache de get_courses (taille_cache=0) : chaque opération d'un menu interroge SQLite, en alternant les appels
+entre les modes. Le benchmark relève aussi le temps de chargement de la copie et le coût d'une écriture
+(save_course), faite deux fois en mode miroir.
+
+Usage : python benchmarks/bench_miroir.py [nombre_courses] [repetitions]
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database
+from bench_wal import _course
+
+# (profil de pragmas, mode miroir) : le profil "performance" garde déjà 64 Mo de pages en cache et projette le fichier en mémoire
+MODES = (('defaut', False), ('defaut', True), ('performance', False), ('performance', True))
+
+def operations_menus(db, nombre_courses):
+    """Opérations des menus d'analyse, chacune avec des filtres tirés au hasard."""
+    types = ['Attelé', 'Plat', 'Haies', 'Monté']
+    return {
+        'get_courses (discipline, distance)': lambda: db.get_courses(type_course=random.choice(types), distance='2100m'),
+        'page_courses (20 plus récentes)': lambda: db.page_courses(limite=20, decroissant=True),
+        'get_resultats (une course)': lambda: db.get_resultats(random.randint(1, nombre_courses)),
+        'frequences_numeros (arrivée)': lambda: db.frequences_numeros('arrivee', type_course=random.choice(types)),
+        'frequences_combinaisons (couples)': lambda: db.frequences_combinaisons('synthese', 2, type_course=random.choice(types)),
+        'compter_participations (3 numéros)': lambda: db.compter_participations(random.sample(range(1, 19), 3),
+                                                                                type_course=random.choice(types)),
+        'get_partants (avec 2 numéros)': lambda: db.get_partants(type_course=random.choice(types), avec=random.sample(range(1, 19), 2)),
+        'compter_positions (synthèse)': lambda: db.compter_positions('synthese', date_debut='2018-01-01'),
+    }
+
+def ouvrir(chemin, profil, miroir):
+    debut = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(chemin, profil=profil, taille_cache=0, miroir=miroir)
+    return db, (time.perf_counter() - debut) * 1000
+
+def chronometrer(operation):
+    debut = time.perf_counter()
+    operation()
+    return (time.perf_counter() - debut) * 1000
+
+def mesurer(chemin, nombre_courses, repetitions):
+    """
+    Ouvre la base dans chaque mode et alterne les appels de chaque opération entre eux,
+    pour que les variations de charge de la machine pèsent autant sur l'un que sur l'autre.
+    """
+    bases = {mode: ouvrir(chemin, *mode) for mode in MODES}
+    operations = {mode: operations_menus(db, nombre_courses) for mode, (db, _) in bases.items()}
+    latences = {mode: {} for mode in MODES}
+    for nom in operations[MODES[0]]:
+        mesures = {mode: [] for mode in MODES}
+        for mode in MODES:
+            operations[mode][nom]()
+        for _ in range(repetitions):
+            for mode in MODES:
+                mesures[mode].append(chronometrer(operations[mode][nom]))
+        for mode in MODES:
+            latences[mode][nom] = statistics.median(mesures[mode])
+    ecritures = {mode: [] for mode in MODES}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(repetitions):
+            for mode, (db, _) in bases.items():
+                nom_fichier, donnees = _course(nombre_courses + i)
+                ecritures[mode].append(chronometrer(lambda: db.save_course(f"{'-'.join(map(str, mode))}-{nom_fichier}", donnees)))
+        for db, _ in bases.values():
+            db.fermer()
+    return {mode: (bases[mode][1], latences[mode], statistics.median(ecritures[mode])) for mode in MODES}
+
+def main():
+    nombre_courses = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        chemin = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(chemin)
+            db.save_courses_bulk(_course(i) for i in range(nombre_courses))
+            db.fermer()
+        print(f"Base de {nombre_courses} courses ({os.path.getsize(chemin) // 1024 // 1024} Mo), médiane sur {repetitions} appels")
+        resultats = mesurer(chemin, nombre_courses, repetitions)
+
+    print(f"{'ms':<40}" + ''.join(f"{profil:>12}" for profil, _ in MODES))
+    print(f"{'':<40}" + ''.join(f"{'miroir' if miroir else 'disque':>12}" for _, miroir in MODES))
+    for nom in resultats[MODES[0]][1]:
+        print(f"{nom:<40}" + ''.join(f"{resultats[mode][1][nom]:>12.2f}" for mode in MODES))
+    print(f"{'total des menus':<40}" + ''.join(f"{sum(resultats[mode][1].values()):>12.2f}" for mode in MODES))
+    print(f"{'ouverture de la base':<40}" + ''.join(f"{resultats[mode][0]:>12.1f}" for mode in MODES))
+    print(f"{'save_course':<40}" + ''.join(f"{resultats[mode][2]:>12.2f}" for mode in MODES))
+
+if __name__ == "__main__":
+    main()
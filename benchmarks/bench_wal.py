@@ -0,0 +1,93 @@
+# bench_wal.py
+"""
+Latence des lectures pendant une ingestion continue, selon le profil de pragmas de la base.
+
+Un processus écrit des lots de courses (une transaction par lot, comme le démon d'ingestion)
+pendant que le processus principal enchaîne des lectures courtes (classement d'une course
+tirée au hasard) : la latence mesure surtout l'attente des verrous. Pour chaque profil,
+la base est préremplie puis la latence des lectures est mesurée pendant l'écriture.
+
+Usage : python benchmarks/bench_wal.py [duree_s] [taille_lot]
+"""
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import multiprocessing
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import Database, PROFILS
+
+def _course(i):
+    partants = random.sample(range(1, 19), 16)
+    return f"note-{i}.txt", {
+        'date': f"20{10 + i // 5000 % 15:02d}-{1 + i // 400 % 12:02d}-{1 + i % 28:02d}",
+        'lieu': random.choice(['Vincennes', 'Pau', 'Chantilly', 'Deauville']),
+        'type': random.choice(['Attelé', 'Plat', 'Haies', 'Monté']),
+        'distance': random.choice(['2100m', '2700m', '1600m']),
+        'arrivée': ' - '.join(map(str, partants[:5])),
+        'synthese': ' - '.join(f"{p}e" for p in random.sample(range(1, 17), 5)),
+        'partants': partants,
+    }
+
+def ecrire(chemin, profil, debut, taille_lot, arret, ecrites):
+    random.seed(1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(chemin, profil=profil)
+        i = debut
+        while not arret.is_set():
+            db.save_courses_bulk([_course(j) for j in range(i, i + taille_lot)], taille_lot)
+            i += taille_lot
+            ecrites.value += taille_lot
+        db.fermer()
+
+def mesurer(profil, duree, taille_lot, prerempli=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        chemin = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = Database(chemin, profil=profil)
+            db.save_courses_bulk(_course(i) for i in range(prerempli))
+        arret = multiprocessing.Event()
+        ecrites = multiprocessing.Value('i', 0)
+        redacteur = multiprocessing.Process(target=ecrire, args=(chemin, profil, prerempli, taille_lot, arret, ecrites))
+        redacteur.start()
+        while ecrites.value == 0:
+            time.sleep(0.01)
+
+        latences = []
+        fin = time.perf_counter() + duree
+        while time.perf_counter() < fin:
+            debut = time.perf_counter()
+            db.get_resultats(random.randint(1, prerempli))
+            latences.append((time.perf_counter() - debut) * 1000)
+        arret.set()
+        redacteur.join()
+        db.fermer()
+    latences.sort()
+    return {
+        'lectures': len(latences),
+        'courses_ecrites': ecrites.value,
+        'p50': statistics.median(latences),
+        'p95': latences[int(len(latences) * 0.95)],
+        'p99': latences[int(len(latences) * 0.99)],
+        'max': latences[-1],
+    }
+
+def main():
+    duree = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    taille_lot = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    random.seed(0)
+    print(f"Lectures pendant {duree:.0f} s d'écriture continue (lots de {taille_lot} courses)")
+    print(f"{'profil':<12} {'lectures':>9} {'écrites':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for profil in PROFILS:
+        m = mesurer(profil, duree, taille_lot)
+        print(f"{profil:<12} {m['lectures']:>9} {m['courses_ecrites']:>9} {m['p50']:>8.2f} {m['p95']:>8.2f} {m['p99']:>8.2f} {m['max']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+# course_frame.py
+import json
+import os
+import struct
+import tempfile
+from datetime import date
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from database import Database, NOMBRE_POSITIONS, COLONNES_POSITIONS, _fusionner, date_iso
+
+# Instantané binaire du corpus : en-tête (signature, longueur et JSON des métadonnées) puis colonnes brutes alignées
+SIGNATURE_INSTANTANE = b'CRSFRAME'
+FORMAT_INSTANTANE = 1
+ALIGNEMENT_INSTANTANE = 64
+COLONNES_INSTANTANE = ('ids', 'jours', 'arrivee', 'synthese', 'partants', 'types', 'distances', 'lieux')
+
+# Numéro maximal représentable dans le masque des partants (un bit par numéro, entier non signé de 64 bits)
+NUMERO_MAX_PARTANT = 63
+
+# Tableau des fréquences par position (frequences_positions) : une ligne par numéro représentable en int8,
+# une colonne par position, puis les cumuls des 3 et des 5 premières positions
+NOMBRE_NUMEROS = np.iinfo(np.int8).max + 1
+COLONNE_TOP3 = NOMBRE_POSITIONS
+COLONNE_TOP5 = NOMBRE_POSITIONS + 1
+
+class CourseFrame:
+    """
+    Corpus des courses en colonnes NumPy, trié chronologiquement.
+    - jours : date de chaque course en ordinal (date.toordinal), int32
+    - arrivee, synthese : matrices N x NOMBRE_POSITIONS en int8 (0 pour une position absente)
+    - partants : masque des numéros partants, bit n pour le numéro n, uint64
+    - types, distances, lieux : codes int16 des valeurs de disciplines, liste_distances et liste_lieux
+    Le découpage par plage de dates (ou par tranche d'indices) renvoie des vues sans copie ; les filtres par
+    discipline, distance ou lieu copient les lignes retenues.
+    Le corpus se parcourt comme la liste de dictionnaires de Database.get_courses, ce qui permet de le passer
+    tel quel aux fonctions d'analyse existantes.
+    """
+
+    def __init__(self, ids: np.ndarray, jours: np.ndarray, arrivee: np.ndarray, synthese: np.ndarray,
+                 partants: np.ndarray, types: np.ndarray, distances: np.ndarray, lieux: np.ndarray,
+                 disciplines: List[str], liste_distances: List[str], liste_lieux: List[str]):
+        self.ids = ids
+        self.jours = jours
+        self.arrivee = arrivee
+        self.synthese = synthese
+        self.partants = partants
+        self.types = types
+        self.distances = distances
+        self.lieux = lieux
+        # Dictionnaires des codes, partagés par toutes les vues d'un même corpus
+        self.disciplines = disciplines
+        self.liste_distances = liste_distances
+        self.liste_lieux = liste_lieux
+
+    @classmethod
+    def depuis_base(cls, db: Database, type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                    date_fin: Optional[str] = None, distance: Optional[str] = None) -> 'CourseFrame':
+        """
+        Charge les courses de la base (mêmes filtres que Database.get_courses) en une requête par table
+        et par source (partitions des saisons archivées concernées, puis base courante).
+        :return: Le corpus trié par date puis par identifiant.
+        """
+        conditions, params = db._conditions_courses(type_course, date_debut, date_fin, distance)
+        flux, masques = [], {}
+        with db.connexion() as conn:
+            for schema, _ in db._sources(date_debut, date_fin):
+                query = f"SELECT id, date_course, type_course, distance, lieu, {', '.join(COLONNES_POSITIONS)} FROM {schema}.courses"
+                if conditions:
+                    query += " WHERE " + " AND ".join(conditions)
+                query += " ORDER BY date_course, id"
+                flux.append(conn.execute(query, params).fetchall())
+                masques.update(conn.execute(f'''
+                    SELECT course_id, SUM(1 << numero) FROM {schema}.resultats
+                    WHERE numero BETWEEN 1 AND {NUMERO_MAX_PARTANT} GROUP BY course_id
+                ''').fetchall())
+        lignes = list(_fusionner(flux, cle=lambda ligne: (ligne[1] is not None, ligne[1] or '', ligne[0])))
+
+        ids = np.array([ligne[0] for ligne in lignes], dtype=np.int64)
+        jours = np.array([cls._jour(ligne[1]) for ligne in lignes], dtype=np.int32)
+        positions = np.array([[numero or 0 for numero in ligne[5:]] for ligne in lignes],
+                             dtype=np.int16).reshape(len(lignes), 2 * NOMBRE_POSITIONS)
+        if positions.size and positions.max() > np.iinfo(np.int8).max:
+            raise ValueError(f"Numéro supérieur à {np.iinfo(np.int8).max} dans une arrivée ou une synthèse")
+        positions = positions.astype(np.int8)
+        # SUM(1 << 63) dépasse les entiers signés de SQLite : relu en int64 puis réinterprété en uint64
+        partants = np.array([masques.get(course_id, 0) for course_id in ids.tolist()], dtype=np.int64).view(np.uint64)
+        types, disciplines = cls._encoder([ligne[2] for ligne in lignes])
+        distances, liste_distances = cls._encoder([ligne[3] for ligne in lignes])
+        lieux, liste_lieux = cls._encoder([ligne[4] for ligne in lignes])
+        return cls(ids, jours, positions[:, :NOMBRE_POSITIONS], positions[:, NOMBRE_POSITIONS:], partants,
+                   types, distances, lieux, disciplines, liste_distances, liste_lieux)
+
+    @staticmethod
+    def _jour(valeur: Optional[str]) -> int:
+        """Ordinal de la date (0 si la date n'est pas reconnue)."""
+        iso = date_iso(valeur) if valeur else None
+        return date.fromisoformat(iso).toordinal() if iso else 0
+
+    @staticmethod
+    def _encoder(valeurs: List[Optional[str]]) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """Encode des valeurs textuelles en codes int16 : (codes, valeurs distinctes triées)."""
+        distinctes = sorted(set(valeurs), key=lambda v: (v is None, v or ''))
+        codes = {valeur: code for code, valeur in enumerate(distinctes)}
+        return np.array([codes[valeur] for valeur in valeurs], dtype=np.int16), distinctes
+
+    def _vue(self, cle: Union[slice, np.ndarray]) -> 'CourseFrame':
+        """Applique une tranche (vue sans copie) ou un masque (copie) à toutes les colonnes."""
+        return CourseFrame(self.ids[cle], self.jours[cle], self.arrivee[cle], self.synthese[cle], self.partants[cle],
+                           self.types[cle], self.distances[cle], self.lieux[cle],
+                           self.disciplines, self.liste_distances, self.liste_lieux)
+
+    def entre(self, date_debut: Optional[str] = None, date_fin: Optional[str] = None) -> 'CourseFrame':
+        """Courses entre deux dates incluses : recherche dichotomique sur les jours triés, vue sans copie."""
+        debut = np.searchsorted(self.jours, self._jour(date_debut), side='left') if date_debut else 0
+        fin = np.searchsorted(self.jours, self._jour(date_fin), side='right') if date_fin else len(self)
+        return self._vue(slice(debut, fin))
+
+    def filtrer(self, type_course: Optional[str] = None, date_debut: Optional[str] = None, date_fin: Optional[str] = None,
+                distance: Optional[str] = None, lieu: Optional[str] = None) -> 'CourseFrame':
+        """
+        Filtre le corpus comme Database.get_courses (et par lieu).
+        La plage de dates est appliquée en premier, sans copie ; les autres filtres copient les lignes retenues.
+        """
+        vue = self.entre(date_debut, date_fin)
+        masque = vue.masque(type_course, distance, lieu)
+        return vue if masque is None else vue._vue(masque)
+
+    def masque(self, type_course: Optional[str] = None, distance: Optional[str] = None,
+               lieu: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Masque booléen des courses de la discipline, de la distance et du lieu donnés (critères combinés).
+        :return: None si aucun critère n'est donné.
+        """
+        masque = None
+        for valeur, codes, valeurs in ((type_course, self.types, self.disciplines),
+                                       (distance, self.distances, self.liste_distances),
+                                       (lieu, self.lieux, self.liste_lieux)):
+            if not valeur:
+                continue
+            condition = codes == valeurs.index(valeur) if valeur in valeurs else np.zeros(len(self), dtype=bool)
+            masque = condition if masque is None else masque & condition
+        return masque
+
+    def frequences(self, champ: str = 'arrivee', type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                   date_fin: Optional[str] = None, distance: Optional[str] = None,
+                   lieu: Optional[str] = None) -> Tuple[np.ndarray, int]:
+        """
+        Fréquences des numéros par position de l'arrivée ('arrivee') ou de la synthèse ('synthese') des courses
+        retenues (mêmes filtres que filtrer), sans construire le corpus filtré : seule la matrice des positions
+        des courses retenues est copiée.
+        :return: (tableau de frequences_positions, nombre de courses retenues).
+        """
+        vue = self.entre(date_debut, date_fin)
+        matrice = getattr(vue, champ)
+        masque = vue.masque(type_course, distance, lieu)
+        if masque is not None:
+            matrice = matrice[masque]
+        return frequences_positions(matrice), len(matrice)
+
+    def cooccurrences(self, champ: str = 'arrivee', type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                      date_fin: Optional[str] = None, distance: Optional[str] = None,
+                      lieu: Optional[str] = None) -> 'Cooccurrences':
+        """Couples et triples de numéros de l'arrivée ou de la synthèse des courses retenues (mêmes filtres que filtrer)."""
+        vue = self.entre(date_debut, date_fin)
+        matrice = getattr(vue, champ)
+        masque = vue.masque(type_course, distance, lieu)
+        return cooccurrences(matrice if masque is None else matrice[masque])
+
+    def exporter(self, chemin: str, version_donnees: int) -> None:
+        """
+        Écrit le corpus dans un instantané binaire lisible par numpy.memmap (voir ouvrir).
+        Le fichier est écrit à côté puis renommé : un processus qui lit l'ancien instantané le garde intact.
+        :param version_donnees: Version des données de la base (Database.version_base) au moment de l'export.
+        """
+        colonnes, decalage = {}, 0
+        for nom in COLONNES_INSTANTANE:
+            colonne = np.ascontiguousarray(getattr(self, nom))
+            colonnes[nom] = {'dtype': colonne.dtype.str, 'forme': list(colonne.shape), 'decalage': decalage}
+            decalage += -(-colonne.nbytes // ALIGNEMENT_INSTANTANE) * ALIGNEMENT_INSTANTANE
+        entete = json.dumps({
+            'format': FORMAT_INSTANTANE,
+            'version_donnees': version_donnees,
+            'dictionnaires': {'disciplines': self.disciplines, 'distances': self.liste_distances, 'lieux': self.liste_lieux},
+            'colonnes': colonnes,
+        }).encode('utf-8')
+        debut = self._debut_colonnes(len(entete))
+
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        descripteur, temporaire = tempfile.mkstemp(dir=dossier, prefix=os.path.basename(chemin) + '.')
+        try:
+            with os.fdopen(descripteur, 'wb') as fichier:
+                fichier.write(SIGNATURE_INSTANTANE + struct.pack('<I', len(entete)) + entete)
+                for nom in COLONNES_INSTANTANE:
+                    fichier.seek(debut + colonnes[nom]['decalage'])
+                    fichier.write(np.ascontiguousarray(getattr(self, nom)).tobytes())
+                fichier.truncate(debut + decalage)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            os.unlink(temporaire)
+            raise
+
+    @staticmethod
+    def _debut_colonnes(longueur_entete: int) -> int:
+        """Position de la première colonne : après la signature, la longueur et l'en-tête, alignée."""
+        taille = len(SIGNATURE_INSTANTANE) + 4 + longueur_entete
+        return -(-taille // ALIGNEMENT_INSTANTANE) * ALIGNEMENT_INSTANTANE
+
+    @classmethod
+    def ouvrir(cls, chemin: str) -> Tuple['CourseFrame', int]:
+        """
+        Ouvre un instantané en lecture seule, sans copie : les colonnes sont des vues d'une projection mémoire
+        du fichier, dont les pages sont partagées par tous les processus qui l'ouvrent.
+        :return: (corpus, version des données de l'instantané).
+        :raises ValueError: Si le fichier n'est pas un instantané de ce format.
+        """
+        with open(chemin, 'rb') as fichier:
+            signature = fichier.read(len(SIGNATURE_INSTANTANE))
+            longueur = fichier.read(4)
+            if signature != SIGNATURE_INSTANTANE or len(longueur) != 4:
+                raise ValueError(f"{chemin} n'est pas un instantané du corpus")
+            longueur, = struct.unpack('<I', longueur)
+            entete = json.loads(fichier.read(longueur).decode('utf-8'))
+        if entete.get('format') != FORMAT_INSTANTANE:
+            raise ValueError(f"Format d'instantané non pris en charge : {entete.get('format')}")
+        projection = np.memmap(chemin, dtype=np.uint8, mode='r')
+        debut = cls._debut_colonnes(longueur)
+        colonnes = {nom: np.ndarray(tuple(description['forme']), dtype=np.dtype(description['dtype']), buffer=projection,
+                                    offset=debut + description['decalage'])
+                    for nom, description in entete['colonnes'].items()}
+        dictionnaires = entete['dictionnaires']
+        corpus = cls(*(colonnes[nom] for nom in COLONNES_INSTANTANE),
+                     dictionnaires['disciplines'], dictionnaires['distances'], dictionnaires['lieux'])
+        return corpus, entete['version_donnees']
+
+    def numeros_partants(self, indice: int) -> List[int]:
+        """Numéros partants de la course à l'indice donné, triés."""
+        masque = int(self.partants[indice])
+        return [numero for numero in range(1, NUMERO_MAX_PARTANT + 1) if masque >> numero & 1]
+
+    @property
+    def nbytes(self) -> int:
+        """Taille des colonnes en octets (hors dictionnaires des codes)."""
+        return sum(colonne.nbytes for colonne in (self.ids, self.jours, self.arrivee, self.synthese, self.partants,
+                                                   self.types, self.distances, self.lieux))
+
+    def course(self, indice: int) -> Dict[str, Any]:
+        """
+        Course à l'indice donné, au format de Database.get_courses.
+        Les partants sont restitués triés ; arrivée et synthèse sont reformées à partir des positions.
+        """
+        arrivee = [str(numero) for numero in self.arrivee[indice].tolist() if numero]
+        synthese = [f"{numero}e" for numero in self.synthese[indice].tolist() if numero]
+        jour = int(self.jours[indice])
+        return {
+            'id': int(self.ids[indice]),
+            'date_course': date.fromordinal(jour).isoformat() if jour else None,
+            'type_course': self.disciplines[self.types[indice]],
+            'distance': self.liste_distances[self.distances[indice]],
+            'lieu': self.liste_lieux[self.lieux[indice]],
+            'partants': ','.join(map(str, self.numeros_partants(indice))),
+            'arrivee': ' - '.join(arrivee),
+            'synthese': ' - '.join(synthese),
+        }
+
+    def en_courses(self) -> List[Dict[str, Any]]:
+        """Liste de dictionnaires au format de Database.get_courses."""
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.course(indice) for indice in range(len(self)))
+
+    def __getitem__(self, cle: Union[int, slice]) -> Union[Dict[str, Any], 'CourseFrame']:
+        if isinstance(cle, slice):
+            return self._vue(cle)
+        if cle < 0:
+            cle += len(self)
+        if not 0 <= cle < len(self):
+            raise IndexError("Indice de course hors du corpus")
+        return self.course(cle)
+
+def frequences_positions(positions: np.ndarray) -> np.ndarray:
+    """
+    Compte chaque numéro à chaque position d'une matrice N x NOMBRE_POSITIONS (colonne arrivee ou synthese
+    d'un CourseFrame), en un seul passage de np.bincount sur les indices numéro x position.
+    :return: Tableau dense NOMBRE_NUMEROS x (NOMBRE_POSITIONS + 2) d'entiers : comptes[numero, position]
+             pour les positions 0 à NOMBRE_POSITIONS - 1, puis les cumuls des 3 premières (COLONNE_TOP3)
+             et des 5 premières positions (COLONNE_TOP5). La ligne 0 compte les positions absentes.
+    """
+    largeur = positions.shape[1]
+    indices = positions.astype(np.intp) * largeur + np.arange(largeur)
+    comptes = np.bincount(indices.ravel(), minlength=NOMBRE_NUMEROS * largeur).reshape(NOMBRE_NUMEROS, largeur)
+    return np.column_stack((comptes, comptes[:, :3].sum(axis=1), comptes[:, :5].sum(axis=1)))
+
+def matrice_positions(listes: Sequence[Sequence[int]]) -> np.ndarray:
+    """
+    Matrice des positions (une ligne par liste de numéros, complétée par des 0) pour les moteurs de comptage,
+    à partir de numéros déjà lus (par exemple analyse._numeros sur les dictionnaires de Database.get_courses).
+    """
+    longueurs = np.fromiter(map(len, listes), dtype=np.intp, count=len(listes))
+    largeur = int(longueurs.max()) if len(listes) else 0
+    numeros = np.fromiter((numero for liste in listes for numero in liste), dtype=np.int64, count=int(longueurs.sum()))
+    lignes = np.repeat(np.arange(len(listes)), longueurs)
+    colonnes = np.arange(len(numeros)) - np.repeat(np.cumsum(longueurs) - longueurs, longueurs)
+    matrice = np.zeros((len(listes), largeur), dtype=np.int64)
+    matrice[lignes, colonnes] = numeros
+    return matrice
+
+class Cooccurrences:
+    """
+    Comptes des couples et des triples de numéros d'une matrice de positions (voir cooccurrences).
+    Les combinaisons sont celles de itertools.combinations sur les numéros de chaque course, triées :
+    un numéro répété dans une course forme des couples (a, a), comme dans les boucles de analyse.py.
+    Les numéros sont renumérotés de façon dense (indice 0 pour les positions absentes, puis les numéros présents
+    dans l'ordre croissant) : la mémoire dépend du nombre de numéros distincts, pas du plus grand.
+    - numeros : numéro de chaque indice (numeros[0] = 0)
+    - couples : matrice taille x taille des indices, couples[i, j] pour i <= j (triangle inférieur à 0)
+    - codes_triples, comptes_triples : triples présents, codés (i * taille + j) * taille + k avec i <= j <= k,
+      triés, et leur nombre ; calculés au premier accès (les couples seuls n'en ont pas besoin)
+    """
+
+    def __init__(self, numeros: np.ndarray, couples: np.ndarray, indices: np.ndarray, nombre_courses: int):
+        self.numeros = numeros
+        self.couples = couples
+        self.nombre_courses = nombre_courses
+        self._indices = indices  # Matrice des positions en indices denses, pour le calcul des triples
+        self._triples = None
+
+    @property
+    def taille(self) -> int:
+        return len(self.numeros)
+
+    @property
+    def codes_triples(self) -> np.ndarray:
+        return self._compter_triples()[0]
+
+    @property
+    def comptes_triples(self) -> np.ndarray:
+        return self._compter_triples()[1]
+
+    def _compter_triples(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Triples : combinaisons_positions sur les indices, codées (coder_combinaisons) puis comptées par np.bincount
+        si la table des taille**3 codes ne dépasse pas le nombre de triples des courses, sinon par np.unique.
+        """
+        if self._triples is None:
+            _, triples = combinaisons_positions(self._indices, 3)
+            codes = coder_combinaisons(triples, self.taille)
+            if self.taille ** 3 <= max(len(codes), 1 << 16):
+                comptes = np.bincount(codes, minlength=self.taille ** 3)
+                presents = np.flatnonzero(comptes)
+                self._triples = presents, comptes[presents]
+            else:
+                self._triples = np.unique(codes, return_counts=True)
+        return self._triples
+
+    def _indice(self, numero: int) -> int:
+        """Indice dense d'un numéro, 0 s'il n'est présent dans aucune course (ou s'il n'est pas positif)."""
+        indice = int(np.searchsorted(self.numeros, numero))
+        return indice if numero > 0 and indice < self.taille and self.numeros[indice] == numero else 0
+
+    def couple(self, a: int, b: int) -> int:
+        """Nombre de courses (ou d'occurrences, pour un numéro répété) du couple, dans un ordre quelconque."""
+        a, b = sorted((self._indice(a), self._indice(b)))
+        return int(self.couples[a, b]) if a else 0
+
+    def triple(self, a: int, b: int, c: int) -> int:
+        """Nombre d'occurrences du triple, dans un ordre quelconque."""
+        a, b, c = sorted((self._indice(a), self._indice(b), self._indice(c)))
+        if not a:
+            return 0
+        codes, comptes = self._compter_triples()
+        code = (a * self.taille + b) * self.taille + c
+        indice = np.searchsorted(codes, code)
+        return int(comptes[indice]) if indice < len(codes) and codes[indice] == code else 0
+
+    def iter_couples(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """((a, b), nombre) des couples présents, dans l'ordre croissant."""
+        lignes, colonnes = np.nonzero(self.couples)
+        return zip(zip(self.numeros[lignes].tolist(), self.numeros[colonnes].tolist()), self.couples[lignes, colonnes].tolist())
+
+    def iter_triples(self) -> Iterator[Tuple[Tuple[int, int, int], int]]:
+        """((a, b, c), nombre) des triples présents, dans l'ordre croissant."""
+        codes, comptes = self._compter_triples()
+        return zip(decoder_combinaisons(codes, 3, self.taille, self.numeros), comptes.tolist())
+
+    def pourcentages_couples(self) -> Dict[Tuple[int, int], float]:
+        """{couple: pourcentage des courses}, comme analyser_couples_arrivee et analyser_couples_synthese."""
+        if not self.nombre_courses:
+            return {}
+        return {couple: (nombre / self.nombre_courses) * 100 for couple, nombre in self.iter_couples()}
+
+    def pourcentages_triples(self) -> Dict[Tuple[int, int, int], float]:
+        """{triple: pourcentage des courses}, comme analyser_triples_arrivee et analyser_triples_synthese."""
+        if not self.nombre_courses:
+            return {}
+        return {triple: (nombre / self.nombre_courses) * 100 for triple, nombre in self.iter_triples()}
+
+def cooccurrences(positions: np.ndarray) -> Cooccurrences:
+    """
+    Compte les couples de numéros d'une matrice de positions (N x largeur, 0 pour une position absente) et prépare
+    le compte des triples, fait au premier accès (voir Cooccurrences).
+    - les numéros sont d'abord renumérotés en indices denses (np.unique) : N x (numéros distincts + 1) au plus
+    - couples : produit de la matrice de présence par sa transposée ; la présence compte les répétitions d'un numéro
+      dans une course, et la diagonale est corrigée pour compter les couples (a, a) comme combinations.
+      Le produit est fait en float64 (BLAS), exact tant que les comptes restent sous 2**53.
+    """
+    nombre, largeur = positions.shape
+    numeros, indices = indices_denses(positions)
+    taille = len(numeros)
+
+    lignes = np.repeat(np.arange(nombre), largeur)
+    presence = np.bincount(lignes * taille + indices.ravel(), minlength=nombre * taille).reshape(nombre, taille)
+    presence[:, 0] = 0
+    presence = presence.astype(np.float64)
+    produit = np.rint(presence.T @ presence).astype(np.int64)
+    couples = np.triu(produit, 1)
+    diagonale = np.arange(taille)
+    couples[diagonale, diagonale] = (produit[diagonale, diagonale] - presence.sum(axis=0).astype(np.int64)) // 2
+    return Cooccurrences(numeros, couples, indices, nombre)
+
+def indices_denses(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Renumérote une matrice de positions : 0 reste 0 (position absente), les numéros présents deviennent 1..k-1
+    dans l'ordre croissant. Les tableaux indexés ou les codes formés sur ces indices suivent le nombre de numéros
+    distincts, pas la valeur du plus grand.
+    :return: (numéro de chaque indice, matrice des indices de même forme que positions)
+    """
+    valeurs = positions.ravel()
+    if valeurs.size and valeurs.min() < 0:
+        raise ValueError("Numéro négatif dans une arrivée ou une synthèse")
+    plus_grand = int(valeurs.max()) if valeurs.size else 0
+    if plus_grand < max(valeurs.size, 1 << 16):
+        # Numéros bornés par la taille des données : table de correspondance (np.bincount), sans tri
+        comptes = np.bincount(valeurs, minlength=1)
+        comptes[0] = 1  # L'indice 0 reste celui des positions absentes
+        numeros = np.flatnonzero(comptes)
+        table = np.zeros(plus_grand + 1, dtype=np.intp)
+        table[numeros] = np.arange(len(numeros))
+        return numeros.astype(np.int64), table[positions]
+    numeros, indices = np.unique(np.append(valeurs, 0), return_inverse=True)
+    return numeros.astype(np.int64), indices[:-1].reshape(positions.shape).astype(np.intp)
+
+def combinaisons_positions(positions: np.ndarray, taille: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Combinaisons de taille numéros de chaque course d'une matrice de positions, comme itertools.combinations
+    sur les numéros de la course puis tri de chaque combinaison. Chaque course est triée une fois (les 0 des
+    positions absentes passent en tête) : ses combinaisons de positions sont alors déjà triées.
+    :return: (indice de la course de chaque combinaison, croissant ; matrice M x taille des combinaisons),
+             sans les combinaisons qui contiennent une position absente.
+    """
+    nombre, largeur = positions.shape
+    triees = np.sort(positions, axis=1).astype(np.intp)
+    indices = np.array(list(combinations(range(largeur), taille)), dtype=np.intp).reshape(-1, taille)
+    combinaisons = triees[:, indices].reshape(-1, taille)
+    lignes = np.repeat(np.arange(nombre), len(indices))
+    presentes = combinaisons[:, 0] > 0
+    return lignes[presentes], combinaisons[presentes]
+
+def coder_combinaisons(combinaisons: np.ndarray, base: int) -> np.ndarray:
+    """Code chaque combinaison (ligne a, b, ...) en un entier : (a * base + b) * base + ..."""
+    codes = np.zeros(len(combinaisons), dtype=np.intp)
+    for colonne in combinaisons.T:
+        codes = codes * base + colonne
+    return codes
+
+def decoder_combinaisons(codes: np.ndarray, taille: int, base: int,
+                         numeros: Optional[np.ndarray] = None) -> List[Tuple[int, ...]]:
+    """
+    Combinaisons (tuples triés) des codes de coder_combinaisons.
+    :param numeros: Numéro de chaque indice, si les combinaisons ont été codées sur des indices denses.
+    """
+    colonnes = []
+    for _ in range(taille):
+        codes, colonne = np.divmod(codes, base)
+        colonnes.append((colonne if numeros is None else numeros[colonne]).tolist())
+    return list(zip(*reversed(colonnes)))
+
+def chemin_instantane(db: Database) -> Optional[str]:
+    """Chemin de l'instantané d'une base (à côté du fichier SQLite) ; None pour une base en mémoire."""
+    return None if db.db_path == ':memory:' else f"{db.db_path}.corpus"
+
+def instantane(db: Database, chemin: Optional[str] = None) -> CourseFrame:
+    """
+    Corpus complet de la base, ouvert depuis son instantané binaire s'il est à jour.
+    L'instantané est régénéré quand la version des données de la base a changé (écriture de n'importe quel processus).
+    :param chemin: Chemin de l'instantané ; par défaut chemin_instantane(db).
+    """
+    chemin = chemin or chemin_instantane(db)
+    version = db.version_base()
+    if chemin is None:
+        return CourseFrame.depuis_base(db)
+    if os.path.exists(chemin):
+        try:
+            corpus, version_instantane = CourseFrame.ouvrir(chemin)
+            if version_instantane == version:
+                return corpus
+        except (OSError, ValueError) as e:
+            print(f"Instantané {chemin} illisible, régénération : {e}")
+    corpus = CourseFrame.depuis_base(db)
+    corpus.exporter(chemin, version)
+    return CourseFrame.ouvrir(chemin)[0]
+
+def en_courses(courses: Union[CourseFrame, Sequence[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Adaptateur pour les fonctions d'analyse : accepte un CourseFrame ou une liste de courses."""
+    return courses.en_courses() if isinstance(courses, CourseFrame) else list(courses)
@@ -1,19 +1,679 @@
 # database.py
+import heapq
+import os
+import re
 import sqlite3
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from datetime import date, datetime
+from itertools import combinations, islice
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from urllib.parse import quote
 
 query = "SELECT *, date_course as date FROM courses"
 
+# Issues possibles d'une sauvegarde, par fichier
+STATUT_SUCCES = 'success'
+STATUT_DEJA_TRAITE = 'deja_traite'
+STATUT_ERREUR = 'erreur'
+STATUT_DOUBLON = 'doublon'
+
+# Requêtes préparées conservées par connexion (paramètre cached_statements de sqlite3)
+TAILLE_CACHE_REQUETES = 256
+# Résultats de get_courses conservés par instance de Database (filtres les plus récemment utilisés)
+TAILLE_CACHE_COURSES = 32
+# Attente maximale (s) d'un verrou tenu par une autre connexion avant l'erreur "database is locked"
+DELAI_VERROU = 30.0
+
+# Profils de pragmas appliqués à chaque connexion. "performance" : journal WAL (les lecteurs ne sont plus
+# bloqués pendant l'écriture), synchronous=NORMAL (pas de fsync à chaque commit en WAL), cache de 64 Mo,
+# fichier projeté en mémoire jusqu'à 256 Mo, tables temporaires en mémoire, checkpoint automatique toutes les 1000 pages.
+# "defaut" conserve le comportement de SQLite (journal rollback) et reste le profil par défaut : "performance" se choisit
+# par déploiement (COURSES_DB_PROFIL=performance), pas pour une base sur un partage réseau (WAL y est inutilisable).
+PROFILS = {
+    'defaut': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,
+    },
+}
+# Profil utilisé quand aucun n'est passé à Database : à régler par déploiement
+PROFIL_PAR_DEFAUT = os.environ.get('COURSES_DB_PROFIL', 'defaut')
+# Mode miroir (lectures servies par une copie en mémoire de la base) quand Database ne précise pas miroir
+MIROIR_PAR_DEFAUT = os.environ.get('COURSES_DB_MIROIR', '') == '1'
+
+def _migration_resultats(conn: sqlite3.Connection) -> None:
+    """Table resultats (une ligne par partant) et reprise des partants des courses déjà enregistrées."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS resultats (
+            course_id INTEGER NOT NULL REFERENCES courses(id),
+            rang INTEGER,
+            numero INTEGER NOT NULL,
+            nom TEXT,
+            gains INTEGER,
+            PRIMARY KEY (course_id, numero)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_resultats_numero ON resultats(numero, course_id)')
+    # Le classement n'était pas conservé : seuls les numéros des partants peuvent être repris
+    lignes = conn.execute('SELECT id, partants FROM courses').fetchall()
+    conn.executemany('INSERT OR IGNORE INTO resultats (course_id, numero) VALUES (?, ?)',
+                     [(course_id, int(numero)) for course_id, partants in lignes if partants
+                      for numero in partants.split(',') if numero.strip()])
+
+def _migration_dates_et_index(conn: sqlite3.Connection) -> None:
+    """
+    Dates des courses au format ISO (AAAA-MM-JJ), comparables directement, et index composites des filtres des menus.
+    Une colonne enveloppée dans date() ne peut pas utiliser d'index : les filtres portent sur la colonne nue.
+    """
+    conn.execute('''
+        UPDATE courses SET date_course = substr(date_course, 7, 4) || '-' || substr(date_course, 4, 2) || '-' || substr(date_course, 1, 2)
+        WHERE date_course GLOB '[0-3][0-9]/[01][0-9]/[0-9][0-9][0-9][0-9]'
+    ''')
+    conn.execute('''
+        UPDATE courses SET date_course = date(date_course)
+        WHERE date(date_course) IS NOT NULL AND date_course != date(date_course)
+    ''')
+    # Tri chronologique sans filtre ; discipline (et distance) avec plage de dates, servies triées par l'index
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courses_date ON courses(date_course)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courses_type_date ON courses(type_course, date_course)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courses_type_distance_date ON courses(type_course, distance, date_course)')
+    # Listes de lieux par discipline et distance, et vérification d'une combinaison : lues dans l'index seul
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courses_type_distance_lieu ON courses(type_course, distance, lieu)')
+
+# Positions conservées pour l'arrivée et la synthèse, en colonnes entières arrivee_1..5 et synthese_1..5
+NOMBRE_POSITIONS = 5
+COLONNES_POSITIONS = [f"{champ}_{rang}" for champ in ('arrivee', 'synthese') for rang in range(1, NOMBRE_POSITIONS + 1)]
+# Colonnes écrites à l'insertion d'une course (nom_fichier en dernier : il identifie la ligne dans un lot)
+COLONNES_COURSE = ['date_course', 'lieu', 'type_course', 'distance', 'arrivee', 'synthese', 'partants',
+                   *COLONNES_POSITIONS, 'nom_fichier']
+INSERTION_COURSE = f"INSERT INTO courses ({', '.join(COLONNES_COURSE)}) VALUES ({', '.join('?' * len(COLONNES_COURSE))})"
+
+def decouper_positions(texte: Optional[str]) -> Tuple[Optional[int], ...]:
+    """
+    Découpe une arrivée ("3 - 14 - 9") ou une synthèse ("12e - 5e - 15e") en numéros par position.
+    :return: NOMBRE_POSITIONS entiers, None pour une position absente ou non numérique.
+    """
+    elements = texte.split('-') if texte and texte.strip() else []
+    numeros = [int(element) if element.isdigit() else None
+               for element in (element.strip().lower().rstrip('e') for element in elements[:NOMBRE_POSITIONS])]
+    return tuple(numeros) + (None,) * (NOMBRE_POSITIONS - len(numeros))
+
+def _migration_positions(conn: sqlite3.Connection) -> None:
+    """Colonnes entières par position de l'arrivée et de la synthèse, reprises des chaînes des courses existantes."""
+    for colonne in COLONNES_POSITIONS:
+        conn.execute(f'ALTER TABLE courses ADD COLUMN {colonne} INTEGER')
+    lignes = conn.execute('SELECT id, arrivee, synthese FROM courses').fetchall()
+    conn.executemany(f"UPDATE courses SET {', '.join(f'{colonne} = ?' for colonne in COLONNES_POSITIONS)} WHERE id = ?",
+                     [(*decouper_positions(arrivee), *decouper_positions(synthese), course_id)
+                      for course_id, arrivee, synthese in lignes])
+
+def _migration_version_donnees(conn: sqlite3.Connection) -> None:
+    """Table meta : version des données incrémentée par chaque écriture, lue par les caches de tous les processus."""
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur INTEGER NOT NULL)')
+    conn.execute("INSERT OR IGNORE INTO meta (cle, valeur) VALUES ('version_donnees', 0)")
+
+# Tables d'agrégats tenues à jour par des déclencheurs sur courses : comptes par (discipline, distance, lieu)
+CLES_AGREGATS = ['type_course', 'distance', 'lieu']
+CHAMPS_POSITIONS = ('arrivee', 'synthese')
+TABLES_AGREGATS = {
+    'agregats_courses': ['nombre'],
+    'agregats_numeros': ['champ', 'position', 'numero', 'nombre'],
+    'agregats_combinaisons': ['champ', 'taille', 'n1', 'n2', 'n3', 'nombre'],
+}
+
+def _selections_agregats(table: str, ligne: str) -> List[str]:
+    """
+    SELECT produisant les clés d'agrégat d'une course (une ligne par numéro, couple ou triple) : les valeurs
+    sont lues dans la ligne désignée par ligne ('NEW' ou 'OLD' dans un déclencheur, alias de courses sinon).
+    """
+    cles = ', '.join(f"COALESCE({ligne}.{cle}, '')" for cle in CLES_AGREGATS)
+    if table == 'agregats_courses':
+        return [f"SELECT {cles}"]
+    selections = []
+    for champ in CHAMPS_POSITIONS:
+        colonnes = [f"{ligne}.{champ}_{rang}" for rang in range(1, NOMBRE_POSITIONS + 1)]
+        if table == 'agregats_numeros':
+            selections += [f"SELECT {cles}, '{champ}', {rang}, {colonne} WHERE {colonne} IS NOT NULL"
+                           for rang, colonne in enumerate(colonnes, start=1)]
+            continue
+        # Couples et triples de numéros, triés (n3 = 0 pour un couple), comme combinations() sur les numéros présents
+        for taille in (2, 3):
+            for combinaison in combinations(colonnes, taille):
+                petit, grand = f"min({', '.join(combinaison)})", f"max({', '.join(combinaison)})"
+                numeros = [petit, grand, '0'] if taille == 2 else [petit, f"{' + '.join(combinaison)} - {petit} - {grand}", grand]
+                selections.append(f"SELECT {cles}, '{champ}', {taille}, {', '.join(numeros)} "
+                                  f"WHERE {' AND '.join(f'{colonne} IS NOT NULL' for colonne in combinaison)}")
+    return selections
+
+def _reporter_agregats(conn: sqlite3.Connection, table_courses: str = 'courses', signe: int = 1) -> None:
+    """
+    Ajoute aux tables d'agrégats les comptes des courses de table_courses (reprise de l'existant, saison archivée),
+    ou les en retire avec signe=-1 (course supprimée d'une partition, que les déclencheurs ne suivent pas).
+    """
+    for table, colonnes in TABLES_AGREGATS.items():
+        cles = CLES_AGREGATS + colonnes[:-1]
+        selections = [selection.replace(' WHERE ', f' FROM {table_courses} c WHERE ') if ' WHERE ' in selection
+                      else selection + f' FROM {table_courses} c' for selection in _selections_agregats(table, 'c')]
+        conn.execute(f"INSERT INTO {table} SELECT *, {int(signe)} * COUNT(*) FROM ({' UNION ALL '.join(selections)}) WHERE true "
+                     f"GROUP BY {', '.join(f'{indice}' for indice in range(1, len(cles) + 1))} "
+                     f"ON CONFLICT ({', '.join(cles)}) DO UPDATE SET nombre = nombre + excluded.nombre")
+
+def _migration_agregats(conn: sqlite3.Connection) -> None:
+    """
+    Tables d'agrégats des fréquences (courses, numéros par position, couples et triples) et déclencheurs
+    qui les tiennent à jour à chaque insertion, suppression ou modification d'une course.
+    """
+    for table, colonnes in TABLES_AGREGATS.items():
+        cles = CLES_AGREGATS + colonnes[:-1]
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {', '.join(f"{cle} NOT NULL" for cle in cles)}, nombre INTEGER NOT NULL,
+                PRIMARY KEY ({', '.join(cles)})
+            ) WITHOUT ROWID
+        ''')
+    # Reprise des courses existantes
+    _reporter_agregats(conn)
+
+    colonnes_suivies = ['type_course', 'distance', 'lieu', *COLONNES_POSITIONS]
+    for evenement, lignes in (('INSERT', [('NEW', 1)]), ('DELETE', [('OLD', -1)]),
+                              (f"UPDATE OF {', '.join(colonnes_suivies)}", [('OLD', -1), ('NEW', 1)])):
+        instructions = []
+        for table, colonnes in TABLES_AGREGATS.items():
+            cles = CLES_AGREGATS + colonnes[:-1]
+            for ligne, increment in lignes:
+                instructions.append(f'''
+                    INSERT INTO {table} SELECT *, {increment} FROM ({' UNION ALL '.join(_selections_agregats(table, ligne))}) WHERE true
+                    ON CONFLICT ({', '.join(cles)}) DO UPDATE SET nombre = nombre + excluded.nombre;''')
+        nom = f"agregats_{evenement.split()[0].lower()}"
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {nom} AFTER {evenement} ON courses BEGIN {''.join(instructions)} END")
+
+# Tables de dimensions : {table: (colonne texte de courses, colonne de la clé entière)}
+DIMENSIONS = {
+    'disciplines': ('type_course', 'discipline_id'),
+    'distances': ('distance', 'distance_id'),
+    'lieux': ('lieu', 'lieu_id'),
+}
+
+def _instructions_dimensions(ligne: str) -> str:
+    """Instructions d'un déclencheur : inscrit les valeurs de la ligne NEW dans les dimensions et renseigne ses clés."""
+    instructions = [f"INSERT OR IGNORE INTO {table} (nom) SELECT {ligne}.{colonne} WHERE {ligne}.{colonne} IS NOT NULL;"
+                    for table, (colonne, _) in DIMENSIONS.items()]
+    cles = ', '.join(f"{cle} = (SELECT id FROM {table} WHERE nom = {ligne}.{colonne})"
+                     for table, (colonne, cle) in DIMENSIONS.items())
+    return ' '.join(instructions) + f" UPDATE courses SET {cles} WHERE id = {ligne}.id;"
+
+def _migration_dimensions(conn: sqlite3.Connection) -> None:
+    """
+    Tables de dimensions (disciplines, distances, lieux) à clé entière, référencées par les courses ;
+    les colonnes texte sont conservées pour les requêtes existantes. Des déclencheurs renseignent les clés
+    à chaque insertion ou modification d'une course.
+    """
+    for table, (colonne, cle) in DIMENSIONS.items():
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, nom TEXT NOT NULL UNIQUE)')
+        conn.execute(f'ALTER TABLE courses ADD COLUMN {cle} INTEGER REFERENCES {table}(id)')
+        conn.execute(f'INSERT OR IGNORE INTO {table} (nom) SELECT DISTINCT {colonne} FROM courses WHERE {colonne} IS NOT NULL ORDER BY 1')
+        conn.execute(f'UPDATE courses SET {cle} = (SELECT id FROM {table} WHERE nom = courses.{colonne})')
+    # Arbre des facettes : comptes par combinaison lus dans l'index seul
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_courses_dimensions ON courses(discipline_id, distance_id, lieu_id)')
+    colonnes = ', '.join(colonne for colonne, _ in DIMENSIONS.values())
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS dimensions_insert AFTER INSERT ON courses BEGIN {_instructions_dimensions('NEW')} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS dimensions_update AFTER UPDATE OF {colonnes} ON courses "
+                 f"BEGIN {_instructions_dimensions('NEW')} END")
+
+def _migration_partitions(conn: sqlite3.Connection) -> None:
+    """Catalogue des partitions : une base SQLite par saison archivée, attachée aux connexions (voir Database.archiver_saison)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS partitions (
+            nom TEXT PRIMARY KEY,
+            chemin TEXT NOT NULL,
+            date_debut TEXT NOT NULL,
+            date_fin TEXT NOT NULL,
+            lecture_seule INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+
+# État incrémental des écarts (ecarts.EtatEcarts) enregistré par portée : discipline et distance ('' pour toutes)
+CLES_ECARTS = ['type_course', 'distance', 'champ', 'rang', 'n1', 'n2', 'n3']
+# Au-delà de ce nombre de courses nouvelles, Database.etat_ecarts recalcule l'état d'un coup plutôt que course par course
+SEUIL_RECALCUL_ECARTS = 1000
+
+def _condition_portees_ecarts(ligne: str, comparaison: str) -> str:
+    """
+    Portées de l'état des écarts qui contiennent la course de la ligne NEW ou OLD d'un déclencheur, quand cette course
+    précède (comparaison '<') ou ne suit pas ('<=') la dernière course prise en compte.
+    """
+    return (f"type_course IN ('', COALESCE({ligne}.type_course, '')) AND distance IN ('', COALESCE({ligne}.distance, '')) "
+            f"AND (COALESCE({ligne}.date_course, ''), {ligne}.id) {comparaison} (COALESCE(date_course, ''), course_id)")
+
+def _migration_ecarts(conn: sqlite3.Connection) -> None:
+    """
+    Tables de l'état incrémental des écarts, tenu à jour par Database.etat_ecarts : portées (compteurs de courses et
+    dernière course prise en compte), clés et histogrammes de leurs écarts entre occurrences. Les déclencheurs marquent
+    périmées les portées dont l'ordre chronologique est rompu : course insérée avant la dernière prise en compte,
+    course déjà prise en compte modifiée ou supprimée.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ecarts_portees (
+            type_course TEXT NOT NULL,
+            distance TEXT NOT NULL,
+            nombre_courses INTEGER NOT NULL,
+            nombre_syntheses INTEGER NOT NULL,
+            date_course TEXT,
+            course_id INTEGER,
+            perimee INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (type_course, distance)
+        ) WITHOUT ROWID
+    ''')
+    cles = ', '.join(f"{cle} NOT NULL" for cle in CLES_ECARTS)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS ecarts_cles (
+            {cles}, premiere INTEGER NOT NULL, derniere INTEGER NOT NULL, ecart_max INTEGER NOT NULL,
+            occurrences INTEGER NOT NULL, apparitions INTEGER NOT NULL, dates TEXT,
+            PRIMARY KEY ({', '.join(CLES_ECARTS)})
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS ecarts_histogrammes (
+            {cles}, ecart INTEGER NOT NULL, nombre INTEGER NOT NULL,
+            PRIMARY KEY ({', '.join(CLES_ECARTS)}, ecart)
+        ) WITHOUT ROWID
+    ''')
+    colonnes_suivies = ['date_course', 'type_course', 'distance', *COLONNES_POSITIONS]
+    for evenement, lignes in (('INSERT', [('NEW', '<')]), ('DELETE', [('OLD', '<=')]),
+                              (f"UPDATE OF {', '.join(colonnes_suivies)}", [('OLD', '<='), ('NEW', '<=')])):
+        condition = ' OR '.join(f"({_condition_portees_ecarts(ligne, comparaison)})" for ligne, comparaison in lignes)
+        nom = f"ecarts_{evenement.split()[0].lower()}"
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {nom} AFTER {evenement} ON courses "
+                     f"BEGIN UPDATE ecarts_portees SET perimee = 1 WHERE perimee = 0 AND ({condition}); END")
+
+def _migration_ecarts_syntheses(conn: sqlite3.Connection) -> None:
+    """
+    États des écarts enregistrés marqués périmés : une synthèse y comptait seulement si sa première position était un
+    numéro ; elle compte désormais dès que l'une de ses positions en est un (recalcul au prochain appel).
+    """
+    conn.execute('UPDATE ecarts_portees SET perimee = 1')
+
+# Migrations du schéma, appliquées dans l'ordre ; leur rang est enregistré dans PRAGMA user_version
+MIGRATIONS = [
+    _migration_resultats,
+    _migration_dates_et_index,
+    _migration_positions,
+    _migration_version_donnees,
+    _migration_agregats,
+    _migration_dimensions,
+    _migration_partitions,
+    _migration_ecarts,
+    _migration_ecarts_syntheses,
+]
+
+# Alias d'ATTACH d'une saison archivée (partition) : saison_<année>
+PREFIXE_PARTITION = 'saison_'
+
+def _cle_chronologique(ligne: sqlite3.Row) -> Tuple[bool, str, int]:
+    """Clé (date_course, id) d'une ligne de courses, les dates absentes en premier comme dans ORDER BY."""
+    return ligne['date_course'] is not None, ligne['date_course'] or '', ligne['id']
+
+def _fusionner(flux: List[Iterable[Any]], decroissant: bool = False,
+               cle: Callable[[Any], Any] = _cle_chronologique) -> Iterable[Any]:
+    """Fusionne les lignes de plusieurs sources, chacune déjà triée par (date_course, id), en conservant l'ordre."""
+    if len(flux) == 1:
+        return flux[0]
+    return heapq.merge(*flux, key=cle, reverse=decroissant)
+
+def _trier_facettes(valeurs: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Trie les valeurs d'un niveau de l'arbre des facettes, None (valeur absente de la note) en dernier."""
+    return sorted(valeurs, key=lambda valeur: (valeur is None, valeur or ''))
+
+def date_iso(valeur: Any) -> Optional[str]:
+    """
+    Normalise une date au format stocké dans la base (AAAA-MM-JJ).
+    :param valeur: date, datetime, ou chaîne "AAAA-MM-JJ" (éventuellement suivie d'une heure) ou "JJ/MM/AAAA".
+    :return: La date au format ISO, ou None si la valeur n'est pas reconnue.
+    """
+    if isinstance(valeur, (date, datetime)):
+        return valeur.strftime('%Y-%m-%d')
+    texte = str(valeur).strip()[:10]
+    for format_date in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(texte, format_date).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+def lire_numeros(texte: Optional[str]) -> Tuple[int, ...]:
+    """
+    Numéros d'une arrivée ou d'une synthèse, dans l'ordre ("13 - 5 - 6", "2e - 1e - 5e").
+    Les éléments qui ne sont pas des numéros sont ignorés.
+    """
+    return tuple(numero for numero in lire_positions(texte) if numero)
+
+def lire_positions(texte: Optional[str]) -> Tuple[int, ...]:
+    """
+    Numéros d'une arrivée ou d'une synthèse par position ("14 - NP - 3" -> (14, 0, 3)) : 0 pour un élément
+    qui n'est pas un numéro, comme les positions absentes d'un CourseFrame. Les éléments vides sont ignorés.
+    """
+    positions = []
+    for element in (texte or '').split('-'):
+        element = element.strip()
+        if element:
+            element = element.replace('e', '')
+            positions.append(int(element) if element.isdigit() else 0)
+    return tuple(positions)
+
+def lire_partants(valeur: Any) -> FrozenSet[int]:
+    """Numéros partants, stockés en base sous la forme "1,2,3" ou fournis en liste par le parseur."""
+    if not valeur:
+        return frozenset()
+    elements = valeur.split(',') if isinstance(valeur, str) else valeur
+    try:
+        return frozenset(map(int, elements))
+    except ValueError:
+        return frozenset(int(element) for element in elements if str(element).strip().isdigit())
+
+class CourseAnalysee(Mapping):
+    """
+    Course lue une seule fois pour les fonctions d'analyse : arrivée et synthèse en tuples d'entiers, par position
+    (lire_positions) et sans les éléments non numériques (lire_numeros), partants en frozenset, date en ordinal
+    (date.toordinal, 0 si la date n'est pas reconnue).
+    Se lit comme le dictionnaire de get_courses (course['arrivee'], course.get('lieu'), dict(course)) mais
+    ne se modifie pas : une même liste de courses peut être partagée par tous les appelants.
+    """
+    __slots__ = ('donnees', 'arrivee_positions', 'synthese_positions', 'arrivee_numeros', 'synthese_numeros',
+                 'partants_numeros', 'jour')
+
+    def __init__(self, course: Dict[str, Any]):
+        self.donnees = course
+        self.arrivee_positions = lire_positions(course.get('arrivee'))
+        self.synthese_positions = lire_positions(course.get('synthese'))
+        # Même tuple que les positions quand tous les éléments sont des numéros (cas courant)
+        self.arrivee_numeros = self._sans_absents(self.arrivee_positions)
+        self.synthese_numeros = self._sans_absents(self.synthese_positions)
+        self.partants_numeros = lire_partants(course.get('partants'))
+        self.jour = self._jour(course.get('date_course'))
+
+    @staticmethod
+    def _jour(valeur: Any) -> int:
+        if not valeur:
+            return 0
+        try:
+            return date.fromisoformat(str(valeur)[:10]).toordinal()
+        except ValueError:
+            iso = date_iso(valeur)
+            return date.fromisoformat(iso).toordinal() if iso else 0
+
+    @staticmethod
+    def _sans_absents(positions: Tuple[int, ...]) -> Tuple[int, ...]:
+        return tuple(numero for numero in positions if numero) if 0 in positions else positions
+
+    def numeros(self, champ: str) -> Tuple[int, ...]:
+        """Numéros de l'arrivée ('arrivee') ou de la synthèse ('synthese')."""
+        return self.arrivee_numeros if champ == 'arrivee' else self.synthese_numeros
+
+    def positions(self, champ: str) -> Tuple[int, ...]:
+        """Numéros de l'arrivée ou de la synthèse par position, 0 pour un élément non numérique."""
+        return self.arrivee_positions if champ == 'arrivee' else self.synthese_positions
+
+    def __getitem__(self, cle: str) -> Any:
+        return self.donnees[cle]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.donnees)
+
+    def __len__(self) -> int:
+        return len(self.donnees)
+
+    def __repr__(self) -> str:
+        return f"CourseAnalysee({self.donnees!r})"
+
+def preparer_courses(courses: Iterable[Mapping[str, Any]]) -> List[CourseAnalysee]:
+    """Lit une fois des courses au format de get_courses pour les fonctions d'analyse (sans relire les CourseAnalysee)."""
+    return [course if isinstance(course, CourseAnalysee) else CourseAnalysee(dict(course)) for course in courses]
+
+class _CurseurMiroir:
+    """
+    Curseur d'écriture du mode miroir : chaque instruction est exécutée sur le disque puis sur la copie en mémoire
+    (les SELECT seulement sur le disque). Les résultats, lastrowid et rowcount sont ceux du disque.
+    """
+
+    def __init__(self, disque: sqlite3.Cursor, memoire: sqlite3.Cursor):
+        self._disque = disque
+        self._memoire = memoire
+
+    def execute(self, sql: str, params: Any = ()) -> '_CurseurMiroir':
+        self._disque.execute(sql, params)
+        if not sql.lstrip().upper().startswith('SELECT'):
+            self._memoire.execute(sql, params).fetchall()
+        return self
+
+    def executemany(self, sql: str, params: Iterable[Any]) -> '_CurseurMiroir':
+        params = list(params)  # Parcourus deux fois
+        self._disque.executemany(sql, params)
+        self._memoire.executemany(sql, params)
+        return self
+
+    def __getattr__(self, nom: str) -> Any:
+        return getattr(self._disque, nom)
+
+class _ConnexionMiroir:
+    """
+    Connexion d'écriture du mode miroir, utilisable comme sqlite3.Connection par les méthodes d'écriture :
+    transactions menées en parallèle sur le disque et sur la copie en mémoire, validées ou annulées ensemble.
+    Le verrou sérialise les écritures des différents fils sur la connexion unique au disque.
+    """
+
+    def __init__(self, disque: sqlite3.Connection, memoire: sqlite3.Connection, verrou: threading.RLock):
+        self._disque = disque
+        self._memoire = memoire
+        self._verrou = verrou
+
+    def cursor(self) -> _CurseurMiroir:
+        return _CurseurMiroir(self._disque.cursor(), self._memoire.cursor())
+
+    def execute(self, sql: str, params: Any = ()) -> _CurseurMiroir:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, params: Iterable[Any]) -> _CurseurMiroir:
+        return self.cursor().executemany(sql, params)
+
+    def commit(self) -> None:
+        self._disque.commit()  # Le disque d'abord : la copie ne contient jamais une écriture non durable
+        self._memoire.commit()
+
+    def rollback(self) -> None:
+        self._disque.rollback()
+        self._memoire.rollback()
+
+    def __enter__(self) -> '_ConnexionMiroir':
+        self._verrou.acquire()
+        return self
+
+    def __exit__(self, type_exception, *exc) -> None:
+        try:
+            if type_exception is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self._verrou.release()
+
 class Database:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, profil: Optional[str] = None, taille_cache: int = TAILLE_CACHE_COURSES,
+                 miroir: Optional[bool] = None):
+        """
+        :param db_path: Chemin de la base SQLite, ou ':memory:'.
+        :param profil: Nom du profil de pragmas (clé de PROFILS) ; PROFIL_PAR_DEFAUT s'il est absent.
+        :param taille_cache: Nombre de résultats de get_courses conservés (0 désactive le cache).
+        :param miroir: Charge la base dans une copie en mémoire qui sert toutes les lectures ; les écritures sont
+                       faites sur le disque puis sur la copie. MIROIR_PAR_DEFAUT s'il est absent (sans effet sur ':memory:').
+        """
         self.db_path = db_path
+        self.profil = profil or PROFIL_PAR_DEFAUT
+        if self.profil not in PROFILS:
+            raise ValueError(f"Profil de base inconnu : {self.profil} (disponibles : {', '.join(PROFILS)})")
+        # Connexions longues : une par fil, créée au premier accès, fermée par fermer()
+        self._local = threading.local()
+        self._connexions: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._verrou_connexions = threading.Lock()
+        self._connexion_memoire: Optional[sqlite3.Connection] = None
+        if db_path == ':memory:':
+            # Base en mémoire partagée entre les connexions de cette instance, conservée tant qu'elle est ouverte
+            self._cible, self._uri = f"file:courses_memoire_{id(self)}?mode=memory&cache=shared", True
+            self._connexion_memoire = self._ouvrir()
+        else:
+            self._cible, self._uri = db_path, False
+        # Mode miroir : connexion unique au disque pour les écritures, la copie en mémoire sert les lectures
+        self.miroir = (MIROIR_PAR_DEFAUT if miroir is None else miroir) and not self._uri
+        self._disque: Optional[sqlite3.Connection] = None
+        self._verrou_disque = threading.RLock()
+        # Version des données en mémoire : incrémentée après chaque écriture de courses, notifiée aux abonnés
+        self.version_donnees = 0
+        self._abonnes_version: List[Callable[[int], None]] = []
+        self._verrou_version = threading.Lock()
+        # Cache LRU de get_courses : {filtres: (version de la base, courses)}, vidé quand la version change
+        self.taille_cache = taille_cache
+        self._cache_courses: OrderedDict = OrderedDict()
+        self._verrou_cache = threading.Lock()
+        self.cache_succes = 0
+        self.cache_echecs = 0
+        # Arbre des facettes (version de la base, {discipline: {distance: {lieu: nombre}}}), voir facettes()
+        self._facettes: Optional[Tuple[int, Dict]] = None
+        # Lignes lues dans les partitions en lecture seule : {(partition, requête, paramètres): lignes}, jamais périmées
+        self._cache_partitions: OrderedDict = OrderedDict()
+        # États incrémentaux des écarts par portée : {(discipline, distance): (version de la base, EtatEcarts)}
+        self._etats_ecarts: Dict[Tuple[str, str], Tuple[int, Any]] = {}
+        self._verrou_ecarts = threading.Lock()
         print(f"Chemin de la base de données : {self.db_path}")
         self.init_db()  # Appeler init_db() pour créer la base de données si elle n'existe pas
+        if self.miroir:
+            self._charger_miroir()
+
+    def _ouvrir(self) -> sqlite3.Connection:
+        # check_same_thread=False : chaque connexion n'est utilisée que par son fil, mais fermer() peut la fermer depuis un autre
+        conn = sqlite3.connect(self._cible, uri=self._uri, timeout=DELAI_VERROU,
+                               cached_statements=TAILLE_CACHE_REQUETES, check_same_thread=False)
+        for pragma, valeur in PROFILS[self.profil].items():
+            if pragma == 'journal_mode' and self._uri:
+                continue  # Une base en mémoire n'a pas de journal sur disque
+            conn.execute(f'PRAGMA {pragma} = {valeur}')
+        return conn
+
+    def connexion(self) -> sqlite3.Connection:
+        """
+        Retourne la connexion du fil courant, ouverte au premier appel puis réutilisée.
+        À utiliser comme le faisait sqlite3.connect : "with db.connexion() as conn:" valide ou annule
+        la transaction en sortie de bloc, sans fermer la connexion.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._ouvrir()
+            fil = threading.current_thread()
+            with self._verrou_connexions:
+                # Les connexions des fils terminés (ex. exécutions Streamlit successives) sont fermées au passage
+                for ancien in [f for f in self._connexions if not f.is_alive()]:
+                    self._connexions.pop(ancien).close()
+                self._connexions[fil] = conn
+            self._local.conn = conn
+        return conn
+
+    def _charger_miroir(self) -> None:
+        """Copie la base du disque dans une base en mémoire partagée (API de sauvegarde) et y redirige les connexions des fils."""
+        self._disque = self._ouvrir()
+        self._cible, self._uri = f"file:/courses_miroir_{id(self)}?vfs=memdb", True
+        self._connexion_memoire = self._ouvrir()
+        self._copier_disque()
+        # Les connexions ouvertes sur le disque par init_db sont remplacées par des connexions à la copie
+        with self._verrou_connexions:
+            connexions = list(self._connexions.values())
+            self._connexions.clear()
+        for conn in connexions:
+            conn.close()
+        self._local = threading.local()
+        print(f"Base chargée en mémoire ({self._disque.execute('PRAGMA page_count').fetchone()[0]} pages)")
+
+    def _copier_disque(self) -> None:
+        """
+        Copie la base du disque dans la base en mémoire. Le VFS memdb n'accepte pas l'en-tête d'une base WAL :
+        la copie passe par une base privée dont l'en-tête est ramené au journal classique.
+        """
+        donnees = bytearray(self._disque.serialize())
+        donnees[18:20] = b'\x01\x01'  # Versions d'écriture et de lecture du format : 2 en WAL
+        privee = sqlite3.connect(':memory:')
+        privee.deserialize(bytes(donnees))
+        privee.backup(self._connexion_memoire)
+        privee.close()
+
+    def rafraichir_miroir(self) -> bool:
+        """
+        Recharge la copie en mémoire si la base du disque a été modifiée par un autre processus (version des données).
+        À appeler sans lecture en cours sur la copie.
+        :return: True si la copie a été rechargée.
+        """
+        if self._disque is None:
+            return False
+        with self._verrou_disque:
+            ligne = self._disque.execute("SELECT valeur FROM meta WHERE cle = 'version_donnees'").fetchone()
+            if (ligne[0] if ligne else 0) == self.version_base():
+                return False
+            self._copier_disque()
+        self.vider_cache()
+        return True
+
+    def _connexion_ecriture(self) -> Union[sqlite3.Connection, _ConnexionMiroir]:
+        """Connexion des méthodes d'écriture : celle du fil, ou en mode miroir le disque doublé de la copie en mémoire."""
+        if self._disque is None:
+            return self.connexion()
+        return _ConnexionMiroir(self._disque, self.connexion(), self._verrou_disque)
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> Tuple[int, int, int]:
+        """
+        Reporte le journal WAL dans la base (sans effet hors mode WAL).
+        :param mode: PASSIVE (n'attend pas les lecteurs), FULL, RESTART ou TRUNCATE (vide aussi le fichier -wal).
+        :return: (1 si le checkpoint a été bloqué sinon 0, pages du journal, pages reportées).
+        """
+        if mode.upper() not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"Mode de checkpoint inconnu : {mode}")
+        if self._disque is not None:
+            with self._verrou_disque:
+                return tuple(self._disque.execute(f'PRAGMA wal_checkpoint({mode.upper()})').fetchone())
+        return tuple(self.connexion().execute(f'PRAGMA wal_checkpoint({mode.upper()})').fetchone())
+
+    def fermer(self) -> None:
+        """Ferme toutes les connexions ouvertes par cette instance (à appeler quand les fils n'utilisent plus la base)."""
+        if PROFILS[self.profil].get('journal_mode') == 'WAL' and (not self._uri or self._disque is not None):
+            try:
+                self.checkpoint('TRUNCATE')
+            except sqlite3.Error as e:
+                print(f"Checkpoint impossible à la fermeture : {e}")
+        with self._verrou_connexions:
+            connexions = list(self._connexions.values())
+            self._connexions.clear()
+        for conn in connexions:
+            conn.close()
+        self._local = threading.local()
+        if self._connexion_memoire is not None:
+            self._connexion_memoire.close()
+            self._connexion_memoire = None
+        if self._disque is not None:
+            # La copie en mémoire est perdue : l'instance revient aux connexions directes au disque
+            self._disque.close()
+            self._disque = None
+            self._cible, self._uri = self.db_path, False
+
+    def __enter__(self) -> 'Database':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fermer()
 
     def init_db(self) -> None:
         """Initialise la base de données."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connexion() as conn:
             cur = conn.cursor()
             cur.execute('''
                 CREATE TABLE IF NOT EXISTS fichiers_traites (
@@ -37,9 +697,318 @@ class Database:
                     FOREIGN KEY (nom_fichier) REFERENCES fichiers_traites(nom_fichier)
                 )
             ''')
+            # Manifeste d'ingestion : état de chaque fichier lors de son dernier traitement réussi
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS manifeste_ingestion (
+                    nom_fichier TEXT PRIMARY KEY,
+                    taille INTEGER,
+                    mtime_ns INTEGER,
+                    empreinte TEXT,
+                    doublon_de TEXT
+                )
+            ''')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_manifeste_empreinte ON manifeste_ingestion(empreinte)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_courses_nom_fichier ON courses(nom_fichier)')
             conn.commit()
+            self._migrer(conn)
             print("Base de données initialisée avec succès.")
+
+    def _migrer(self, conn: sqlite3.Connection) -> None:
+        """Applique les migrations dont le numéro dépasse PRAGMA user_version, chacune dans sa transaction."""
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for numero, migration in enumerate(MIGRATIONS, start=1):
+            if numero <= version:
+                continue
+            try:
+                migration(conn)
+                conn.execute(f'PRAGMA user_version = {numero}')
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
     
+    def abonner_version_donnees(self, rappel: Callable[[int], None]) -> None:
+        """
+        Abonne un rappel au signal "version des données modifiée" (caches en mémoire, tableaux de bord).
+        :param rappel: Fonction appelée avec la nouvelle version après chaque lot de courses écrit.
+        """
+        with self._verrou_version:
+            self._abonnes_version.append(rappel)
+
+    def desabonner_version_donnees(self, rappel: Callable[[int], None]) -> None:
+        """Retire un rappel abonné avec abonner_version_donnees."""
+        with self._verrou_version:
+            if rappel in self._abonnes_version:
+                self._abonnes_version.remove(rappel)
+
+    def _signaler_changement(self) -> None:
+        """Incrémente la version des données et prévient les abonnés (une erreur d'abonné n'interrompt pas l'écriture)."""
+        with self._verrou_version:
+            self.version_donnees += 1
+            version = self.version_donnees
+            abonnes = list(self._abonnes_version)
+        for rappel in abonnes:
+            try:
+                rappel(version)
+            except Exception as e:
+                print(f"Erreur dans un abonné au changement de données : {e}")
+
+    @staticmethod
+    def _incrementer_version_base(cur: sqlite3.Cursor) -> int:
+        """
+        Incrémente la version des données stockée en base, dans la transaction de l'écriture.
+        :return: La nouvelle version.
+        """
+        return cur.execute("UPDATE meta SET valeur = valeur + 1 WHERE cle = 'version_donnees' RETURNING valeur").fetchone()[0]
+
+    def version_base(self) -> int:
+        """Version des données stockée en base : change à chaque écriture, quel que soit le processus."""
+        with self.connexion() as conn:
+            ligne = conn.execute("SELECT valeur FROM meta WHERE cle = 'version_donnees'").fetchone()
+        return ligne[0] if ligne else 0
+
+    def statistiques_cache(self) -> Dict[str, int]:
+        """Compteurs du cache de get_courses : succès, échecs et nombre d'entrées."""
+        with self._verrou_cache:
+            return {'succes': self.cache_succes, 'echecs': self.cache_echecs, 'entrees': len(self._cache_courses)}
+
+    def vider_cache(self) -> None:
+        """Vide le cache de get_courses, l'arbre des facettes et les états des écarts en mémoire (les compteurs sont conservés)."""
+        with self._verrou_cache:
+            self._cache_courses.clear()
+            self._facettes = None
+            self._cache_partitions.clear()
+        with self._verrou_ecarts:
+            self._etats_ecarts.clear()
+
+    def facettes(self) -> Dict[Optional[str], Dict[Optional[str], Dict[Optional[str], int]]]:
+        """
+        Arbre des facettes {discipline: {distance: {lieu: nombre de courses}}}, conservé en mémoire.
+        Il est reconstruit depuis les clés des dimensions quand la version des données en base a changé
+        (écriture d'un autre processus, suppression de doublons) ; les insertions de cette instance le mettent à jour.
+        L'arbre renvoyé est partagé : il ne doit pas être modifié.
+        """
+        version = self.version_base()
+        with self._verrou_cache:
+            if self._facettes is not None and self._facettes[0] == version:
+                return self._facettes[1]
+        with self.connexion() as conn:
+            noms = {table: dict(conn.execute(f'SELECT id, nom FROM {table}')) for table in DIMENSIONS}
+            # Les partitions partagent les clés des dimensions de la base courante
+            lignes = [ligne for schema, _ in self._sources() for ligne in conn.execute(f'''
+                SELECT discipline_id, distance_id, lieu_id, COUNT(*) FROM {schema}.courses
+                GROUP BY discipline_id, distance_id, lieu_id
+            ''')]
+        arbre: Dict = {}
+        for discipline, distance, lieu, nombre in lignes:
+            lieux = arbre.setdefault(noms['disciplines'].get(discipline), {}).setdefault(noms['distances'].get(distance), {})
+            lieu = noms['lieux'].get(lieu)
+            lieux[lieu] = lieux.get(lieu, 0) + nombre
+        with self._verrou_cache:
+            self._facettes = (version, arbre)
+        return arbre
+
+    def _mettre_a_jour_facettes(self, version: int, ajoutees: Iterable[Tuple[Any, Any, Any]],
+                                retirees: Iterable[Tuple[Any, Any, Any]] = ()) -> None:
+        """
+        Reporte une écriture de cette instance dans l'arbre des facettes, s'il était à jour juste avant elle
+        (sinon il sera reconstruit au prochain accès). L'arbre est recopié : les lecteurs gardent une version cohérente.
+        :param version: Version de la base après l'écriture.
+        :param ajoutees: (discipline, distance, lieu) des courses insérées.
+        :param retirees: (discipline, distance, lieu) des courses supprimées.
+        """
+        with self._verrou_cache:
+            if self._facettes is None or self._facettes[0] != version - 1:
+                self._facettes = None
+                return
+            arbre = {discipline: {distance: dict(lieux) for distance, lieux in distances.items()}
+                     for discipline, distances in self._facettes[1].items()}
+            for combinaisons, increment in ((retirees, -1), (ajoutees, 1)):
+                for discipline, distance, lieu in combinaisons:
+                    lieux = arbre.setdefault(discipline, {}).setdefault(distance, {})
+                    lieux[lieu] = lieux.get(lieu, 0) + increment
+                    if lieux[lieu] <= 0:
+                        del lieux[lieu]
+                        if not lieux:
+                            del arbre[discipline][distance]
+                        if not arbre[discipline]:
+                            del arbre[discipline]
+            self._facettes = (version, arbre)
+
+    def obtenir_disciplines_disponibles(self) -> List[Optional[str]]:
+        """Retourne les disciplines présentes dans la base, triées (lues dans l'arbre des facettes)."""
+        return _trier_facettes(self.facettes())
+
+    def obtenir_distances_disponibles(self, discipline: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Retourne les distances présentes dans la base, triées (lues dans l'arbre des facettes).
+        :param discipline: Limite aux distances courues dans cette discipline (toutes si None).
+        """
+        arbre = self.facettes()
+        if discipline is not None:
+            return _trier_facettes(arbre.get(discipline, {}))
+        return _trier_facettes({distance for distances in arbre.values() for distance in distances})
+
+    def obtenir_lieux_disponibles(self, discipline: Optional[str] = None, distance: Optional[str] = None) -> List[Optional[str]]:
+        """
+        Retourne les lieux présents dans la base, triés (lus dans l'arbre des facettes).
+        :param discipline: Limite aux lieux de cette discipline (toutes si None).
+        :param distance: Limite aux lieux de cette distance (toutes si None).
+        """
+        return _trier_facettes({lieu for nom, distances in self.facettes().items() if discipline is None or nom == discipline
+                                for nom_distance, lieux in distances.items() if distance is None or nom_distance == distance
+                                for lieu in lieux})
+
+    def partitions(self) -> List[Tuple[str, str, str, str, bool]]:
+        """
+        Catalogue des saisons archivées, dans l'ordre chronologique.
+        :return: Liste de (nom, chemin du fichier, date_debut, date_fin, lecture_seule).
+        """
+        with self.connexion() as conn:
+            lignes = conn.execute('SELECT nom, chemin, date_debut, date_fin, lecture_seule FROM partitions ORDER BY date_debut').fetchall()
+        dossier = os.path.dirname(os.path.abspath(self.db_path))
+        return [(nom, os.path.join(dossier, chemin), debut, fin, bool(lecture_seule)) for nom, chemin, debut, fin, lecture_seule in lignes]
+
+    def _sources(self, date_debut: Optional[str] = None, date_fin: Optional[str] = None) -> Iterator[Tuple[str, bool]]:
+        """
+        Schémas à interroger pour une période : les partitions dont la période recoupe les filtres, puis la base courante.
+        Chaque partition est attachée à la connexion du fil au moment où elle est produite (voir _attacher).
+        :return: (schéma, lecture_seule), dans l'ordre chronologique des partitions, 'main' en dernier.
+        """
+        debut, fin = date_debut and date_iso(date_debut), date_fin and date_iso(date_fin)
+        for nom, _, debut_partition, fin_partition, lecture_seule in self.partitions():
+            if (debut and fin_partition < debut) or (fin and debut_partition > fin):
+                continue
+            self._attacher(nom)
+            yield nom, lecture_seule
+        yield 'main', False
+
+    def _attacher(self, schema: str) -> None:
+        """
+        Attache une partition à la connexion du fil si elle ne l'est pas déjà. SQLite limite le nombre de bases
+        attachées (10 par défaut) : au-delà, la partition utilisée le moins récemment et sans lecture en cours est détachée.
+        """
+        if schema == 'main':
+            return
+        conn = self.connexion()
+        attachees = self._local.__dict__.setdefault('partitions', OrderedDict())
+        if schema in attachees:
+            attachees.move_to_end(schema)
+            return
+        for ancienne in list(attachees):
+            if len(attachees) < conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+                break
+            try:
+                conn.execute(f'DETACH DATABASE {ancienne}')
+                del attachees[ancienne]
+            except sqlite3.OperationalError:
+                continue  # Lecture en cours sur cette partition
+        chemin, lecture_seule = {nom: (chemin, lecture_seule) for nom, chemin, _, _, lecture_seule in self.partitions()}[schema]
+        if lecture_seule:
+            # Fichier figé : ni verrou ni détection de changement, et tout le fichier tient dans le cache de pages
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (f"file:{quote(chemin)}?mode=ro&immutable=1",))
+            conn.execute(f'PRAGMA {schema}.cache_size = {-(os.path.getsize(chemin) // 1024 + 1)}')
+        else:
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (chemin,))
+        attachees[schema] = lecture_seule
+
+    def _lignes(self, schema: str, lecture_seule: bool, query: str, params: List[Any],
+                taille_lot: int = 500) -> Iterator[sqlite3.Row]:
+        """
+        Lignes d'une requête sur un schéma, lues par lots. Celles d'une partition en lecture seule sont
+        conservées dans un cache LRU (taille_cache entrées), indépendant des écritures de la base courante.
+        """
+        cle = (schema, query, tuple(params))
+        if lecture_seule and self.taille_cache:
+            with self._verrou_cache:
+                lignes = self._cache_partitions.get(cle)
+                if lignes is not None:
+                    self._cache_partitions.move_to_end(cle)
+            if lignes is None:
+                self._attacher(schema)
+                cur = self.connexion().cursor()
+                cur.row_factory = sqlite3.Row
+                lignes = cur.execute(query, params).fetchall()
+                with self._verrou_cache:
+                    self._cache_partitions[cle] = lignes
+                    while len(self._cache_partitions) > self.taille_cache:
+                        self._cache_partitions.popitem(last=False)
+            yield from lignes
+            return
+        self._attacher(schema)
+        cur = self.connexion().cursor()
+        cur.row_factory = sqlite3.Row  # Sur le curseur : la connexion est partagée
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(taille_lot)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cur.close()
+
+    def archiver_saison(self, annee: int, chemin: Optional[str] = None, lecture_seule: bool = True,
+                        compacter: bool = True) -> str:
+        """
+        Déplace les courses d'une année et leurs résultats dans un fichier SQLite séparé, inscrit au catalogue
+        des partitions. Les lectures de courses interrogent ensuite les partitions dont la période recoupe leurs filtres
+        et fusionnent les résultats dans l'ordre chronologique ; agrégats et facettes couvrent toujours toutes les saisons.
+        Les courses de cette année ingérées plus tard restent dans la base courante.
+        :param annee: Saison (année civile) à archiver.
+        :param chemin: Fichier de la partition ; par défaut <base>_<annee>.db, à côté de la base.
+        :param lecture_seule: Attache la partition en lecture seule : fichier figé, lectures conservées en cache.
+        :param compacter: Rend au système la place libérée dans la base courante (VACUUM).
+        :return: Nom de la partition (alias d'ATTACH).
+        """
+        if self._uri:
+            raise ValueError("Une base en mémoire (ou chargée en mémoire en mode miroir) ne peut pas être partitionnée")
+        nom, debut, fin = f"{PREFIXE_PARTITION}{int(annee)}", f"{int(annee):04d}-01-01", f"{int(annee):04d}-12-31"
+        racine, extension = os.path.splitext(self.db_path)
+        chemin = os.path.abspath(chemin or f"{racine}_{int(annee)}{extension or '.db'}")
+        if os.path.exists(chemin):
+            raise ValueError(f"Le fichier de partition {chemin} existe déjà")
+        conn = self.connexion()
+        conn.commit()
+        if conn.execute('SELECT 1 FROM partitions WHERE nom = ?', (nom,)).fetchone():
+            raise ValueError(f"La saison {annee} est déjà archivée")
+        # Les identifiants sont conservés : la base courante doit garder sa plus grande clé pour ne pas la réattribuer
+        dernier = conn.execute('SELECT date_course FROM courses ORDER BY id DESC LIMIT 1').fetchone()
+        if dernier and dernier[0] and debut <= dernier[0] <= fin:
+            raise ValueError(f"La saison {annee} contient la dernière course enregistrée : elle ne peut pas encore être archivée")
+
+        conn.execute(f'ATTACH DATABASE ? AS {nom}', (chemin,))
+        try:
+            # Même schéma que la base courante (tables puis index), identifiants compris
+            for (sql,) in conn.execute('''
+                SELECT sql FROM main.sqlite_master WHERE tbl_name IN ('courses', 'resultats')
+                AND type IN ('table', 'index') AND sql IS NOT NULL ORDER BY type = 'index'
+            ''').fetchall():
+                conn.execute(re.sub(r'^CREATE (TABLE|INDEX) ', rf'CREATE \1 {nom}.', sql))
+            cur = conn.cursor()
+            cur.execute(f'INSERT INTO {nom}.courses SELECT * FROM main.courses WHERE date_course BETWEEN ? AND ?', (debut, fin))
+            cur.execute(f'INSERT INTO {nom}.resultats SELECT * FROM main.resultats WHERE course_id IN (SELECT id FROM {nom}.courses)')
+            cur.execute(f'DELETE FROM main.resultats WHERE course_id IN (SELECT id FROM {nom}.courses)')
+            # Les déclencheurs retirent les courses supprimées des agrégats : elles y sont reportées depuis la partition
+            cur.execute('DELETE FROM main.courses WHERE date_course BETWEEN ? AND ?', (debut, fin))
+            _reporter_agregats(conn, f'{nom}.courses')
+            dossier = os.path.dirname(os.path.abspath(self.db_path))
+            cur.execute('INSERT INTO partitions (nom, chemin, date_debut, date_fin, lecture_seule) VALUES (?, ?, ?, ?, ?)',
+                        (nom, os.path.relpath(chemin, dossier) if os.path.dirname(chemin) == dossier else chemin,
+                         debut, fin, int(lecture_seule)))
+            self._incrementer_version_base(cur)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            conn.execute(f'DETACH DATABASE {nom}')
+            os.remove(chemin)
+            raise
+        conn.execute(f'DETACH DATABASE {nom}')
+        if compacter:
+            conn.execute('VACUUM')
+        self._signaler_changement()
+        return nom
+
     def save_course(self, nom_fichier: str, donnees: Dict[str, Any]) -> bool:
         """
         Sauvegarde les données d'une course dans la base.
@@ -47,7 +1016,7 @@ class Database:
         :param donnees: Dictionnaire contenant les données de la course.
         :return: True si la sauvegarde a réussi, False sinon.
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connexion_ecriture() as conn:
             cur = conn.cursor()
             try:
                 cur.execute('SELECT nom_fichier FROM fichiers_traites WHERE nom_fichier = ?', (nom_fichier,))
@@ -58,33 +1027,260 @@ class Database:
                 cur.execute('''
                     INSERT INTO fichiers_traites (nom_fichier, date_traitement, statut_traitement, erreur)
                     VALUES (?, ?, ?, ?)
-                ''', (nom_fichier, datetime.now(), 'success', None))
+                ''', (nom_fichier, datetime.now(), STATUT_SUCCES, None))
                 
-                cur.execute('''
-                    INSERT INTO courses (date_course, lieu, type_course, distance, arrivee, synthese, partants, nom_fichier)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    donnees['date'],
-                    donnees['lieu'],
-                    donnees['type'],
-                    donnees['distance'],
-                    donnees['arrivée'],
-                    donnees['synthese'],
-                    ','.join(map(str, donnees['partants'])),  # Convertir la liste en chaîne
-                    nom_fichier
-                ))
+                cur.execute(INSERTION_COURSE, self._ligne_course(nom_fichier, donnees))
+                course_id = cur.lastrowid
+                cur.executemany('''
+                    INSERT INTO resultats (course_id, rang, numero, nom, gains) VALUES (?, ?, ?, ?, ?)
+                ''', [(course_id, *ligne) for ligne in self._lignes_resultats(donnees)])
+                version = self._incrementer_version_base(cur)
                 
                 conn.commit()
                 print(f"Course sauvegardée : {donnees}")
+                self._mettre_a_jour_facettes(version, [(donnees['type'], donnees['distance'], donnees['lieu'])])
+                self._signaler_changement()
                 return True
             except sqlite3.Error as e:
                 print(f"Erreur lors de la sauvegarde : {e}")
                 conn.rollback()
                 return False
     
+    @staticmethod
+    def _ligne_course(nom_fichier: str, donnees: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Construit la ligne de la table courses (colonnes COLONNES_COURSE) à partir des données d'une note."""
+        arrivee = donnees.get('arrivée', donnees.get('arrivee', ''))
+        synthese = donnees.get('synthese', '')
+        return (
+            date_iso(donnees['date']) or donnees['date'],  # Format ISO : comparé et trié tel quel par les index
+            donnees['lieu'],
+            donnees['type'],
+            donnees['distance'],
+            arrivee,
+            synthese,
+            ','.join(map(str, donnees.get('partants', []))),  # Convertir la liste en chaîne
+            *decouper_positions(arrivee),
+            *decouper_positions(synthese),
+            nom_fichier
+        )
+
+    @staticmethod
+    def _lignes_resultats(donnees: Dict[str, Any]) -> List[Tuple[Optional[int], int, Optional[str], Optional[int]]]:
+        """
+        Construit les lignes de la table resultats (rang, numero, nom, gains) d'une course.
+        Les partants absents du classement de la note n'ont que leur numéro.
+        """
+        lignes = {}
+        for ligne in donnees.get('classement', []):
+            lignes.setdefault(ligne['numero'], (ligne['rang'], ligne['numero'], ligne['nom'], ligne['gains']))
+        for numero in donnees.get('partants', []):
+            lignes.setdefault(numero, (None, numero, None, None))
+        return list(lignes.values())
+
+    def save_courses_bulk(self, courses: Iterable[Tuple[str, Dict[str, Any]]], taille_lot: int = 500,
+                          remplacer: Optional[Set[str]] = None) -> List[Tuple[str, str]]:
+        """
+        Sauvegarde un ensemble de courses par lots, une transaction par lot.
+        Les fichiers déjà traités (ou présents deux fois dans l'entrée) sont écartés sans requête supplémentaire.
+        :param courses: Itérable de (nom_fichier, donnees), consommé au fil de l'eau.
+        :param taille_lot: Nombre de courses écrites par transaction.
+        :param remplacer: Fichiers déjà traités dont la course doit être remplacée (note modifiée depuis) ;
+                          l'ensemble peut être complété pendant la consommation de courses.
+        :return: Liste de (nom_fichier, statut) dans l'ordre de l'entrée, statut parmi
+                 STATUT_SUCCES, STATUT_DEJA_TRAITE et STATUT_ERREUR.
+        """
+        resultats = []
+        with self._connexion_ecriture() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT nom_fichier FROM fichiers_traites')
+            deja_traites = {row[0] for row in cur.fetchall()}
+            remplacer = remplacer if remplacer is not None else set()
+            ecrits = set()  # Fichiers acceptés par cet appel
+            archivees = {}  # Fichier remplacé -> partition modifiable qui contient sa course
+
+            lot = []  # Lignes en attente (position dans les résultats, course, resultats)
+            for nom_fichier, donnees in courses:
+                # remplacer est consulté au fil de l'eau : l'appelant peut le compléter pendant l'itération
+                if nom_fichier in ecrits or (nom_fichier in deja_traites and nom_fichier not in remplacer):
+                    resultats.append((nom_fichier, STATUT_DEJA_TRAITE))
+                    continue
+                if nom_fichier in deja_traites:
+                    emplacement = self._localiser_course(nom_fichier)
+                    if emplacement and emplacement[1]:
+                        print(f"La course de {nom_fichier} appartient à la saison archivée en lecture seule "
+                              f"{emplacement[0]} : elle ne peut pas être remplacée.")
+                        resultats.append((nom_fichier, STATUT_ERREUR))
+                        continue
+                    if emplacement:
+                        archivees[nom_fichier] = emplacement[0]
+                try:
+                    ligne = self._ligne_course(nom_fichier, donnees)
+                    lignes_resultats = self._lignes_resultats(donnees)
+                except (KeyError, TypeError) as e:
+                    print(f"Données incomplètes pour {nom_fichier} : {e}")
+                    resultats.append((nom_fichier, STATUT_ERREUR))
+                    continue
+                ecrits.add(nom_fichier)
+                lot.append((len(resultats), ligne, lignes_resultats))
+                resultats.append((nom_fichier, None))
+                if len(lot) >= taille_lot:
+                    self._inserer_lot(conn, lot, resultats, archivees)
+                    lot = []
+            if lot:
+                self._inserer_lot(conn, lot, resultats, archivees)
+        return resultats
+
+    def _inserer_lot(self, conn: sqlite3.Connection, lot: List[Tuple[int, Tuple[Any, ...], List[Tuple[Any, ...]]]],
+                     resultats: List[Tuple[str, Optional[str]]], archivees: Dict[str, str]) -> None:
+        """
+        Écrit un lot de courses, leurs résultats et leurs fichiers dans une seule transaction, puis renseigne leur statut.
+        :param archivees: {nom_fichier: partition} des courses remplacées qui ont été archivées (voir _supprimer_courses).
+        """
+        lignes = [ligne for _, ligne, _ in lot]
+        noms = [(ligne[-1],) for ligne in lignes]
+        maintenant = datetime.now()
+        try:
+            cur = conn.cursor()
+            # Une note modifiée remplace sa course précédente, retirée de l'arbre des facettes
+            retirees = self._supprimer_courses(cur, [nom for nom, in noms], archivees)
+            cur.executemany('''
+                INSERT OR REPLACE INTO fichiers_traites (nom_fichier, date_traitement, statut_traitement, erreur)
+                VALUES (?, ?, ?, ?)
+            ''', [(ligne[-1], maintenant, STATUT_SUCCES, None) for ligne in lignes])
+            cur.executemany(INSERTION_COURSE, lignes)
+            # executemany ne renvoie pas les identifiants : ils sont relus par nom de fichier (indexé)
+            identifiants = {nom: cur.execute('SELECT id FROM courses WHERE nom_fichier = ?', (nom,)).fetchone()[0] for nom, in noms}
+            cur.executemany('''
+                INSERT INTO resultats (course_id, rang, numero, nom, gains) VALUES (?, ?, ?, ?, ?)
+            ''', [(identifiants[ligne[-1]], *resultat) for _, ligne, lignes_resultats in lot for resultat in lignes_resultats])
+            version = self._incrementer_version_base(cur)
+            conn.commit()
+            statut = STATUT_SUCCES
+        except sqlite3.Error as e:
+            print(f"Erreur lors de la sauvegarde du lot : {e}")
+            conn.rollback()
+            statut = STATUT_ERREUR
+        for position, ligne, _ in lot:
+            resultats[position] = (ligne[-1], statut)
+        if statut == STATUT_SUCCES:
+            # Colonnes lieu, type_course et distance de COLONNES_COURSE
+            self._mettre_a_jour_facettes(version, [(ligne[2], ligne[3], ligne[1]) for ligne in lignes], retirees)
+            self._signaler_changement()
+
+    def course_inchangee(self, nom_fichier: str, donnees: Dict[str, Any]) -> bool:
+        """
+        Compare les données d'une note à la course enregistrée pour ce fichier, toutes saisons confondues :
+        date, lieu, discipline, distance, arrivée, synthèse et ensemble des partants.
+        :return: True si la course existe et n'a pas changé.
+        """
+        try:
+            attendue = dict(zip(COLONNES_COURSE, self._ligne_course(nom_fichier, donnees)))
+        except (KeyError, TypeError):
+            return False
+        colonnes = COLONNES_COURSE[:6]
+        for schema, _ in self._sources():
+            ligne = self.connexion().execute(f"SELECT {', '.join(colonnes)}, partants FROM {schema}.courses WHERE nom_fichier = ?",
+                                             (nom_fichier,)).fetchone()
+            if ligne is not None:
+                return (tuple(ligne[:-1]) == tuple(attendue[colonne] for colonne in colonnes)
+                        and lire_partants(ligne[-1]) == lire_partants(attendue['partants']))
+        return False
+
+    def get_manifeste(self) -> Dict[str, Tuple[int, int, str, Optional[str]]]:
+        """Retourne le manifeste d'ingestion : {nom_fichier: (taille, mtime_ns, empreinte, doublon_de)}."""
+        with self.connexion() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT nom_fichier, taille, mtime_ns, empreinte, doublon_de FROM manifeste_ingestion')
+            return {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+
+    def mettre_a_jour_manifeste(self, entrees: Iterable[Tuple[str, int, int, str, Optional[str]]]) -> None:
+        """
+        Enregistre l'état des fichiers traités.
+        :param entrees: Itérable de (nom_fichier, taille, mtime_ns, empreinte, doublon_de).
+        """
+        with self._connexion_ecriture() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO manifeste_ingestion (nom_fichier, taille, mtime_ns, empreinte, doublon_de)
+                VALUES (?, ?, ?, ?, ?)
+            ''', entrees)
+            conn.commit()
+
+    def enregistrer_doublons(self, doublons: Iterable[Tuple[str, str]]) -> List[str]:
+        """
+        Marque comme traités les fichiers identiques à un fichier déjà ingéré, sans créer de course.
+        Si le fichier avait déjà une course (note modifiée devenue un doublon), elle est supprimée ; une course
+        archivée dans une saison en lecture seule ne peut pas l'être : le fichier est alors écarté.
+        :param doublons: Itérable de (nom_fichier, nom du fichier original).
+        :return: Fichiers enregistrés comme doublons.
+        """
+        archivees, retenus = {}, []
+        for nom, original in doublons:
+            emplacement = self._localiser_course(nom)
+            if emplacement and emplacement[1]:
+                print(f"La course de {nom} appartient à la saison archivée en lecture seule {emplacement[0]} : "
+                      f"elle ne peut pas être remplacée par le doublon de {original}.")
+                continue
+            if emplacement:
+                archivees[nom] = emplacement[0]
+            retenus.append((nom, original))
+        doublons = retenus
+        maintenant = datetime.now()
+        with self._connexion_ecriture() as conn:
+            cur = conn.cursor()
+            retirees = self._supprimer_courses(cur, [nom for nom, _ in doublons], archivees)
+            courses_supprimees = bool(retirees)
+            cur.executemany('''
+                INSERT OR REPLACE INTO fichiers_traites (nom_fichier, date_traitement, statut_traitement, erreur)
+                VALUES (?, ?, ?, ?)
+            ''', [(nom, maintenant, STATUT_DOUBLON, f"Identique à {original}") for nom, original in doublons])
+            version = self._incrementer_version_base(cur) if courses_supprimees else None
+            conn.commit()
+        if courses_supprimees:
+            self._mettre_a_jour_facettes(version, [], retirees)
+            self._signaler_changement()
+        return [nom for nom, _ in doublons]
+
+    def _localiser_course(self, nom_fichier: str) -> Optional[Tuple[str, bool]]:
+        """
+        Partition qui contient la course d'un fichier, si elle a été archivée (à appeler hors transaction :
+        la partition est attachée à la connexion du fil).
+        :return: (schéma, lecture_seule), ou None si la course est dans la base courante ou n'existe pas.
+        """
+        for schema, lecture_seule in self._sources():
+            if schema != 'main' and self.connexion().execute(
+                    f'SELECT 1 FROM {schema}.courses WHERE nom_fichier = ?', (nom_fichier,)).fetchone():
+                return schema, lecture_seule
+        return None
+
+    @staticmethod
+    def _supprimer_courses(cur: sqlite3.Cursor, noms: List[str], archivees: Dict[str, str]) -> List[Tuple[Any, Any, Any]]:
+        """
+        Supprime les courses et les résultats de fichiers, dans la base courante ou dans la partition modifiable
+        qui les contient. Les déclencheurs ne suivent que la base courante : pour une partition, les courses
+        sont retirées ici des agrégats et les portées de l'état des écarts qui les comptent sont marquées périmées.
+        :param archivees: {nom_fichier: partition} des courses archivées (voir _localiser_course).
+        :return: Combinaisons (type_course, distance, lieu) des courses supprimées, à retirer des facettes.
+        """
+        retirees = []
+        for nom in noms:
+            schema = archivees.get(nom, 'main')
+            if schema != 'main':
+                identifiants = ', '.join(str(identifiant) for identifiant, in cur.execute(
+                    f'SELECT id FROM {schema}.courses WHERE nom_fichier = ?', (nom,)).fetchall())
+                _reporter_agregats(cur, f'(SELECT * FROM {schema}.courses WHERE id IN ({identifiants}))', signe=-1)
+            cur.execute(f'DELETE FROM {schema}.resultats WHERE course_id IN '
+                        f'(SELECT id FROM {schema}.courses WHERE nom_fichier = ?)', (nom,))
+            supprimees = cur.execute(f'DELETE FROM {schema}.courses WHERE nom_fichier = ? '
+                                     f'RETURNING type_course, distance, lieu', (nom,)).fetchall()
+            if schema != 'main':
+                cur.executemany("UPDATE ecarts_portees SET perimee = 1 WHERE perimee = 0 AND type_course IN ('', COALESCE(?, '')) "
+                                "AND distance IN ('', COALESCE(?, ''))", [(type_course, distance) for type_course, distance, _ in supprimees])
+            retirees += supprimees
+        return retirees
+
     def get_processed_files(self) -> List[str]:
         """Récupère la liste des fichiers déjà traités."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connexion() as conn:
             cur = conn.cursor()
             cur.execute('SELECT nom_fichier FROM fichiers_traites')
             return [row[0] for row in cur.fetchall()]
@@ -94,92 +1290,510 @@ class Database:
     type_course: Optional[str] = None,
     date_debut: Optional[str] = None,
     date_fin: Optional[str] = None,
-    distance: Optional[str] = None
-) -> List[Dict[str, Any]]:
+    distance: Optional[str] = None,
+    positions: bool = False,
+    analysees: bool = False
+) -> Union[List[Dict[str, Any]], List[CourseAnalysee]]:
         """
         Récupère les courses depuis la base de données avec des filtres optionnels.
         Garantit la présence des colonnes critiques.
+        Les résultats sont conservés dans un cache LRU tant que la version des données en base ne change pas ;
+        chaque appel renvoie des dictionnaires neufs, que l'appelant peut modifier.
+        :param positions: Ajoute 'arrivee_numeros' et 'synthese_numeros', tuples de NOMBRE_POSITIONS numéros lus dans
+                          les colonnes par position (None pour une position absente, comme decouper_positions),
+                          à utiliser au lieu de découper les chaînes.
+        :param analysees: Renvoie des CourseAnalysee, lues une seule fois par version des données : non modifiables,
+                          elles sont partagées entre les appels (seule la liste est neuve).
         """
         try:
-            # Liste des colonnes essentielles à récupérer
-            columns = [
-                "date_course",
-                "type_course",
-                "distance",
-                "lieu",
-                "partants",
-                "arrivee",
-                "synthese"
-            ]
-
-            query = f"SELECT {', '.join(columns)} FROM courses"
-            conditions = []
-            params = []
-
-            # Construction dynamique des filtres
-            if type_course:
-                conditions.append("type_course = ?")
-                params.append(type_course)
-            
-            if date_debut:
-                conditions.append("date(date_course) >= date(?)")
-                params.append(date_debut)
-            
-            if date_fin:
-                conditions.append("date(date_course) <= date(?)")
-                params.append(date_fin)
-            
-            if distance:
-                conditions.append("distance = ?")
-                params.append(distance)
-
-            if conditions:
-                query += " WHERE " + " AND ".join(conditions)
-            
-            query += " ORDER BY date(date_course) ASC"
-
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cur = conn.cursor()
-                
-                cur.execute(query, params)
-                rows = cur.fetchall()
-                
-                # Conversion en dictionnaires avec validation
-                courses = []
-                required_keys = {'date_course', 'partants', 'arrivee'}
-                
-                for row in rows:
-                    course = dict(row)
-                    missing = required_keys - course.keys()
-                    if missing:
-                        raise KeyError(f"Colonnes manquantes : {missing}")
-                    courses.append(course)
-
-                return courses
-
+            if not self.taille_cache:
+                courses = self._lire_courses(type_course, date_debut, date_fin, distance, positions)
+                return list(map(CourseAnalysee, courses)) if analysees else courses
+            cle = (type_course or None, date_debut and (date_iso(date_debut) or date_debut),
+                   date_fin and (date_iso(date_fin) or date_fin), distance or None, positions, analysees)
+            version = self.version_base()
+            with self._verrou_cache:
+                entree = self._cache_courses.get(cle)
+                if entree is not None and entree[0] == version:
+                    self._cache_courses.move_to_end(cle)
+                    self.cache_succes += 1
+                    return list(entree[1]) if analysees else [dict(course) for course in entree[1]]
+                self.cache_echecs += 1
+            courses = self._lire_courses(type_course, date_debut, date_fin, distance, positions)
+            if analysees:
+                courses = list(map(CourseAnalysee, courses))  # Dictionnaires neufs : pas de copie
         except sqlite3.Error as e:
             print(f"Erreur SQLite : {str(e)}")
             return []
         except KeyError as ke:
             print(f"Problème d'intégrité des données : {str(ke)}")
             return []
+        with self._verrou_cache:
+            # Une autre version en base rend toutes les entrées obsolètes
+            if any(version_entree != version for version_entree, _ in self._cache_courses.values()):
+                self._cache_courses.clear()
+            self._cache_courses[cle] = (version, courses)
+            self._cache_courses.move_to_end(cle)
+            while len(self._cache_courses) > self.taille_cache:
+                self._cache_courses.popitem(last=False)
+        return list(courses) if analysees else [dict(course) for course in courses]
+
+    def _lire_courses(self, type_course: Optional[str], date_debut: Optional[str], date_fin: Optional[str],
+                      distance: Optional[str], positions: bool) -> List[Dict[str, Any]]:
+        """
+        Lit les courses en base, sans cache (sqlite3.Error et KeyError sont traitées par get_courses) :
+        une requête par source (partitions concernées et base courante), fusionnées dans l'ordre chronologique.
+        """
+        flux = [self._lignes(schema, lecture_seule, *self._requete_courses(type_course, date_debut, date_fin, distance,
+                                                                           positions, schema=schema))
+                for schema, lecture_seule in self._sources(date_debut, date_fin)]
+        return [self._course_depuis_ligne(row, positions) for row in _fusionner(flux)]
+
+    @staticmethod
+    def _course_depuis_ligne(row: sqlite3.Row, positions: bool) -> Dict[str, Any]:
+        """Convertit une ligne de _requete_courses en dictionnaire, avec validation des colonnes critiques."""
+        course = dict(row)
+        required_keys = {'date_course', 'partants', 'arrivee'}
+        missing = required_keys - course.keys()
+        if missing:
+            raise KeyError(f"Colonnes manquantes : {missing}")
+        if positions:
+            for champ in ('arrivee', 'synthese'):
+                # Position conservée : None pour une position absente ou non numérique ("14 - NP - 3")
+                course[f"{champ}_numeros"] = tuple(course.pop(f"{champ}_{rang}") for rang in range(1, NOMBRE_POSITIONS + 1))
+        return course
+
+    def iter_courses(self, type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                     date_fin: Optional[str] = None, distance: Optional[str] = None, positions: bool = False,
+                     taille_lot: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt les courses dans l'ordre chronologique sans les charger toutes : lecture par lots (fetchmany).
+        Mêmes filtres et même format que get_courses, sans passer par son cache.
+        :param taille_lot: Nombre de lignes lues à la fois (par source).
+        """
+        flux = [self._lignes(schema, lecture_seule, *self._requete_courses(type_course, date_debut, date_fin, distance,
+                                                                           positions, schema=schema), taille_lot=taille_lot)
+                for schema, lecture_seule in self._sources(date_debut, date_fin)]
+        try:
+            for row in _fusionner(flux):
+                yield self._course_depuis_ligne(row, positions)
+        finally:
+            for lignes in flux:
+                lignes.close()
+
+    def page_courses(self, apres: Optional[Tuple[str, int]] = None, limite: int = 50, decroissant: bool = False,
+                     type_course: Optional[str] = None, date_debut: Optional[str] = None, date_fin: Optional[str] = None,
+                     distance: Optional[str] = None, positions: bool = False) -> List[Dict[str, Any]]:
+        """
+        Page de courses par pagination sur clé (date_course, id) : le coût ne dépend pas du rang de la page.
+        :param apres: Clé (date_course, id) de la dernière course de la page précédente ; None pour la première page.
+        :param limite: Nombre maximal de courses de la page.
+        :param decroissant: Des plus récentes aux plus anciennes (apres désigne alors la plus ancienne déjà vue).
+        :return: Courses de la page ; la clé de la suivante est (page[-1]['date_course'], page[-1]['id']).
+        """
+        flux = []
+        for schema, lecture_seule in self._sources(date_debut, date_fin):
+            query, params = self._requete_courses(type_course, date_debut, date_fin, distance, positions,
+                                                  apres=apres, decroissant=decroissant, schema=schema)
+            flux.append(list(self._lignes(schema, lecture_seule, query + " LIMIT ?", params + [limite])))
+        return [self._course_depuis_ligne(row, positions) for row in islice(_fusionner(flux, decroissant), limite)]
     
+    @classmethod
+    def _requete_courses(cls, type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                         date_fin: Optional[str] = None, distance: Optional[str] = None, positions: bool = False,
+                         apres: Optional[Tuple[str, int]] = None, decroissant: bool = False,
+                         schema: str = 'main') -> Tuple[str, List[Any]]:
+        """
+        Construit la requête de get_courses : filtres et tri servis par les index de la table courses.
+        :param apres: Clé (date_course, id) à partir de laquelle reprendre, dans l'ordre du tri (pagination).
+        :param decroissant: Tri des plus récentes aux plus anciennes.
+        :param schema: Base interrogée : 'main' ou l'alias d'une partition attachée.
+        """
+        # Liste des colonnes essentielles à récupérer
+        columns = [
+            "id",
+            "date_course",
+            "type_course",
+            "distance",
+            "lieu",
+            "partants",
+            "arrivee",
+            "synthese"
+        ]
+        if positions:
+            columns += COLONNES_POSITIONS
+        query = f"SELECT {', '.join(columns)} FROM {schema}.courses"
+        conditions, params = cls._conditions_courses(type_course, date_debut, date_fin, distance)
+        if apres is not None:
+            # Comparaison de valeurs de ligne : servie par les index (..., date_course), qui contiennent l'id
+            conditions.append(f"(date_course, id) {'<' if decroissant else '>'} (?, ?)")
+            params += [apres[0], apres[1]]
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # Dates ISO : l'ordre des chaînes est l'ordre chronologique, id départage les courses d'un même jour
+        query += " ORDER BY date_course DESC, id DESC" if decroissant else " ORDER BY date_course, id"
+        return query, params
+
+    @staticmethod
+    def _conditions_courses(type_course: Optional[str] = None, date_debut: Optional[str] = None, date_fin: Optional[str] = None,
+                            distance: Optional[str] = None, alias: str = "") -> Tuple[List[str], List[Any]]:
+        """Construit les filtres optionnels sur la table courses (préfixés par alias s'il est fourni)."""
+        prefixe = f"{alias}." if alias else ""
+        conditions = []
+        params = []
+        if type_course:
+            conditions.append(f"{prefixe}type_course = ?")
+            params.append(type_course)
+        if date_debut:
+            conditions.append(f"{prefixe}date_course >= ?")
+            params.append(date_iso(date_debut))
+        if date_fin:
+            conditions.append(f"{prefixe}date_course <= ?")
+            params.append(date_iso(date_fin))
+        if distance:
+            conditions.append(f"{prefixe}distance = ?")
+            params.append(distance)
+        return conditions, params
+
+    @staticmethod
+    def _condition_partants_communs(numeros: List[int], alias: str = "c", schema: str = 'main') -> Tuple[str, List[Any]]:
+        """Filtre les courses auxquelles participent tous les numéros donnés (résultats lus dans le même schéma)."""
+        return (f"{alias}.id IN (SELECT course_id FROM {schema}.resultats WHERE numero IN ({', '.join('?' * len(numeros))}) "
+                f"GROUP BY course_id HAVING COUNT(*) = ?)", [*numeros, len(numeros)])
+
+    def get_partants(self, type_course: Optional[str] = None, date_debut: Optional[str] = None, date_fin: Optional[str] = None,
+                     distance: Optional[str] = None, avec: Optional[Iterable[int]] = None) -> Dict[int, List[int]]:
+        """
+        Retourne les numéros des partants de chaque course, sans découpage de chaîne.
+        :param avec: Si fourni, seules les courses auxquelles participent tous ces numéros sont retenues.
+        :return: {id de la course: numéros des partants triés}.
+        """
+        numeros = sorted(set(avec or []))
+        lignes = []
+        with self.connexion() as conn:
+            for schema, _ in self._sources(date_debut, date_fin):
+                conditions, params = self._conditions_courses(type_course, date_debut, date_fin, distance, alias="c")
+                if numeros:
+                    condition, params_partants = self._condition_partants_communs(numeros, schema=schema)
+                    conditions.append(condition)
+                    params += params_partants
+                query = f"SELECT r.course_id, r.numero FROM {schema}.resultats r JOIN {schema}.courses c ON c.id = r.course_id"
+                if conditions:
+                    query += " WHERE " + " AND ".join(conditions)
+                lignes += conn.execute(query, params).fetchall()
+        partants: Dict[int, List[int]] = {}
+        for course_id, numero in sorted(lignes):
+            partants.setdefault(course_id, []).append(numero)
+        return partants
+
+    def get_resultats(self, course_id: int) -> List[Dict[str, Any]]:
+        """
+        Retourne le classement d'une course tel qu'il figure dans la note.
+        :return: Liste de {'rang', 'numero', 'nom', 'gains'} par rang (les partants repris sans classement en dernier).
+        """
+        with self.connexion() as conn:
+            cur = conn.cursor()
+            cur.row_factory = sqlite3.Row
+            # Une course n'est que dans une seule source
+            for schema, _ in self._sources():
+                cur.execute(f'''
+                    SELECT rang, numero, nom, gains FROM {schema}.resultats WHERE course_id = ?
+                    ORDER BY rang IS NULL, rang, numero
+                ''', (course_id,))
+                resultats = [dict(row) for row in cur.fetchall()]
+                if resultats:
+                    return resultats
+            return []
+
+    def compter_participations(self, numeros: Iterable[int], type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                               date_fin: Optional[str] = None, distance: Optional[str] = None) -> Dict[int, int]:
+        """
+        Compte les courses auxquelles chaque numéro a participé.
+        :return: {numéro: nombre de courses} (0 pour un numéro jamais partant).
+        """
+        numeros = sorted(set(numeros))
+        if not numeros:
+            return {}
+        conditions, params = self._conditions_courses(type_course, date_debut, date_fin, distance, alias="c")
+        conditions.insert(0, f"r.numero IN ({', '.join('?' * len(numeros))})")
+        comptes = dict.fromkeys(numeros, 0)
+        with self.connexion() as conn:
+            for schema, _ in self._sources(date_debut, date_fin):
+                query = (f"SELECT r.numero, COUNT(*) FROM {schema}.resultats r JOIN {schema}.courses c ON c.id = r.course_id "
+                         f"WHERE {' AND '.join(conditions)} GROUP BY r.numero")
+                for numero, nombre in conn.execute(query, numeros + params):
+                    comptes[numero] += nombre
+        return comptes
+
+    def compter_courses_communes(self, numeros: Iterable[int], type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                                 date_fin: Optional[str] = None, distance: Optional[str] = None) -> int:
+        """Compte les courses auxquelles tous les numéros donnés ont participé ensemble."""
+        numeros = sorted(set(numeros))
+        if not numeros:
+            return 0
+        conditions, params = self._conditions_courses(type_course, date_debut, date_fin, distance, alias="c")
+        total = 0
+        with self.connexion() as conn:
+            for schema, _ in self._sources(date_debut, date_fin):
+                condition, params_partants = self._condition_partants_communs(numeros, schema=schema)
+                query = f"SELECT COUNT(*) FROM {schema}.courses c WHERE {' AND '.join([condition] + conditions)}"
+                total += conn.execute(query, params_partants + params).fetchone()[0]
+        return total
+
+    def compter_positions(self, champ: str = 'arrivee', type_course: Optional[str] = None, date_debut: Optional[str] = None,
+                          date_fin: Optional[str] = None, distance: Optional[str] = None) -> Dict[int, List[int]]:
+        """
+        Compte, pour chaque numéro, ses apparitions à chaque position de l'arrivée ou de la synthèse (GROUP BY en SQL).
+        :param champ: 'arrivee' ou 'synthese'.
+        :return: {numéro: [apparitions en 1re position, ..., en NOMBRE_POSITIONS-ième position]}.
+        """
+        if champ not in ('arrivee', 'synthese'):
+            raise ValueError(f"Champ inconnu : {champ} (arrivee ou synthese)")
+        conditions, params = self._conditions_courses(type_course, date_debut, date_fin, distance)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        comptes: Dict[int, List[int]] = {}
+        with self.connexion() as conn:
+            for schema, _ in self._sources(date_debut, date_fin):
+                positions = " UNION ALL ".join(f"SELECT {rang} AS rang, {champ}_{rang} AS numero FROM {schema}.courses{where}"
+                                               for rang in range(1, NOMBRE_POSITIONS + 1))
+                query = f"SELECT numero, rang, COUNT(*) FROM ({positions}) WHERE numero IS NOT NULL GROUP BY numero, rang"
+                for numero, rang, nombre in conn.execute(query, params * NOMBRE_POSITIONS):
+                    comptes.setdefault(numero, [0] * NOMBRE_POSITIONS)[rang - 1] += nombre
+        return comptes
+
+    @staticmethod
+    def _conditions_agregats(type_course: Optional[str], distance: Optional[str], lieu: Optional[str]) -> Tuple[str, List[Any]]:
+        """Filtres optionnels sur les clés des tables d'agrégats (clause WHERE complète, éventuellement vide)."""
+        filtres = [(cle, valeur) for cle, valeur in zip(CLES_AGREGATS, (type_course, distance, lieu)) if valeur]
+        return (" WHERE " + " AND ".join(f"{cle} = ?" for cle, _ in filtres) if filtres else "",
+                [valeur for _, valeur in filtres])
+
+    def compter_courses_agregees(self, type_course: Optional[str] = None, distance: Optional[str] = None,
+                                 lieu: Optional[str] = None) -> int:
+        """Nombre de courses, lu dans les agrégats (dénominateur des fréquences)."""
+        where, params = self._conditions_agregats(type_course, distance, lieu)
+        with self.connexion() as conn:
+            return conn.execute(f"SELECT COALESCE(SUM(nombre), 0) FROM agregats_courses{where}", params).fetchone()[0]
+
+    def frequences_numeros(self, champ: str = 'arrivee', rangs: Optional[Iterable[int]] = None, type_course: Optional[str] = None,
+                           distance: Optional[str] = None, lieu: Optional[str] = None) -> Dict[int, float]:
+        """
+        Fréquence de chaque numéro dans l'arrivée ou la synthèse, lue dans les agrégats : le coût ne dépend pas
+        du nombre de courses. Seules les NOMBRE_POSITIONS premières places sont comptées, comme dans
+        analyse_frequence_arrivee (rangs 1 à top_n) et analyse_frequence_synthese (tous les rangs).
+        :param rangs: Positions prises en compte (toutes par défaut).
+        :return: {numéro: pourcentage des courses où il figure à l'une de ces positions}.
+        """
+        if champ not in CHAMPS_POSITIONS:
+            raise ValueError(f"Champ inconnu : {champ} (arrivee ou synthese)")
+        total = self.compter_courses_agregees(type_course, distance, lieu)
+        if not total:
+            return {}
+        where, params = self._conditions_agregats(type_course, distance, lieu)
+        conditions = [where[len(" WHERE "):]] if where else []
+        conditions.append("champ = ?")
+        params.append(champ)
+        rangs = sorted(set(rangs)) if rangs is not None else None
+        if rangs is not None:
+            conditions.append(f"position IN ({', '.join('?' * len(rangs))})")
+            params += rangs
+        query = (f"SELECT numero, SUM(nombre) FROM agregats_numeros WHERE {' AND '.join(conditions)} "
+                 f"GROUP BY numero HAVING SUM(nombre) > 0")
+        with self.connexion() as conn:
+            return {numero: (nombre / total) * 100 for numero, nombre in conn.execute(query, params)}
+
+    def frequences_combinaisons(self, champ: str = 'arrivee', taille: int = 2, type_course: Optional[str] = None,
+                                distance: Optional[str] = None, lieu: Optional[str] = None) -> Dict[Tuple[int, ...], float]:
+        """
+        Fréquence des couples (taille 2) ou triples (taille 3) de numéros, lue dans les agrégats : combinaisons
+        des NOMBRE_POSITIONS premières places seulement, comme analyser_couples_arrivee, analyser_triples_arrivee
+        et leurs équivalents pour la synthèse.
+        :return: {combinaison triée: pourcentage des courses où elle figure}.
+        """
+        if champ not in CHAMPS_POSITIONS or taille not in (2, 3):
+            raise ValueError(f"Agrégat inconnu : {champ}, taille {taille}")
+        total = self.compter_courses_agregees(type_course, distance, lieu)
+        if not total:
+            return {}
+        where, params = self._conditions_agregats(type_course, distance, lieu)
+        conditions = [where[len(" WHERE "):]] if where else []
+        conditions += ["champ = ?", "taille = ?"]
+        params += [champ, taille]
+        query = (f"SELECT n1, n2, n3, SUM(nombre) FROM agregats_combinaisons WHERE {' AND '.join(conditions)} "
+                 f"GROUP BY n1, n2, n3 HAVING SUM(nombre) > 0")
+        with self.connexion() as conn:
+            return {(n1, n2, n3)[:taille]: (nombre / total) * 100 for n1, n2, n3, nombre in conn.execute(query, params)}
+
+    def etat_ecarts(self, type_course: Optional[str] = None, distance: Optional[str] = None) -> 'EtatEcarts':
+        """
+        État incrémental des écarts (ecarts.EtatEcarts) des courses d'une discipline et d'une distance (toutes par défaut),
+        conservé en base (tables ecarts_*) et en mémoire. Chaque appel n'ajoute que les courses enregistrées depuis
+        le précédent, chacune en ne touchant que ses clés, puis enregistre les clés modifiées : le coût ne dépend pas
+        du nombre de courses de l'historique. L'état est recalculé d'un coup (EtatEcarts.depuis_corpus) au premier appel
+        pour ces filtres, quand les déclencheurs l'ont marqué périmé (course antérieure à la dernière prise en compte
+        ajoutée, course prise en compte modifiée ou supprimée, saison archivée) ou quand plus de SEUIL_RECALCUL_ECARTS
+        courses sont nouvelles.
+        L'état renvoyé est partagé et complété par les appels suivants : il ne doit pas être modifié.
+        """
+        from course_frame import CourseFrame
+        from ecarts import EtatEcarts
+        portee = (type_course or '', distance or '')
+        version = self.version_base()
+        with self._verrou_ecarts:
+            entree = self._etats_ecarts.get(portee)
+            if entree is not None and entree[0] == version:
+                return entree[1]
+            with self.connexion() as conn:
+                ligne = conn.execute('''
+                    SELECT nombre_courses, nombre_syntheses, date_course, course_id, perimee
+                    FROM ecarts_portees WHERE type_course = ? AND distance = ?
+                ''', portee).fetchone()
+            etat = None
+            # Une marque sans date ne permet pas de reprendre après elle (les dates absentes sont triées en premier)
+            if ligne is not None and not ligne[4] and (ligne[2] is not None or ligne[3] is None):
+                marque = (ligne[2], ligne[3]) if ligne[3] is not None else None
+                nouvelles = self._courses_apres(type_course, distance, marque)
+                if nouvelles is not None:
+                    if entree is not None and (entree[1].nombre_courses, entree[1].marque) == (ligne[0], marque):
+                        etat = entree[1]
+                    else:
+                        etat = self._charger_etat_ecarts(portee, ligne)
+                    for course in nouvelles:
+                        etat.ajouter_course(course)
+                    # Portée modifiée entre-temps par un autre processus : l'état est recalculé
+                    if not self._enregistrer_etat_ecarts(portee, etat, version, ligne):
+                        etat = None
+            if etat is None:
+                etat = EtatEcarts.depuis_corpus(CourseFrame.depuis_base(self, type_course, distance=distance))
+                self._enregistrer_etat_ecarts(portee, etat, version)
+            self._etats_ecarts[portee] = (version, etat)
+            return etat
+
+    def _courses_apres(self, type_course: Optional[str], distance: Optional[str],
+                       apres: Optional[Tuple[str, int]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Courses postérieures à la clé (date_course, id) apres (toutes si None), au format de get_courses(positions=True),
+        dans l'ordre chronologique, toutes sources confondues ; None s'il y en a plus de SEUIL_RECALCUL_ECARTS.
+        """
+        flux = [self._lignes(schema, lecture_seule, *self._requete_courses(type_course, None, None, distance, True,
+                                                                           apres=apres, schema=schema))
+                for schema, lecture_seule in self._sources()]
+        try:
+            lignes = list(islice(_fusionner(flux), SEUIL_RECALCUL_ECARTS + 1))
+        finally:
+            for source in flux:
+                source.close()
+        if len(lignes) > SEUIL_RECALCUL_ECARTS:
+            return None
+        return [self._course_depuis_ligne(row, True) for row in lignes]
+
+    def _charger_etat_ecarts(self, portee: Tuple[str, str], ligne: Tuple[Any, ...]) -> 'EtatEcarts':
+        """Relit l'état des écarts d'une portée (sans ses histogrammes) ; ligne : sa ligne de ecarts_portees."""
+        from ecarts import EtatCle, EtatEcarts
+        etat = EtatEcarts(ligne[0], ligne[1], (ligne[2], ligne[3]) if ligne[3] is not None else None)
+        with self.connexion() as conn:
+            for champ, rang, *numeros, premiere, derniere, ecart_max, occurrences, apparitions, dates in conn.execute(f'''
+                SELECT {', '.join(CLES_ECARTS[2:])}, premiere, derniere, ecart_max, occurrences, apparitions, dates
+                FROM ecarts_cles WHERE type_course = ? AND distance = ?
+            ''', portee):
+                combinaison = tuple(numero for numero in numeros if numero)
+                etat.familles[(champ, rang, len(combinaison))][combinaison] = EtatCle(
+                    premiere, derniere, ecart_max, occurrences, apparitions, tuple(dates.split(',')) if dates else ())
+        return etat
+
+    def _enregistrer_etat_ecarts(self, portee: Tuple[str, str], etat: 'EtatEcarts', version: int,
+                                 ligne: Optional[Tuple[Any, ...]] = None) -> bool:
+        """
+        Enregistre les clés modifiées d'un état des écarts, leurs nouveaux écarts entre occurrences et les compteurs.
+        Un état recalculé (ligne None) remplace celui de la portée ; il est marqué périmé si des courses ont été écrites
+        depuis la version lue. Un état complété (ligne : celle de ecarts_portees qu'il prolonge) n'est enregistré que si
+        la portée n'a pas changé entre-temps.
+        :return: False si l'état complété n'a pas pu être enregistré.
+        """
+        if ligne is not None and not etat.modifiees:
+            return True
+        cles = [(*portee, champ, rang, *combinaison, *(0,) * (3 - len(combinaison)), cle.premiere, cle.derniere,
+                 cle.ecart_max, cle.occurrences, cle.apparitions, ','.join(cle.dates) or None)
+                for (champ, rang, _), combinaison in etat.modifiees
+                for cle in (etat.familles[(champ, rang, len(combinaison))][combinaison],)]
+        histogrammes = [(*portee, champ, rang, *combinaison, *(0,) * (3 - len(combinaison)), ecart, nombre)
+                        for ((champ, rang, _), combinaison), ecarts in etat.histogrammes.items()
+                        for ecart, nombre in ecarts.items()]
+        date_course, course_id = etat.marque or (None, None)
+        colonnes = ', '.join(CLES_ECARTS)
+        with self._connexion_ecriture() as conn:
+            cur = conn.cursor()
+            if ligne is None:
+                courante = cur.execute("SELECT valeur FROM meta WHERE cle = 'version_donnees'").fetchone()[0]
+                cur.execute('DELETE FROM ecarts_cles WHERE type_course = ? AND distance = ?', portee)
+                cur.execute('DELETE FROM ecarts_histogrammes WHERE type_course = ? AND distance = ?', portee)
+                cur.execute('''
+                    INSERT OR REPLACE INTO ecarts_portees
+                    (type_course, distance, nombre_courses, nombre_syntheses, date_course, course_id, perimee)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (*portee, etat.nombre_courses, etat.nombre_syntheses, date_course, course_id, int(courante != version)))
+            else:
+                cur.execute('''
+                    UPDATE ecarts_portees SET nombre_courses = ?, nombre_syntheses = ?, date_course = ?, course_id = ?
+                    WHERE type_course = ? AND distance = ? AND perimee = 0 AND nombre_courses = ? AND course_id IS ?
+                ''', (etat.nombre_courses, etat.nombre_syntheses, date_course, course_id, *portee, ligne[0], ligne[3]))
+                if cur.rowcount != 1:
+                    conn.rollback()
+                    return False
+            cur.executemany(f'''
+                INSERT OR REPLACE INTO ecarts_cles ({colonnes}, premiere, derniere, ecart_max, occurrences, apparitions, dates)
+                VALUES ({', '.join('?' * (len(CLES_ECARTS) + 6))})
+            ''', cles)
+            cur.executemany(f'''
+                INSERT INTO ecarts_histogrammes ({colonnes}, ecart, nombre) VALUES ({', '.join('?' * (len(CLES_ECARTS) + 2))})
+                ON CONFLICT ({colonnes}, ecart) DO UPDATE SET nombre = nombre + excluded.nombre
+            ''', histogrammes)
+        etat.modifiees.clear()
+        etat.histogrammes.clear()
+        return True
+
+    def histogramme_ecarts(self, combinaison: Union[int, Iterable[int]], champ: str = 'arrivee', rang: int = 0,
+                           type_course: Optional[str] = None, distance: Optional[str] = None) -> Counter:
+        """
+        Histogramme des écarts d'un numéro ou d'une combinaison, lu dans l'état incrémental des écarts (etat_ecarts) :
+        nombre de fois où chaque écart a été observé, écart initial et écart actuel compris (comme Ecarts.histogramme).
+        :param rang: Position de la synthèse (1 à NOMBRE_POSITIONS), 0 pour toutes les positions.
+        :return: Counter({écart: nombre}), vide si la clé n'est jamais présente.
+        """
+        combinaison = (combinaison,) if isinstance(combinaison, int) else tuple(sorted(combinaison))
+        etat = self.etat_ecarts(type_course, distance)
+        familles = etat.familles.get((champ, rang, len(combinaison)))
+        if familles is None:
+            raise ValueError(f"Famille d'écarts inconnue : {champ}, taille {len(combinaison)}, rang {rang}")
+        etat_cle = familles.get(combinaison)
+        if etat_cle is None:
+            return Counter()
+        numeros = (*combinaison, *(0,) * (3 - len(combinaison)))
+        with self.connexion() as conn:
+            histogramme = Counter(dict(conn.execute(f'''
+                SELECT ecart, nombre FROM ecarts_histogrammes WHERE {' AND '.join(f"{cle} = ?" for cle in CLES_ECARTS)}
+            ''', (type_course or '', distance or '', champ, rang, *numeros)).fetchall()))
+        histogramme[etat_cle.premiere] += 1
+        histogramme[(etat.nombre_syntheses if rang else etat.nombre_courses) - 1 - etat_cle.derniere] += 1
+        return histogramme
+
     def get_global_stats(self) -> Dict[str, Any]:
         """Récupère les statistiques globales."""
-        with sqlite3.connect(self.db_path) as conn:
+        total_courses, types, dates = 0, set(), []
+        with self.connexion() as conn:
             cur = conn.cursor()
-            cur.execute('SELECT COUNT(*) FROM courses')
-            total_courses = cur.fetchone()[0]
-            cur.execute('SELECT COUNT(DISTINCT type_course) FROM courses')
-            nb_types = cur.fetchone()[0]
-            cur.execute('SELECT MIN(date_course), MAX(date_course) FROM courses')
-            premiere_course, derniere_course = cur.fetchone()
+            for schema, _ in self._sources():
+                cur.execute(f'SELECT COUNT(*) FROM {schema}.courses')
+                total_courses += cur.fetchone()[0]
+                cur.execute(f'SELECT DISTINCT type_course FROM {schema}.courses WHERE type_course IS NOT NULL')
+                types.update(row[0] for row in cur.fetchall())
+                cur.execute(f'SELECT MIN(date_course), MAX(date_course) FROM {schema}.courses')
+                dates += [date_course for date_course in cur.fetchone() if date_course is not None]
             return {
                 'total_courses': total_courses,
-                'nb_types': nb_types,
-                'premiere_course': premiere_course,
-                'derniere_course': derniere_course
+                'nb_types': len(types),
+                'premiere_course': min(dates, default=None),
+                'derniere_course': max(dates, default=None)
             }
 
     def combinaison_existe(self, discipline: str, distance: str, lieu: str) -> bool:
@@ -190,14 +1804,7 @@ class Database:
         :param lieu: Le lieu de la course.
         :return: True si la combinaison existe, False sinon.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('''
-                SELECT COUNT(*) FROM courses
-                WHERE type_course = ? AND distance = ? AND lieu = ?
-            ''', (discipline, distance, lieu))
-            count = cur.fetchone()[0]
-            return count > 0
+        return lieu in self.facettes().get(discipline, {}).get(distance, {})
 
     def obtenir_lieux_disponibles_par_discipline_et_distance(self, discipline: str, distance: str) -> List[str]:
         """
@@ -206,17 +1813,11 @@ class Database:
         :param distance: La distance de la course.
         :return: Liste des lieux disponibles.
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('''
-                SELECT DISTINCT lieu FROM courses
-                WHERE type_course = ? AND distance = ?
-            ''', (discipline, distance))
-            return [row[0] for row in cur.fetchall()]
+        return _trier_facettes(self.facettes().get(discipline, {}).get(distance, {}))
 
     def verifier_structure_table(self):
         """Affiche la structure de la table 'courses'."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connexion() as conn:
             cur = conn.cursor()
             cur.execute("PRAGMA table_info(courses)")
             columns = cur.fetchall()
@@ -226,7 +1827,7 @@ class Database:
     
     def afficher_courses_avec_partants(self):
         """Affiche les courses avec leur nombre de partants."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connexion() as conn:
             cur = conn.cursor()
             cur.execute('SELECT date_course, partants FROM courses')
             for row in cur.fetchall():
@@ -239,16 +1840,13 @@ class Database:
         Returns:
             List[Dict]: Liste des courses, chaque course étant un dictionnaire.
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connexion() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM courses")
-            colonnes = [description[0] for description in cur.description]
-            print(f"Colonnes disponibles dans la table 'courses': {colonnes}")  # Afficher les colonnes
+            cur.row_factory = sqlite3.Row
             courses = []
-            for row in cur.fetchall():
-                course = dict(zip(colonnes, row))
-                print(f"Course récupérée : {course}")  # Afficher chaque course
-                courses.append(course)
+            for schema, _ in self._sources():
+                cur.execute(f"SELECT * FROM {schema}.courses")
+                courses += [dict(row) for row in cur.fetchall()]
             return courses
 
     def calculer_ecarts_numeros_arrivee_avec_participation(self, courses: List[Dict[str, Any]]) -> Dict[int, Dict[str, int]]:
@@ -0,0 +1,310 @@
+# ecarts.py
+from collections import Counter
+from collections.abc import Mapping
+from datetime import date
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from course_frame import CourseFrame, combinaisons_positions, coder_combinaisons, decoder_combinaisons
+from database import CHAMPS_POSITIONS, NOMBRE_POSITIONS
+
+# Familles de clés de l'état incrémental (EtatEcarts) : (champ, rang, taille). Rang 0 : numéros, couples et triples
+# de toutes les positions, sur toutes les courses ; rang k : numéro à la k-ième position de la synthèse,
+# sur les courses datées qui ont une synthèse (comme calculer_ecarts_premiers_synthese et suivantes)
+FAMILLES_ECARTS = ([(champ, 0, taille) for champ in CHAMPS_POSITIONS for taille in (1, 2, 3)]
+                   + [('synthese', rang, 1) for rang in range(1, NOMBRE_POSITIONS + 1)])
+# Dates des dernières occurrences conservées pour chaque numéro des familles par position
+NOMBRE_DATES_ECARTS = 3
+
+class Ecarts:
+    """
+    Écarts de toutes les clés (numéros, couples, triples, numéros à une position...) d'une matrice de présence
+    courses x clés, calculés d'un coup par différences d'indices (voir ecarts_presence et ecarts_occurrences).
+    Un écart est le nombre de courses consécutives sans la clé. Pour la clé d'indice i (cles[i], triées) :
+    - lignes[debuts[i]:debuts[i + 1]] : indices croissants des courses où elle figure ;
+      multiplicites : nombre de fois où elle y figure (un numéro répété dans une course)
+    - occurrences : nombre de courses où elle figure ; apparitions : idem, répétitions comprises
+    - ecart_initial : courses avant la première occurrence ; ecart_actuel : courses depuis la dernière
+    - ecart_max : plus grand écart entre deux occurrences ou depuis la dernière (écart initial exclu, comme
+      calculer_ecarts_numeros) ; ecart_max_interne : entre deux occurrences seulement ;
+      ecart_max_complet et ecart_min : plus grand et plus petit écart, initial compris
+    - ecart_moyen : moyenne de tous les écarts (initial, entre occurrences, actuel) ; ecart_moyen_interne :
+      moyenne des écarts entre occurrences (0 pour une seule occurrence)
+    Seules les clés présentes au moins une fois figurent dans le résultat.
+    """
+
+    def __init__(self, cles: np.ndarray, lignes: np.ndarray, debuts: np.ndarray, multiplicites: np.ndarray,
+                 nombre_courses: int):
+        self.cles = cles
+        self.lignes = lignes
+        self.debuts = debuts
+        self.multiplicites = multiplicites
+        self.nombre_courses = nombre_courses
+
+        premieres, dernieres = debuts[:-1], debuts[1:] - 1
+        precedentes = np.empty_like(lignes)
+        precedentes[1:] = lignes[:-1]
+        precedentes[premieres] = -1
+        # Écart avant chaque occurrence : l'écart initial pour la première de chaque clé
+        self.avant = lignes - precedentes - 1
+        internes = self.avant.copy()
+        internes[premieres] = 0
+
+        self.occurrences = np.diff(debuts)
+        self.apparitions = self._par_cle(np.add, multiplicites)
+        self.derniere = lignes[dernieres]
+        self.ecart_initial = lignes[premieres]
+        self.ecart_actuel = nombre_courses - 1 - self.derniere
+        self.ecart_max_interne = self._par_cle(np.maximum, internes)
+        self.ecart_max = np.maximum(self.ecart_max_interne, self.ecart_actuel)
+        self.ecart_max_complet = np.maximum(self.ecart_max, self.ecart_initial)
+        self.ecart_min = np.minimum(self._par_cle(np.minimum, self.avant), self.ecart_actuel)
+        self.somme_ecarts = self._par_cle(np.add, self.avant) + self.ecart_actuel
+        self.ecart_moyen = self.somme_ecarts / (self.occurrences + 1)
+        internes = self.somme_ecarts - self.ecart_initial - self.ecart_actuel
+        self.ecart_moyen_interne = np.where(self.occurrences > 1, internes / np.maximum(self.occurrences - 1, 1), 0.0)
+
+    def _par_cle(self, operation: np.ufunc, valeurs: np.ndarray) -> np.ndarray:
+        """Réduit valeurs (une par occurrence) sur les occurrences de chaque clé."""
+        if not len(self.cles):
+            return np.zeros(0, dtype=valeurs.dtype)
+        return operation.reduceat(valeurs, self.debuts[:-1])
+
+    def __len__(self) -> int:
+        return len(self.cles)
+
+    def indice(self, cle: int) -> int:
+        """
+        Indice d'une clé dans les tableaux du résultat.
+        :raises KeyError: Si la clé n'est jamais présente.
+        """
+        indice = int(np.searchsorted(self.cles, cle))
+        if indice == len(self.cles) or self.cles[indice] != cle:
+            raise KeyError(cle)
+        return indice
+
+    def lignes_cle(self, indice: int, repetitions: bool = False) -> np.ndarray:
+        """Indices des courses où figure la clé d'indice donné (répétés autant de fois qu'elle y figure si repetitions)."""
+        tranche = slice(self.debuts[indice], self.debuts[indice + 1])
+        return np.repeat(self.lignes[tranche], self.multiplicites[tranche]) if repetitions else self.lignes[tranche]
+
+    def ecarts_cle(self, indice: int) -> List[int]:
+        """Écarts successifs de la clé d'indice donné : initial, entre occurrences, actuel."""
+        return self.avant[self.debuts[indice]:self.debuts[indice + 1]].tolist() + [int(self.ecart_actuel[indice])]
+
+    def histogramme(self, indice: int) -> Counter:
+        """Nombre de fois où chaque écart (initial et actuel compris) a été observé pour la clé d'indice donné."""
+        return Counter(self.ecarts_cle(indice))
+
+    def histogrammes(self, bornes: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Histogrammes des écarts de toutes les clés, sous forme creuse.
+        :param bornes: Compte aussi l'écart initial et l'écart actuel de chaque clé (sinon, les écarts entre occurrences seulement).
+        :return: (indices des clés, écarts, nombre de fois), triés par clé puis par écart.
+        """
+        indices, valeurs = np.repeat(np.arange(len(self.cles)), self.occurrences), self.avant
+        if bornes:
+            indices = np.concatenate((indices, np.arange(len(self.cles))))
+            valeurs = np.concatenate((valeurs, self.ecart_actuel))
+        else:
+            suivantes = np.ones(len(valeurs), dtype=bool)
+            suivantes[self.debuts[:-1]] = False
+            indices, valeurs = indices[suivantes], valeurs[suivantes]
+        base = self.nombre_courses + 1
+        codes, comptes = np.unique(indices * base + valeurs, return_counts=True)
+        indices, valeurs = np.divmod(codes, base)
+        return indices, valeurs, comptes
+
+def ecarts_occurrences(lignes: Sequence[int], cles: Sequence[int], nombre_courses: int) -> Ecarts:
+    """
+    Écarts de toutes les clés d'une matrice de présence sous forme creuse.
+    :param lignes: Indice (chronologique) de la course de chaque présence.
+    :param cles: Clé entière de chaque présence (numéro, code de combinaison...) ; une clé peut figurer
+                 plusieurs fois pour une même course.
+    :param nombre_courses: Nombre total de courses (lignes de la matrice).
+    """
+    lignes = np.asarray(lignes, dtype=np.int64)
+    cles = np.asarray(cles, dtype=np.int64)
+    ordre = np.lexsort((lignes, cles))
+    lignes, cles = lignes[ordre], cles[ordre]
+
+    nouvelles = np.ones(len(lignes), dtype=bool)
+    nouvelles[1:] = (cles[1:] != cles[:-1]) | (lignes[1:] != lignes[:-1])
+    multiplicites = np.diff(np.append(np.flatnonzero(nouvelles), len(lignes)))
+    lignes, cles = lignes[nouvelles], cles[nouvelles]
+
+    premieres = np.ones(len(cles), dtype=bool)
+    premieres[1:] = cles[1:] != cles[:-1]
+    debuts = np.append(np.flatnonzero(premieres), len(cles))
+    return Ecarts(cles[premieres], lignes, debuts, multiplicites, nombre_courses)
+
+def ecarts_presence(presence: np.ndarray) -> Ecarts:
+    """Écarts de chaque colonne (clé) d'une matrice de présence booléenne courses x clés."""
+    cles, lignes = np.nonzero(np.asarray(presence).T)
+    return ecarts_occurrences(lignes, cles, len(presence))
+
+def par_cle(ecarts: Ecarts, cles: Sequence, colonnes: Dict[str, str]) -> Dict:
+    """
+    Dictionnaire {clé: {nom: valeur}} au format des fonctions d'écarts de analyse.py.
+    :param cles: Clés du dictionnaire, dans l'ordre de ecarts.cles (par exemple les combinaisons décodées).
+    :param colonnes: {nom dans le dictionnaire: attribut de Ecarts}.
+    """
+    valeurs = [getattr(ecarts, attribut).tolist() for attribut in colonnes.values()]
+    noms = list(colonnes)
+    return {cle: dict(zip(noms, ligne)) for cle, *ligne in zip(cles, *valeurs)}
+
+class EtatCle:
+    """
+    État d'une clé dans EtatEcarts : indices (dans sa famille) des courses de sa première et de sa dernière occurrence,
+    plus grand écart entre deux occurrences, nombre d'occurrences et d'apparitions (répétitions comprises),
+    dates des NOMBRE_DATES_ECARTS dernières occurrences (familles par position).
+    """
+    __slots__ = ('premiere', 'derniere', 'ecart_max', 'occurrences', 'apparitions', 'dates')
+
+    def __init__(self, premiere: int, derniere: int, ecart_max: int = 0, occurrences: int = 0, apparitions: int = 0,
+                 dates: Tuple[str, ...] = ()):
+        self.premiere = premiere
+        self.derniere = derniere
+        self.ecart_max = ecart_max
+        self.occurrences = occurrences
+        self.apparitions = apparitions
+        self.dates = dates
+
+class EtatEcarts:
+    """
+    État incrémental des écarts de toutes les clés (FAMILLES_ECARTS) d'un ensemble de courses pris dans l'ordre
+    chronologique. Ajouter une course ne touche que ses clés et les compteurs de courses : l'écart actuel des autres
+    clés se déduit du compteur. Les vues (ecarts) ont le format des fonctions d'écarts de analyse.py et ne dépendent
+    que du nombre de clés, pas du nombre de courses. Les numéros sont ceux des positions en base (NOMBRE_POSITIONS).
+    - nombre_courses : courses prises en compte ; nombre_syntheses : celles qui sont datées et ont une synthèse
+    - marque : clé (date_course, id) de la dernière course prise en compte
+    - familles : {famille: {combinaison triée: EtatCle}}
+    - modifiees, histogrammes : clés modifiées et écarts entre occurrences observés depuis le dernier enregistrement
+      en base (Database.etat_ecarts) : {(famille, combinaison): Counter({écart: nombre})}
+    """
+
+    def __init__(self, nombre_courses: int = 0, nombre_syntheses: int = 0, marque: Optional[Tuple[str, int]] = None):
+        self.nombre_courses = nombre_courses
+        self.nombre_syntheses = nombre_syntheses
+        self.marque = marque
+        self.familles: Dict[Tuple[str, int, int], Dict[Tuple[int, ...], EtatCle]] = {famille: {} for famille in FAMILLES_ECARTS}
+        self.modifiees: Set[Tuple[Tuple[str, int, int], Tuple[int, ...]]] = set()
+        self.histogrammes: Dict[Tuple[Tuple[str, int, int], Tuple[int, ...]], Counter] = {}
+
+    @classmethod
+    def depuis_corpus(cls, corpus: CourseFrame) -> 'EtatEcarts':
+        """
+        État de toutes les courses d'un corpus, calculé d'un coup par le noyau (ecarts_occurrences) :
+        toutes les clés sont marquées modifiées, avec tous leurs écarts entre occurrences.
+        """
+        # Courses datées dont l'une des positions de la synthèse est un numéro, comme analyse._ecarts_position_synthese
+        valides = (corpus.jours != 0) & (corpus.synthese != 0).any(axis=1)
+        etat = cls(len(corpus), int(valides.sum()))
+        if len(corpus):
+            jour = int(corpus.jours[-1])
+            etat.marque = (date.fromordinal(jour).isoformat() if jour else None, int(corpus.ids[-1]))
+        for champ in CHAMPS_POSITIONS:
+            matrice = getattr(corpus, champ)
+            base = int(matrice.max()) + 1 if matrice.size else 1
+            for taille in (1, 2, 3):
+                lignes, combinaisons_courses = combinaisons_positions(matrice, taille)
+                ecarts = ecarts_occurrences(lignes, coder_combinaisons(combinaisons_courses, base), len(matrice))
+                etat._reprendre((champ, 0, taille), ecarts, decoder_combinaisons(ecarts.cles, taille, base))
+        synthese = corpus.synthese[valides]
+        dates = [date.fromordinal(jour).isoformat() for jour in corpus.jours[valides].tolist()]
+        for rang in range(1, NOMBRE_POSITIONS + 1):
+            colonne = synthese[:, rang - 1]
+            lignes = np.flatnonzero(colonne)
+            ecarts = ecarts_occurrences(lignes, colonne[lignes], len(synthese))
+            etat._reprendre(('synthese', rang, 1), ecarts, [(cle,) for cle in ecarts.cles.tolist()], dates)
+        return etat
+
+    def _reprendre(self, famille: Tuple[str, int, int], ecarts: Ecarts, combinaisons: Sequence[Tuple[int, ...]],
+                   dates: Optional[Sequence[str]] = None) -> None:
+        """Reprend les écarts d'une famille calculés par le noyau (combinaisons dans l'ordre de ecarts.cles)."""
+        etats = self.familles[famille]
+        for indice, *valeurs in zip(range(len(ecarts)), ecarts.ecart_initial.tolist(), ecarts.derniere.tolist(),
+                                    ecarts.ecart_max_interne.tolist(), ecarts.occurrences.tolist(), ecarts.apparitions.tolist()):
+            derniers = ()
+            if dates is not None:
+                lignes = ecarts.lignes_cle(indice)[-NOMBRE_DATES_ECARTS:]
+                derniers = tuple(dates[ligne] for ligne in lignes.tolist())
+            etats[combinaisons[indice]] = EtatCle(*valeurs, dates=derniers)
+            self.modifiees.add((famille, combinaisons[indice]))
+        indices, valeurs, comptes = ecarts.histogrammes(bornes=False)
+        if not len(indices):
+            return
+        # Un Counter par clé, formé d'une tranche des tableaux triés par clé
+        bornes = [0, *(np.flatnonzero(np.diff(indices)) + 1).tolist(), len(indices)]
+        indices, valeurs, comptes = indices.tolist(), valeurs.tolist(), comptes.tolist()
+        for debut, fin in zip(bornes[:-1], bornes[1:]):
+            self.histogrammes[(famille, combinaisons[indices[debut]])] = Counter(dict(zip(valeurs[debut:fin], comptes[debut:fin])))
+
+    def ajouter_course(self, course: Mapping[str, Any]) -> None:
+        """
+        Prend en compte une course postérieure à toutes les autres, au format de Database.get_courses(positions=True)
+        (date_course, id, arrivee_numeros, synthese_numeros) : seules ses clés sont touchées.
+        """
+        for champ in CHAMPS_POSITIONS:
+            numeros = sorted(numero for numero in course[f"{champ}_numeros"] if numero is not None)
+            for taille in (1, 2, 3):
+                for combinaison, nombre in Counter(combinations(numeros, taille)).items():
+                    self._toucher((champ, 0, taille), combinaison, self.nombre_courses, nombre)
+        self.nombre_courses += 1
+        # Rang réel de chaque numéro, positions absentes sautées ; comme depuis_corpus, une synthèse compte si l'une
+        # de ses positions est un numéro
+        synthese = course['synthese_numeros']
+        if course['date_course'] and any(numero is not None for numero in synthese):
+            for rang, numero in enumerate(synthese, start=1):
+                if numero is not None:
+                    self._toucher(('synthese', rang, 1), (numero,), self.nombre_syntheses, 1, course['date_course'])
+            self.nombre_syntheses += 1
+        self.marque = (course['date_course'], course['id'])
+
+    def _toucher(self, famille: Tuple[str, int, int], combinaison: Tuple[int, ...], indice: int, nombre: int,
+                 date_course: Optional[str] = None) -> None:
+        """Occurrence d'une clé à la course d'indice donné (dans sa famille), nombre fois."""
+        etats = self.familles[famille]
+        etat = etats.get(combinaison)
+        if etat is None:
+            etat = etats[combinaison] = EtatCle(indice, indice)
+        else:
+            ecart = indice - etat.derniere - 1
+            histogramme = self.histogrammes.get((famille, combinaison))
+            if histogramme is None:
+                histogramme = self.histogrammes[(famille, combinaison)] = Counter()
+            histogramme[ecart] += 1
+            etat.ecart_max = max(etat.ecart_max, ecart)
+            etat.derniere = indice
+        etat.occurrences += 1
+        etat.apparitions += nombre
+        if date_course:
+            etat.dates = (*etat.dates, date_course)[-NOMBRE_DATES_ECARTS:]
+        self.modifiees.add((famille, combinaison))
+
+    def ecarts(self, champ: str = 'arrivee', taille: int = 1, rang: int = 0, ecart_initial: bool = False) -> Dict:
+        """
+        Écarts d'une famille au format des fonctions de analyse.py : {numéro ou combinaison: {'derniere_occurrence',
+        'ecart_actuel', 'ecart_max', 'total_occurrences', 'apparitions'}}, avec 'frequence' et 'occurrences'
+        (dates des NOMBRE_DATES_ECARTS dernières) pour une position de la synthèse.
+        :param taille: 1 (numéros), 2 (couples) ou 3 (triples).
+        :param rang: Position de la synthèse (1 à NOMBRE_POSITIONS), 0 pour toutes les positions.
+        :param ecart_initial: L'écart avant la première occurrence compte dans l'écart maximum (calculer_ecarts_combinaisons).
+        """
+        famille = (champ, rang, taille)
+        if famille not in self.familles:
+            raise ValueError(f"Famille d'écarts inconnue : {champ}, taille {taille}, rang {rang}")
+        total = self.nombre_syntheses if rang else self.nombre_courses
+        resultat = {}
+        for combinaison, etat in sorted(self.familles[famille].items()):
+            actuel = total - 1 - etat.derniere
+            donnees = {'derniere_occurrence': etat.derniere, 'ecart_actuel': actuel,
+                       'ecart_max': max(etat.ecart_max, actuel, etat.premiere if ecart_initial else 0),
+                       'total_occurrences': etat.occurrences, 'apparitions': etat.apparitions}
+            if rang:
+                donnees['frequence'] = etat.occurrences / total * 100
+                donnees['occurrences'] = list(etat.dates)
+            resultat[combinaison[0] if taille == 1 else combinaison] = donnees
+        return resultat
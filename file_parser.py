@@ -1,71 +1,287 @@
 # file_parser.py
+import os
 import re
+import json
+import codecs
 from pathlib import Path
 import chardet
 from datetime import datetime
-from typing import Optional, Dict, Any, List 
+from typing import Optional, Dict, Any, List, Tuple
 
-def detect_encoding(file_path: str) -> str:
+# Motifs précompilés utilisés par le parser en une passe
+RE_DATE = re.compile(r'(\d{2})/(\d{2})/(\d{4})')
+RE_LIEU = re.compile(r'(.*?) /')
+RE_DISCIPLINE = re.compile(r'\s*(Attelé|Steeple-chase|Haies|Plat|Monté)')
+RE_DISTANCE = re.compile(r'Tiercé Quarté\+ Quinté\+ Multi / (\d+m)')
+RE_ENTETE_ARRIVEE = re.compile(r'Arrivée du Tiercé/Quarté\+/Quinté\+')
+RE_ENTETE_SYNTHESE = re.compile(r'Place des 5 premiers dans la synthèse')
+RE_SUITE_ARRIVEE = re.compile(r'[\d\s-]*')
+RE_SUITE_SYNTHESE = re.compile(r'[\d\w\s-]*')
+RE_PARTANT = re.compile(r'(\d{1,2})(?:er|e)?\s+(\d+)')  # Gère "1er", "2e", etc.
+RE_LIGNE_CLASSEMENT = re.compile(r'(\d{1,2})(?:er|e)?\s+(\d+)\s+(.*\S)\s+(\d+)\s*$')
+
+TAILLE_DETECTION = 10000  # Octets analysés pour détecter l'encodage
+
+class CacheEncodages:
+    """
+    Encodages déjà résolus, par chemin de fichier, validés par (taille, mtime).
+    Persisté en JSON pour que les nouveaux scans et les ré-ingestions n'aient pas à refaire la détection.
+    """
+    VERSION = 1
+
+    def __init__(self, chemin: Optional[str] = None):
+        self.chemin = Path(chemin) if chemin else None
+        self.entrees: Dict[str, List[Any]] = {}
+        self.modifie = False
+        if self.chemin and self.chemin.exists():
+            try:
+                with open(self.chemin, 'r', encoding='utf-8') as f:
+                    contenu = json.load(f)
+                if contenu.get('version') == self.VERSION:
+                    self.entrees = contenu.get('fichiers', {})
+            except (OSError, ValueError) as e:
+                print(f"Cache des encodages ignoré ({self.chemin}): {str(e)}")
+
+    @staticmethod
+    def _cle(file_path) -> str:
+        return os.path.abspath(file_path)
+
+    @staticmethod
+    def _signature(file_path) -> Tuple[int, int]:
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def obtenir(self, file_path) -> Optional[str]:
+        """Retourne l'encodage mémorisé, ou None si le fichier est inconnu ou a changé depuis."""
+        entree = self.entrees.get(self._cle(file_path))
+        if entree is None:
+            return None
+        try:
+            taille, mtime = self._signature(file_path)
+        except OSError:
+            return None
+        return entree[2] if (entree[0], entree[1]) == (taille, mtime) else None
+
+    def enregistrer(self, file_path, encodage: str) -> None:
+        """Mémorise l'encodage du fichier dans son état actuel (taille, mtime)."""
+        try:
+            taille, mtime = self._signature(file_path)
+        except OSError:
+            return
+        cle = self._cle(file_path)
+        if self.entrees.get(cle) != [taille, mtime, encodage]:
+            self.entrees[cle] = [taille, mtime, encodage]
+            self.modifie = True
+
+    def sauvegarder(self) -> None:
+        """Écrit le cache sur disque s'il a changé (écriture atomique)."""
+        if not self.chemin or not self.modifie:
+            return
+        temporaire = self.chemin.with_name(self.chemin.name + '.tmp')
+        try:
+            with open(temporaire, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'fichiers': self.entrees}, f)
+            os.replace(temporaire, self.chemin)
+            self.modifie = False
+        except OSError as e:
+            print(f"Impossible d'enregistrer le cache des encodages ({self.chemin}): {str(e)}")
+
+def resoudre_encodage(raw_data: bytes, complet: bool = True) -> str:
+    """
+    Résout l'encodage d'un contenu brut : décodage strict UTF-8, puis cp1252, chardet en dernier recours.
+    :param raw_data: Octets du fichier (ou de son début).
+    :param complet: False si raw_data est tronqué (un caractère multi-octets peut être coupé à la fin).
+    :return: Nom de l'encodage.
+    """
+    if raw_data.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if raw_data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(raw_data, final=complet)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    # cp1252 accepte presque tous les octets : un octet nul signale plutôt un encodage multi-octets
+    if b'\x00' not in raw_data:
+        try:
+            raw_data.decode('cp1252')
+            return 'cp1252'
+        except UnicodeDecodeError:
+            pass
+    result = chardet.detect(raw_data)
+    return result['encoding'] or 'ISO-8859-1'
+
+def detect_encoding(file_path: str, cache: Optional[CacheEncodages] = None) -> str:
     """Détecte l'encodage du fichier avec fallback"""
     try:
+        if cache is not None:
+            encodage = cache.obtenir(file_path)
+            if encodage:
+                return encodage
         with open(file_path, 'rb') as f:
-            raw_data = f.read(10000)  # Analyse les premiers 10ko
-            result = chardet.detect(raw_data)
-            return result['encoding'] or 'ISO-8859-1'
+            raw_data = f.read(TAILLE_DETECTION + 1)  # Analyse les premiers 10ko
+        encodage = resoudre_encodage(raw_data[:TAILLE_DETECTION], complet=len(raw_data) <= TAILLE_DETECTION)
+        if cache is not None:
+            cache.enregistrer(file_path, encodage)
+        return encodage
     except Exception as e:
         print(f"Erreur lors de la détection de l'encodage: {str(e)}")
         return 'ISO-8859-1'
 
-def parse_file(file_path: str) -> Optional[Dict[str, Any]]:
-    try:
-        # Détection de l'encodage et lecture du fichier
-        encoding = detect_encoding(file_path)
-        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
-            content = f.read()
-
-        if not content.strip():
-            raise ValueError("Le fichier est vide ou mal formaté.")
-
-        # Extraction de la date avec formatage robuste
-        date_match = re.search(r'(\d{2}/\d{2}/\d{4})', content)
-        if not date_match:
-            raise ValueError("Date non trouvée dans le fichier.")
-        date = datetime.strptime(date_match.group(1), '%d/%m/%Y').strftime('%Y-%m-%d')
-
-        # Extraction du lieu
-        lieu_match = re.search(r'^(.*?) /', content, re.MULTILINE)
-        lieu = lieu_match.group(1).strip() if lieu_match else "Inconnu"
-        # Extraction de la discipline
-        discipline_match = re.search(r'^\s*(Attelé|Steeple-chase|Haies|Plat|Monté)\s*', content, re.MULTILINE)
-        discipline = discipline_match.group(1).strip() if discipline_match else "Inconnu"
-        # Extraction de la distance
-        distance_match = re.search(r'Tiercé Quarté\+ Quinté\+ Multi / (\d+m)', content)
-        distance = distance_match.group(1).strip() if distance_match else "Inconnu"
-        # Extraction de l'arrivée
-        arrivee_match = re.search(r'Arrivée du Tiercé/Quarté\+/Quinté\+\s*([\d\s-]+)', content)
-        arrivee = arrivee_match.group(1).strip() if arrivee_match else ""
-        # Extraction de la synthèse
-        synthese_match = re.search(r'Place des 5 premiers dans la synthèse\s*([\d\w\s-]+)', content)
-        synthese = synthese_match.group(1).strip() if synthese_match else ""
-        # Extraction des partants
-        partants = set()
-        for line in content.splitlines():
-            match = re.match(r'(\d{1,2})(?:er|e)?\s+(\d+)', line)  # Gère "1er", "2e", etc.
+def _lire_ligne_classement(line: str) -> Optional[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Lit une ligne du tableau (rang, numéro, nom, gains).
+    :return: (numéro du partant, ligne du classement ou None si incomplète), ou None si ce n'est pas un partant.
+    """
+    match = RE_LIGNE_CLASSEMENT.match(line)
+    if match:
+        numero = int(match.group(2))
+        return numero, {'rang': int(match.group(1)), 'numero': numero, 'nom': match.group(3), 'gains': int(match.group(4))}
+    match = RE_PARTANT.match(line)
+    if match:
+        return int(match.group(2)), None  # Le numéro du cheval est le deuxième élément
+    return None
+
+def parse_contenu(content: str, source: str = "") -> Dict[str, Any]:
+    """
+    Extrait les données d'une note en une seule passe ligne par ligne.
+    Tant que l'en-tête (date, lieu, discipline, distance) n'est pas complet, chaque ligne y est confrontée ;
+    ensuite seules les lignes du tableau et les blocs d'arrivée et de synthèse sont analysés.
+    :param content: Texte de la note.
+    :param source: Nom du fichier (utilisé dans les messages d'erreur).
+    :return: Dictionnaire de la course, avec le classement complet de la note.
+    :raises ValueError: Si la note est vide, sans date ou sans partant.
+    """
+    if not content.strip():
+        raise ValueError("Le fichier est vide ou mal formaté.")
+
+    date = lieu = discipline = distance = None
+    en_tete_complet = False
+    partants = set()
+    classement = []
+    # Blocs qui suivent les en-têtes d'arrivée et de synthèse : liste des morceaux lus
+    arrivee = synthese = None
+    # Bloc en cours de lecture : (morceaux, motif des caractères admis)
+    bloc = None
+
+    for line in content.splitlines():
+        if bloc is not None:
+            morceaux, motif = bloc
+            suite = motif.match(line).group(0)
+            morceaux.append(suite)
+            if len(suite) == len(line):
+                continue
+            bloc = None
+
+        if line[:1].isdecimal():
+            # Chemin rapide pour les lignes bien formées du tableau : "1er \t16 \tMurciano \t\t5358"
+            parts = line.split()
+            rang = parts[0].rstrip('er')
+            if len(parts) >= 4 and len(rang) <= 2 and rang.isdecimal() and parts[1].isdecimal() and parts[-1].isdecimal() \
+                    and len(parts[0]) - len(rang) < 3 and parts[0][len(rang):] in ('', 'e', 'er'):
+                numero = int(parts[1])
+                partants.add(numero)
+                classement.append({'rang': int(rang), 'numero': numero, 'nom': ' '.join(parts[2:-1]), 'gains': int(parts[-1])})
+                if en_tete_complet:
+                    continue
+            else:
+                ligne = _lire_ligne_classement(line)
+                if ligne is not None:
+                    partants.add(ligne[0])
+                    if ligne[1] is not None:
+                        classement.append(ligne[1])
+                    if en_tete_complet:
+                        continue
+        elif not line or line.isspace():
+            continue
+
+        if not en_tete_complet:
+            if date is None:
+                match = RE_DATE.search(line)
+                if match:
+                    date = match
+            if lieu is None and ' /' in line:
+                lieu = RE_LIEU.match(line).group(1).strip()
+            if discipline is None:
+                match = RE_DISCIPLINE.match(line)
+                if match:
+                    discipline = match.group(1)
+            if distance is None and 'Multi /' in line:
+                match = RE_DISTANCE.search(line)
+                if match:
+                    distance = match.group(1)
+            en_tete_complet = None not in (date, lieu, discipline, distance)
+
+        if arrivee is None and 'Arrivée' in line:
+            match = RE_ENTETE_ARRIVEE.search(line)
+            if match:
+                arrivee = []
+                bloc = _ouvrir_bloc(arrivee, RE_SUITE_ARRIVEE, line[match.end():])
+        elif synthese is None and 'synthèse' in line:
+            match = RE_ENTETE_SYNTHESE.search(line)
             if match:
-                partants.add(int(match.group(2)))  # Le numéro du cheval est le deuxième élément
-
-        if not partants:
-            raise ValueError(f"Aucun partant trouvé dans le fichier {file_path}")
-
-        return {
-            'date': date,
-            'lieu': lieu,
-            'type': discipline,
-            'distance': distance,
-            'arrivée': arrivee,
-            'synthese': synthese,
-            'partants': list(partants)  # Convertir en liste pour stockage
-        }
+                synthese = []
+                bloc = _ouvrir_bloc(synthese, RE_SUITE_SYNTHESE, line[match.end():])
+
+    if date is None:
+        raise ValueError("Date non trouvée dans le fichier.")
+    if not partants:
+        raise ValueError(f"Aucun partant trouvé dans le fichier {source}")
+
+    jour, mois, annee = date.groups()
+    return {
+        'date': datetime(int(annee), int(mois), int(jour)).strftime('%Y-%m-%d'),
+        'lieu': lieu or "Inconnu",
+        'type': discipline or "Inconnu",
+        'distance': distance or "Inconnu",
+        'arrivée': '\n'.join(arrivee).strip() if arrivee is not None else "",
+        'synthese': '\n'.join(synthese).strip() if synthese is not None else "",
+        'partants': list(partants),  # Convertir en liste pour stockage
+        'classement': classement
+    }
+
+def _ouvrir_bloc(morceaux: List[str], motif: re.Pattern, reste: str) -> Optional[Tuple[List[str], re.Pattern]]:
+    """Lit la fin de la ligne d'en-tête ; retourne le bloc à poursuivre sur les lignes suivantes, ou None s'il est clos."""
+    suite = motif.match(reste).group(0)
+    morceaux.append(suite)
+    return (morceaux, motif) if len(suite) == len(reste) else None
+
+def parse_octets(raw_data: bytes, source: str = "", encoding: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Décode et analyse le contenu brut d'une note (fichier ou membre d'archive).
+    :param raw_data: Octets de la note.
+    :param source: Nom de la note (utilisé dans les messages d'erreur).
+    :param encoding: Encodage déjà connu (cache) ; résolu à partir du contenu s'il est absent.
+    :return: (données de la course ou None en cas d'erreur, encodage utilisé).
+    """
+    try:
+        if encoding is None:
+            encoding = resoudre_encodage(raw_data[:TAILLE_DETECTION], complet=len(raw_data) <= TAILLE_DETECTION)
+        content = raw_data.decode(encoding, errors='replace')
+        return parse_contenu(content, source), encoding
+    except Exception as e:
+        print(f"Erreur lors du parsing du fichier {source}: {str(e)}")
+        return None, encoding
+
+def parse_file_encodage(file_path: str, encoding: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Lit et analyse une note en une seule lecture du fichier.
+    :param file_path: Chemin de la note.
+    :param encoding: Encodage déjà connu (cache) ; résolu à partir du contenu s'il est absent.
+    :return: (données de la course ou None en cas d'erreur, encodage utilisé ou None si le fichier est illisible).
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            raw_data = f.read()
     except Exception as e:
         print(f"Erreur lors du parsing du fichier {file_path}: {str(e)}")
-        return None
\ No newline at end of file
+        return None, None
+    return parse_octets(raw_data, str(file_path), encoding)
+
+def parse_file(file_path: str, cache: Optional[CacheEncodages] = None) -> Optional[Dict[str, Any]]:
+    encoding = cache.obtenir(file_path) if cache is not None else None
+    donnees, encoding_resolu = parse_file_encodage(file_path, encoding)
+    if cache is not None and encoding_resolu and encoding is None:
+        cache.enregistrer(file_path, encoding_resolu)
+    return donnees
@@ -1,6 +1,10 @@
 # gestionnaire_courses.py
 import os
 import sqlite3
+import time
+import hashlib
+import tarfile
+import zipfile
 import pandas as pd
 import logging
 import itertools
@@ -12,10 +16,11 @@ from matplotlib.ticker import MaxNLocator
 from itertools import combinations
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Any, Tuple
-from database import Database
-from file_parser import parse_file
+from typing import List, Dict, Optional, Any, Tuple, Iterable, Iterator, Set
+from database import Database, STATUT_SUCCES, STATUT_DEJA_TRAITE, NOMBRE_POSITIONS
+from file_parser import parse_file_encodage, parse_octets, CacheEncodages
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from prediction import preparer_donnees, entrainer_modele, afficher_graphique_precision
 from analyse import (
     analyse_positions,
@@ -24,8 +29,6 @@ from analyse import (
     analyser_couples_synthese,
     analyser_triples_synthese,
     analyser_ecarts_synthese,
-    calculer_ecarts_numeros,
-    calculer_ecarts_combinaisons,
     afficher_graphique_frequence,
     afficher_graphique_ecarts,
     afficher_graphique_frequence_numeros,
@@ -34,7 +37,7 @@ from analyse import (
     analyser_couples_arrivee,
     analyser_triples_arrivee,
     analyser_ecarts_arrivee,
-    calculer_ecarts_numeros_arrivee, calculer_ecarts_couples_arrivee, calculer_ecarts_triples_arrivee, analyser_par_discipline_et_distance_arrivee, analyse_positions_arrivee, extraire_partants, analyser_numero_synthese,calculer_ecarts_premiers_synthese, calculer_ecarts_deuxiemes_synthese, calculer_ecarts_troisiemes_synthese, calculer_ecarts_quatriemes_synthese, calculer_ecarts_cinquiemes_synthese, analyse_ecart_finissant_premier, analyse_ecart_finissant_deuxieme, analyse_ecart_finissant_troisieme 
+    analyser_par_discipline_et_distance_arrivee, analyse_positions_arrivee, extraire_partants, analyser_numero_synthese, analyse_ecart_finissant_premier, analyse_ecart_finissant_deuxieme, analyse_ecart_finissant_troisieme 
 )
 from ml_predictions import preparer_donnees_ml
 
@@ -42,26 +45,287 @@ logging.basicConfig(level=logging.DEBUG)  # Active les logs de débogage
 DATE_ACTUELLE_SIMULEE = datetime(2025, 2, 10)
 DATE_ACTUELLE_SIMULEE += timedelta(days=1)  # Après chaque journée de courses
 
+# Cache des encodages détectés : à côté de la base (<base>.encodages.json), hors du dossier des notes
+SUFFIXE_CACHE_ENCODAGES = '.encodages.json'
+# Emplacement des versions précédentes, dans le dossier des notes : déplacé à côté de la base
+ANCIEN_CACHE_ENCODAGES = '.encodages.json'
+
+# Archives de notes lues sans extraction ; leurs notes sont identifiées par "archive::membre"
+EXTENSIONS_ARCHIVES = ('.zip', '.tar', '.tar.gz', '.tgz')
+SEPARATEUR_ARCHIVE = '::'
+
+# Les agrégats de la base et l'état des écarts ne lisent que les colonnes par position : mention affichée par les
+# menus de fréquences et d'écarts qui les lisent
+MENTION_AGREGATS = f"(sur les {NOMBRE_POSITIONS} premières places de chaque course, les suivantes ne sont pas comptées)"
+
+def empreinte_contenu(contenu: bytes) -> str:
+    """Empreinte d'un contenu, utilisée pour repérer les notes modifiées et les doublons."""
+    return hashlib.blake2b(contenu, digest_size=16).hexdigest()
+
+def empreinte_fichier(chemin: Path) -> str:
+    """Empreinte du contenu d'un fichier."""
+    with open(chemin, 'rb') as f:
+        return empreinte_contenu(f.read())
+
+def est_archive(nom: str) -> bool:
+    return nom.lower().endswith(EXTENSIONS_ARCHIVES)
+
+def membres_archive(chemin: Path) -> Iterator[Tuple[str, int, bytes]]:
+    """
+    Parcourt les notes (.txt) d'une archive zip ou tar (éventuellement compressée) sans l'extraire sur disque.
+    :return: Itérateur de (nom du membre, mtime_ns, contenu).
+    """
+    if zipfile.is_zipfile(chemin):
+        with zipfile.ZipFile(chemin) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.endswith('.txt'):
+                    yield info.filename, int(datetime(*info.date_time).timestamp()) * 10**9, archive.read(info)
+    else:
+        # Lecture en flux : les membres sont décompressés dans l'ordre, sans retour en arrière
+        with tarfile.open(chemin, 'r|*') as archive:
+            for membre in archive:
+                if membre.isfile() and membre.name.endswith('.txt'):
+                    yield membre.name, int(membre.mtime) * 10**9, archive.extractfile(membre).read()
+
 class GestionnaireCourses:
     
     def __init__(self, dossier_notes: str, db: Database):  # <-- Accepter une instance de Database
         self.dossier_notes = Path(dossier_notes)
         self.db = db  # Utiliser l'instance de Database passée en paramètre
+        # Encodages déjà détectés, conservés à côté de la base (clé : chemin, taille, mtime)
+        self.cache_encodages = CacheEncodages(self._chemin_cache_encodages())
+
+    def _chemin_cache_encodages(self) -> Optional[Path]:
+        """
+        Fichier du cache des encodages, à côté de la base ; None pour une base en mémoire (cache non persisté).
+        Un cache laissé dans le dossier des notes par une version précédente y est déplacé.
+        """
+        if self.db.db_path == ':memory:':
+            return None
+        chemin = Path(f"{self.db.db_path}{SUFFIXE_CACHE_ENCODAGES}")
+        ancien = self.dossier_notes / ANCIEN_CACHE_ENCODAGES
+        if ancien.is_file() and not chemin.exists():
+            try:
+                os.replace(ancien, chemin)
+            except OSError as e:
+                print(f"Ancien cache des encodages laissé dans {ancien} : {e}")
+        return chemin
 
     def scanner_nouveaux_fichiers(self) -> List[str]:
-        """Scanne le dossier pour trouver les nouveaux fichiers non traités."""
-        fichiers_existants = [f.name for f in self.dossier_notes.glob('*.txt')]
-        fichiers_traites = self.db.get_processed_files()
-        return [f for f in fichiers_existants if f not in fichiers_traites]
-
-    def traiter_fichiers(self) -> None:
-        """Traite tous les nouveaux fichiers et sauvegarde les données dans la base."""
-        nouveaux_fichiers = self.scanner_nouveaux_fichiers()
-        for fichier in nouveaux_fichiers:
-            donnees = parse_file(self.dossier_notes / fichier)
-            if donnees:
-                self.db.save_course(fichier, donnees)
+        """Scanne le dossier pour trouver les fichiers à traiter (nouveaux ou modifiés depuis leur ingestion)."""
+        return self.planifier_ingestion()[0]
+
+    def planifier_ingestion(self) -> Tuple[List[str], Set[str], List[Tuple[str, str]], Dict[str, Tuple[int, int, str]],
+                                           List[Tuple[str, int, int, str, Optional[str]]]]:
+        """
+        Compare le dossier au manifeste d'ingestion, sans rien écrire. Un fichier dont la taille et le mtime
+        n'ont pas changé n'est pas relu ; les autres sont relus pour calculer leur empreinte. Un fichier traité
+        avant l'introduction du manifeste est parsé et comparé à sa course enregistrée : modifié depuis,
+        il est à remplacer.
+        :return: (fichiers à parser, fichiers déjà traités dont la course est à remplacer,
+                  doublons (nom, original) à enregistrer sans parsing, signatures (taille, mtime_ns, empreinte) relevées,
+                  entrées du manifeste des fichiers inchangés, à enregistrer lors de l'ingestion).
+        """
+        manifeste = self.db.get_manifeste()
+        fichiers_traites = set(self.db.get_processed_files())
+        # Empreinte -> fichier original, pour reconnaître les copies à l'identique
+        originaux = {entree[2]: nom for nom, entree in manifeste.items() if entree[3] is None}
+
+        a_traiter, remplaces, doublons, signatures = [], set(), [], {}
+        inchanges = []  # Fichiers déjà traités dont seul le mtime a changé, ou traités avant le manifeste
+        with os.scandir(self.dossier_notes) as entrees:
+            fichiers = sorted((entree.name, entree.stat()) for entree in entrees
+                              if entree.name.endswith('.txt') and entree.is_file())
+        for nom, stat in fichiers:
+            connu = manifeste.get(nom)
+            if connu is not None and (connu[0], connu[1]) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            empreinte = empreinte_fichier(self.dossier_notes / nom)
+            signatures[nom] = (stat.st_size, stat.st_mtime_ns, empreinte)
+            if connu is not None and connu[2] == empreinte:
+                inchanges.append((nom, stat.st_size, stat.st_mtime_ns, empreinte, connu[3]))
+                continue
+            original = originaux.get(empreinte)
+            if original is not None and original != nom:
+                doublons.append((nom, original))
+            elif nom in fichiers_traites and connu is None and self._course_inchangee(nom):
+                # Fichier ingéré avant l'introduction du manifeste, identique à sa course : il est seulement recensé
+                inchanges.append((nom, stat.st_size, stat.st_mtime_ns, empreinte, None))
+                originaux.setdefault(empreinte, nom)
+            else:
+                a_traiter.append(nom)
+                originaux.setdefault(empreinte, nom)
+                if nom in fichiers_traites:
+                    remplaces.add(nom)
+        return a_traiter, remplaces, doublons, signatures, inchanges
+
+    def _course_inchangee(self, nom: str) -> bool:
+        """Parse une note traitée avant le manifeste et la compare à sa course enregistrée (Database.course_inchangee)."""
+        chemin = self.dossier_notes / nom
+        encodage_connu = self.cache_encodages.obtenir(chemin)
+        donnees, encodage = parse_file_encodage(chemin, encodage_connu)
+        if encodage and encodage_connu is None:
+            self.cache_encodages.enregistrer(chemin, encodage)
+        return bool(donnees) and self.db.course_inchangee(nom, donnees)
+
+    def traiter_fichiers(self, processus: Optional[int] = None, taille_lot: int = 50) -> None:
+        """
+        Traite tous les nouveaux fichiers et sauvegarde les données dans la base.
+        Les notes modifiées depuis leur ingestion remplacent leur course ; les copies à l'identique
+        d'une note déjà ingérée sont enregistrées comme doublons sans être parsées. Les archives
+        (.zip, .tar, .tar.gz) du dossier sont lues sans extraction, après les fichiers.
+        :param processus: Nombre de processus utilisés pour le parsing des fichiers (None ou 1 : traitement séquentiel).
+        :param taille_lot: Nombre de courses transmises à la base par lot.
+        """
+        nouveaux_fichiers, remplaces, doublons, signatures, inchanges = self.planifier_ingestion()
+        if inchanges:
+            self.db.mettre_a_jour_manifeste(inchanges)
+        if doublons:
+            self.enregistrer_doublons(doublons, signatures)
+        if nouveaux_fichiers:
+            debut = time.perf_counter()
+            chemins = [self.dossier_notes / fichier for fichier in nouveaux_fichiers]
+            # Les encodages connus sont lus dans le processus principal et transmis aux workers
+            encodages = [self.cache_encodages.obtenir(chemin) for chemin in chemins]
+            if processus and processus > 1:
+                # executor.map conserve l'ordre des fichiers : les lignes insérées sont identiques au mode séquentiel
+                chunksize = max(1, len(chemins) // (processus * 4))
+                with ProcessPoolExecutor(max_workers=processus) as executor:
+                    resultats = executor.map(parse_file_encodage, chemins, encodages, chunksize=chunksize)
+                    self.sauvegarder_courses(zip(nouveaux_fichiers, self._memoriser_encodages(chemins, encodages, resultats)),
+                                             taille_lot, remplaces, signatures)
+            else:
+                resultats = map(parse_file_encodage, chemins, encodages)
+                self.sauvegarder_courses(zip(nouveaux_fichiers, self._memoriser_encodages(chemins, encodages, resultats)),
+                                         taille_lot, remplaces, signatures)
+            self.cache_encodages.sauvegarder()
+
+            duree = time.perf_counter() - debut
+            debit = len(nouveaux_fichiers) / duree if duree > 0 else float('inf')
+            print(f"{len(nouveaux_fichiers)} fichiers traités en {duree:.2f} s ({debit:.1f} fichiers/s)")
+
+        for archive, taille, mtime_ns in self.planifier_archives():
+            self.traiter_archive(archive, taille, mtime_ns, taille_lot)
+        # Report du journal WAL après une ingestion (sans attendre les lecteurs en cours)
+        self.db.checkpoint()
+
+    def planifier_archives(self) -> List[Tuple[str, int, int]]:
+        """
+        Liste les archives du dossier à lire : nouvelles, ou modifiées depuis leur dernière lecture complète.
+        :return: Liste de (nom de l'archive, taille, mtime_ns).
+        """
+        manifeste = self.db.get_manifeste()
+        with os.scandir(self.dossier_notes) as entrees:
+            archives = sorted((entree.name, entree.stat()) for entree in entrees if est_archive(entree.name) and entree.is_file())
+        return [(nom, stat.st_size, stat.st_mtime_ns) for nom, stat in archives
+                if nom not in manifeste or manifeste[nom][:2] != (stat.st_size, stat.st_mtime_ns)]
+
+    def lire_archive(self, archive: str) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Tuple[int, int, str], bool, Optional[str]]]:
+        """
+        Parse au fil de l'eau les notes d'une archive du dossier. Les notes déjà ingérées à l'identique sont
+        ignorées ; les copies d'une note déjà ingérée sont signalées comme doublons sans être parsées.
+        :param archive: Nom de l'archive dans le dossier des notes.
+        :return: Itérateur de (clé "archive::membre", données (None si doublon ou échec du parsing),
+                 signature (taille, mtime_ns, empreinte), course à remplacer, original du doublon ou None).
+        """
+        manifeste = self.db.get_manifeste()
+        fichiers_traites = set(self.db.get_processed_files())
+        originaux = {entree[2]: nom for nom, entree in manifeste.items() if entree[3] is None and entree[2]}
+        for membre, mtime_ns, contenu in membres_archive(self.dossier_notes / archive):
+            cle = f"{archive}{SEPARATEUR_ARCHIVE}{membre}"
+            empreinte = empreinte_contenu(contenu)
+            connu = manifeste.get(cle)
+            if connu is not None and connu[2] == empreinte:
+                continue
+            signature = (len(contenu), mtime_ns, empreinte)
+            original = originaux.get(empreinte)
+            if original is not None and original != cle:
+                yield cle, None, signature, False, original
+                continue
+            originaux.setdefault(empreinte, cle)
+            donnees, _ = parse_octets(contenu, cle)
+            yield cle, donnees, signature, cle in fichiers_traites, None
+
+    def traiter_archive(self, archive: str, taille: int, mtime_ns: int, taille_lot: int = 50) -> None:
+        """
+        Ingère les notes d'une archive du dossier sans l'extraire. L'archive n'est inscrite au manifeste
+        (et donc ignorée aux scans suivants) que si toutes ses notes ont été enregistrées.
+        """
+        signatures, remplaces, doublons, transmis = {}, set(), [], []
+
+        def courses():
+            for cle, donnees, signature, remplace, original in self.lire_archive(archive):
+                signatures[cle] = signature
+                if original is not None:
+                    doublons.append((cle, original))
+                    continue
+                if remplace:
+                    remplaces.add(cle)
+                transmis.append(cle)
+                yield cle, donnees
+
+        try:
+            enregistres = self.sauvegarder_courses(courses(), taille_lot, remplaces, signatures)
+        except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            print(f"Erreur lors de la lecture de l'archive {archive} : {e}")
+            return
+        if doublons:
+            self.enregistrer_doublons(doublons, signatures)
+        print(f"Archive {archive} : {len(enregistres)} notes enregistrées, {len(doublons)} doublons.")
+        if len(enregistres) == len(transmis):
+            self.db.mettre_a_jour_manifeste([(archive, taille, mtime_ns, None, None)])
+
+    def _memoriser_encodages(self, chemins: List[Path], encodages: List[Optional[str]],
+                             resultats: Iterable[Tuple[Optional[Dict[str, Any]], Optional[str]]]) -> Iterable[Optional[Dict[str, Any]]]:
+        """Ajoute au cache les encodages résolus par le parsing et transmet les données des courses."""
+        for chemin, encodage_connu, (donnees, encodage) in zip(chemins, encodages, resultats):
+            if encodage and encodage_connu is None:
+                self.cache_encodages.enregistrer(chemin, encodage)
+            yield donnees
+
+    def enregistrer_doublons(self, doublons: List[Tuple[str, str]], signatures: Dict[str, Tuple[int, int, str]]) -> None:
+        """
+        Enregistre les copies à l'identique de notes déjà ingérées, sans les parser.
+        :param doublons: Liste de (nom, original) issue de planifier_ingestion.
+        :param signatures: Signatures (taille, mtime_ns, empreinte) relevées par planifier_ingestion.
+        """
+        # Une note d'une saison archivée en lecture seule n'est pas enregistrée : elle n'entre pas au manifeste
+        enregistres = set(self.db.enregistrer_doublons(doublons))
+        doublons = [(nom, original) for nom, original in doublons if nom in enregistres]
+        self.db.mettre_a_jour_manifeste((nom, *signatures[nom], original) for nom, original in doublons)
+        for nom, original in doublons:
+            print(f"Fichier {nom} identique à {original} : ignoré.")
+
+    def sauvegarder_courses(self, courses: Iterable[Tuple[str, Optional[Dict[str, Any]]]], taille_lot: int,
+                            remplaces: Optional[Set[str]], signatures: Dict[str, Tuple[int, int, str]]) -> List[str]:
+        """
+        Transmet les résultats du parsing à la base, une transaction par lot,
+        puis met à jour le manifeste des fichiers enregistrés.
+        :param courses: Itérable de (nom, données), données None si le parsing a échoué.
+        :param taille_lot: Nombre de courses écrites par transaction.
+        :param remplaces: Fichiers déjà traités dont la course est remplacée.
+        :param signatures: Signatures (taille, mtime_ns, empreinte) des fichiers, renseignées au plus tard pendant l'itération.
+        :return: Fichiers enregistrés avec succès.
+        """
+        enregistres = []
+        for fichier, statut in self.db.save_courses_bulk(self._courses_parsees(courses), taille_lot, remplaces):
+            if statut == STATUT_SUCCES:
+                enregistres.append(fichier)
                 print(f"Fichier {fichier} traité avec succès.")
+            elif statut == STATUT_DEJA_TRAITE:
+                print(f"Le fichier {fichier} a déjà été traité.")
+            else:
+                print(f"Erreur lors de l'enregistrement de {fichier}.")
+        # Le manifeste n'est mis à jour qu'après une sauvegarde réussie : un échec sera retenté au prochain scan
+        self.db.mettre_a_jour_manifeste((nom, *signatures[nom], None) for nom in enregistres)
+        return enregistres
+
+    @staticmethod
+    def _courses_parsees(courses: Iterable[Tuple[str, Optional[Dict[str, Any]]]]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """Écarte les fichiers dont le parsing a échoué."""
+        for fichier, donnees in courses:
+            if donnees:
+                yield fichier, donnees
             else:
                 print(f"Erreur lors du traitement de {fichier}.")
 
@@ -70,13 +334,13 @@ class GestionnaireCourses:
         Affiche la fréquence des numéros dans l'arrivée, avec des filtres optionnels.
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         """
-        courses = self.db.get_courses(type_course=type_course)
+        # Lue dans les agrégats tenus à jour par la base (trois premières places, comme analyse_frequence_arrivee)
+        frequence = self.db.frequences_numeros('arrivee', range(1, 4), type_course=type_course)
         
-        if not courses:
+        if not frequence:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        frequence = analyse_frequence_arrivee(courses)
         print(f"\n=== Fréquence des numéros dans l'arrivée ===")
         for num in sorted(frequence.keys()):
             print(f"Numéro {num} : {frequence[num]:.1f}%")
@@ -88,14 +352,14 @@ class GestionnaireCourses:
         Affiche la fréquence des couples de numéros dans l'arrivée, avec des filtres optionnels.
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         """
-        courses = self.db.get_courses(type_course=type_course)
+        frequence_couples = self.db.frequences_combinaisons('arrivee', 2, type_course=type_course)
         
-        if not courses:
+        if not frequence_couples:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        frequence_couples = analyser_couples_arrivee(courses)
         print(f"\n=== Fréquence des couples de numéros dans l'arrivée ===")
+        print(MENTION_AGREGATS)
         for couple, freq in sorted(frequence_couples.items(), key=lambda x: x[1], reverse=True):
             print(f"Couple {couple} : {freq:.1f}%")
         
@@ -105,19 +369,14 @@ class GestionnaireCourses:
         """
         Affiche la fréquence des triples de numéros dans l'arrivée, avec des filtres optionnels.
         """
-        courses = self.db.get_courses()
-        
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
+        frequence_triples = self.db.frequences_combinaisons('arrivee', 3, type_course=type_course, distance=distance)
         
-        if not courses:
+        if not frequence_triples:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        frequence_triples = analyser_triples_arrivee(courses)
         print(f"\n=== Fréquence des triples de numéros dans l'arrivée ===")
+        print(MENTION_AGREGATS)
         for triple, freq in sorted(frequence_triples.items(), key=lambda x: x[1], reverse=True): # tous
             print(f"Triple {triple} : {freq:.1f}%")
         
@@ -127,7 +386,7 @@ class GestionnaireCourses:
         """
         Affiche la fréquence des écarts entre les numéros dans l'arrivée, avec des filtres optionnels.
         """
-        courses = self.db.get_courses()
+        courses = self.db.get_courses(analysees=True)
         
         if type_course:
             courses = [course for course in courses if course.get('type_course') == type_course]
@@ -149,19 +408,15 @@ class GestionnaireCourses:
         """
         Affiche l'écart et l'écart maximum pour chaque numéro dans l'arrivée, avec des filtres optionnels.
         """
-        courses = self.db.get_courses()
-        
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        # État incrémental des écarts : seules les courses enregistrées depuis le dernier appel sont lues
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_numeros = calculer_ecarts_numeros_arrivee(courses)
+        ecarts_numeros = etat.ecarts('arrivee')
         print("\n=== Écarts pour chaque numéro dans l'arrivée ===")
+        print(MENTION_AGREGATS)
         for num in sorted(ecarts_numeros.keys()):
             print(f"Numéro {num} : Écart actuel = {ecarts_numeros[num]['ecart_actuel']}, Écart max = {ecarts_numeros[num]['ecart_max']}")
 
@@ -170,7 +425,7 @@ class GestionnaireCourses:
         """
         Analyse les positions dans la synthèse (wrapper pour analyse_positions du module analyse)
         """
-        courses = self.db.get_courses()
+        courses = self.db.get_courses(analysees=True)
         return analyse_positions(courses, pos1, pos2)
 
     def analyser_positions_arrivee(self, num1: int, num2: int, type_course: Optional[str] = None, 
@@ -187,28 +442,19 @@ class GestionnaireCourses:
         num1_dans_arrivee = 0
         num2_dans_arrivee = 0
         double_reussite = 0
-        num1_participations = 0
-        num2_participations = 0
-        courses_en_commun = 0  # Nombre de courses où les deux numéros ont participé ensemble
         courses_double_reussite = []
 
         total_courses = len(courses)
 
+        # Participations comptées par la base (table resultats)
+        participations = self.db.compter_participations((num1, num2), type_course, date_debut, date_fin)
+        num1_participations = participations[num1]
+        num2_participations = participations[num2]
+        courses_en_commun = self.db.compter_courses_communes((num1, num2), type_course, date_debut, date_fin)
+
         for course in courses:
             arrivee = course.get('arrivee', '')
             arrivee_list = [x.strip() for x in arrivee.split('-') if x.strip()]
-            
-            # Extraction des partants
-            partants_str = course.get('partants', '')
-            partants = set(map(int, partants_str.split(','))) if partants_str else set()
-
-            # Vérification des participations basées sur les partants
-            if num1 in partants:
-                num1_participations += 1
-            if num2 in partants:
-                num2_participations += 1
-            if num1 in partants and num2 in partants:
-                courses_en_commun += 1  # Les deux numéros ont participé à cette course
 
             # Vérification des numéros dans l'arrivée
             if str(num1) in arrivee_list:
@@ -268,7 +514,7 @@ class GestionnaireCourses:
     def analyser_toutes_paires(self, type_course: Optional[str] = None,
                               date_debut: Optional[str] = None, date_fin: Optional[str] = None) -> None:
         """Analyse toutes les paires de positions possibles."""
-        courses = self.db.get_courses(type_course, date_debut, date_fin)
+        courses = self.db.get_courses(type_course, date_debut, date_fin, analysees=True)
         analyse_all_pairs(courses)
 
     def obtenir_statistiques_globales(self) -> Dict[str, Any]:
@@ -277,17 +523,11 @@ class GestionnaireCourses:
 
     def obtenir_lieux_disponibles(self) -> List[str]:
         """Retourne la liste des lieux disponibles dans la base de données."""
-        with sqlite3.connect(self.db.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('SELECT DISTINCT lieu FROM courses')
-            return [row[0] for row in cur.fetchall()]
+        return self.db.obtenir_lieux_disponibles()
 
     def obtenir_distances_disponibles(self) -> List[str]:
         """Retourne la liste des distances disponibles dans la base de données."""
-        with sqlite3.connect(self.db.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('SELECT DISTINCT distance FROM courses')
-            return [row[0] for row in cur.fetchall()]
+        return self.db.obtenir_distances_disponibles()
 
     def obtenir_distances_disponibles_par_discipline(self, discipline: str) -> List[str]:
         """
@@ -295,18 +535,11 @@ class GestionnaireCourses:
         :param discipline: La discipline pour laquelle obtenir les distances.
         :return: Une liste des distances disponibles.
         """
-        with sqlite3.connect(self.db.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('SELECT DISTINCT distance FROM courses WHERE type_course = ?', (discipline,))
-            return [row[0] for row in cur.fetchall()]
+        return self.db.obtenir_distances_disponibles(discipline)
 
     def obtenir_disciplines_disponibles(self) -> List[str]:
         """Retourne la liste des disciplines disponibles dans la base de données."""
-        with sqlite3.connect(self.db.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('SELECT DISTINCT type_course FROM courses')
-            disciplines = [row[0] for row in cur.fetchall()]
-            return disciplines
+        return self.db.obtenir_disciplines_disponibles()
     def selectionner_type_et_distance(self):
         """Permet de sélectionner un type et une distance puis analyse"""
         discipline_distance = self.choisir_discipline_et_distance()
@@ -314,43 +547,33 @@ class GestionnaireCourses:
             discipline, distance = discipline_distance
             courses = self.db.get_courses(
                 type_course=discipline, 
-                distance=distance
+                distance=distance,
+                analysees=True
             )
             if courses:
                 self.analyser_paire_impaire_par_tranche_synthese(courses)
             else:
                 print("Aucune course trouvée avec ces critères.")
-    def obtenir_distances_disponibles_par_discipline(self, discipline: str) -> List[str]:
-        """Retourne les distances disponibles pour une discipline."""
-        with sqlite3.connect(self.db.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT DISTINCT distance FROM courses WHERE type_course = ?", (discipline,))
-            return [row[0] for row in cur.fetchall() if row[0]]
-
-    def afficher_frequence_synthese(self, type_course: Optional[str] = None) -> None:
+    def afficher_frequence_synthese(self, type_course: Optional[str] = None, distance: Optional[str] = None) -> None:
         """
         Affiche la fréquence des numéros, des couples, des triples et des écarts dans la synthèse,
         avec des filtres optionnels.
         :param type_course: Type de course (discipline) pour filtrer les résultats.
+        :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
+        # Calcul des fréquences, lues dans les agrégats
+        frequence = self.db.frequences_numeros('synthese', type_course=type_course, distance=distance)
         
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        
-        if not courses:
+        if not frequence:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
-        
-        # Calcul des fréquences
-        frequence = analyse_frequence_synthese(courses)
         #frequence_couples = analyser_couples_synthese(courses)
         #frequence_triples = analyser_triples_synthese(courses)
         #frequence_ecarts = analyser_ecarts_synthese(courses)
         
         # Affichage des résultats
         print(f"\n=== Fréquence des numéros dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for num in sorted(frequence.keys()):
             print(f"Numéro {num} : {frequence[num]:.1f}%")
         
@@ -378,20 +601,14 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
+        frequence_couples = self.db.frequences_combinaisons('synthese', 2, type_course=type_course, distance=distance)
         
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        if not frequence_couples:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        frequence_couples = analyser_couples_synthese(courses)
         print(f"\n=== Fréquence des couples de numéros dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for couple, freq in sorted(frequence_couples.items(), key=lambda x: x[1], reverse=True):  # Tous
             print(f"Couple {couple} : {freq:.1f}%")
         
@@ -404,20 +621,14 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
+        frequence_triples = self.db.frequences_combinaisons('synthese', 3, type_course=type_course, distance=distance)
         
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        if not frequence_triples:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        frequence_triples = analyser_triples_synthese(courses)
         print(f"\n=== Fréquence des triples de numéros dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for triple, freq in sorted(frequence_triples.items(), key=lambda x: x[1], reverse=True):  # Tous
             print(f"Triple {triple} : {freq:.1f}%")
         
@@ -430,7 +641,7 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
+        courses = self.db.get_courses(analysees=True)
         
         # Filtrage des courses
         if type_course:
@@ -456,20 +667,14 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
-        
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_numeros = calculer_ecarts_numeros(courses)
+        ecarts_numeros = etat.ecarts('synthese')
         print("\n=== Écarts pour chaque numéro dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for num in sorted(ecarts_numeros.keys()):
             print(f"Numéro {num} : Écart actuel = {ecarts_numeros[num]['ecart_actuel']}, Écart max = {ecarts_numeros[num]['ecart_max']}")
 
@@ -479,20 +684,14 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
-        
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_numeros = calculer_ecarts_numeros(courses)
+        ecarts_numeros = etat.ecarts('synthese')
         print("\n=== Écarts pour chaque numéro dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for num in sorted(ecarts_numeros.keys()):
             print(f"Numéro {num} : Écart actuel = {ecarts_numeros[num]['ecart_actuel']}, Écart max = {ecarts_numeros[num]['ecart_max']}")
 
@@ -502,20 +701,14 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
-        
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_couples = calculer_ecarts_combinaisons(courses, taille_combinaison=2)
+        ecarts_couples = etat.ecarts('synthese', 2, ecart_initial=True)
         print("\n=== Écarts pour chaque couple de numéros dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for couple in sorted(ecarts_couples.keys()):
             print(f"Couple {couple} : Écart actuel = {ecarts_couples[couple]['ecart_actuel']}, Écart max = {ecarts_couples[couple]['ecart_max']}")
 
@@ -525,20 +718,14 @@ class GestionnaireCourses:
         :param type_course: Type de course (discipline) pour filtrer les résultats.
         :param distance: Distance pour filtrer les résultats.
         """
-        courses = self.db.get_courses()
-        
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_triples = calculer_ecarts_combinaisons(courses, taille_combinaison=3)
+        ecarts_triples = etat.ecarts('synthese', 3, ecart_initial=True)
         print("\n=== Écarts pour chaque triple de numéros dans la synthèse ===")
+        print(MENTION_AGREGATS)
         for triple in sorted(ecarts_triples.keys()):
             print(f"Triple {triple} : Écart actuel = {ecarts_triples[triple]['ecart_actuel']}, Écart max = {ecarts_triples[triple]['ecart_max']}")
 
@@ -546,19 +733,14 @@ class GestionnaireCourses:
         """
         Affiche l'écart et l'écart maximum pour chaque couple de numéros dans l'arrivée.
         """
-        courses = self.db.get_courses()
-        
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_couples = calculer_ecarts_couples_arrivee(courses)
+        ecarts_couples = etat.ecarts('arrivee', 2)
         print("\n=== Écarts pour chaque couple de numéros dans l'arrivée ===")
+        print(MENTION_AGREGATS)
         for couple in sorted(ecarts_couples.keys()):
             print(f"Couple {couple} : Écart actuel = {ecarts_couples[couple]['ecart_actuel']}, Écart max = {ecarts_couples[couple]['ecart_max']}")
 
@@ -566,19 +748,14 @@ class GestionnaireCourses:
         """
         Affiche l'écart et l'écart maximum pour chaque triple de numéros dans l'arrivée.
         """
-        courses = self.db.get_courses()
-        
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
-        ecarts_triples = calculer_ecarts_triples_arrivee(courses)
+        ecarts_triples = etat.ecarts('arrivee', 3)
         print("\n=== Écarts pour chaque triple de numéros dans l'arrivée ===")
+        print(MENTION_AGREGATS)
         for triple in sorted(ecarts_triples.keys()):
             print(f"Triple {triple} : Écart actuel = {ecarts_triples[triple]['ecart_actuel']}, Écart max = {ecarts_triples[triple]['ecart_max']}")
 
@@ -658,34 +835,28 @@ class GestionnaireCourses:
         :param distance: Distance pour filtrer les résultats.
         :param analyse_type: Type d'analyse ("synthèse" ou "arrivée").
         """
-        courses = self.db.get_courses()
-        
-        # Filtrage des courses
-        if type_course:
-            courses = [course for course in courses if course.get('type_course') == type_course]
-        if distance:
-            courses = [course for course in courses if course.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour les critères sélectionnés.")
             return
         
         # Afficher le nombre de courses trouvées
         print(f"\n=== Nombre de courses trouvées ===")
         if type_course and distance:
-            print(f"Discipline : {type_course}, Distance : {distance} -> {len(courses)} courses")
+            print(f"Discipline : {type_course}, Distance : {distance} -> {etat.nombre_courses} courses")
         elif type_course:
-            print(f"Discipline : {type_course} -> {len(courses)} courses")
+            print(f"Discipline : {type_course} -> {etat.nombre_courses} courses")
         elif distance:
-            print(f"Distance : {distance} -> {len(courses)} courses")
+            print(f"Distance : {distance} -> {etat.nombre_courses} courses")
         else:
-            print(f"Total des courses : {len(courses)}")
+            print(f"Total des courses : {etat.nombre_courses}")
+        print(MENTION_AGREGATS)
         
         if analyse_type == "synthèse":
             # Analyse des écarts dans la synthèse
-            ecarts_numeros = calculer_ecarts_numeros(courses)
-            ecarts_couples = calculer_ecarts_combinaisons(courses, taille_combinaison=2)
-            ecarts_triples = calculer_ecarts_combinaisons(courses, taille_combinaison=3)
+            ecarts_numeros = etat.ecarts('synthese')
+            ecarts_couples = etat.ecarts('synthese', 2, ecart_initial=True)
+            ecarts_triples = etat.ecarts('synthese', 3, ecart_initial=True)
             
             print(f"\n=== Écarts pour chaque numéro dans la synthèse ===")
             for num in sorted(ecarts_numeros.keys()):
@@ -701,9 +872,9 @@ class GestionnaireCourses:
         
         elif analyse_type == "arrivée":
             # Analyse des écarts dans l'arrivée
-            ecarts_numeros_arrivee = calculer_ecarts_numeros_arrivee(courses)
-            ecarts_couples_arrivee = calculer_ecarts_couples_arrivee(courses)
-            ecarts_triples_arrivee = calculer_ecarts_triples_arrivee(courses)
+            ecarts_numeros_arrivee = etat.ecarts('arrivee')
+            ecarts_couples_arrivee = etat.ecarts('arrivee', 2)
+            ecarts_triples_arrivee = etat.ecarts('arrivee', 3)
             
             print(f"\n=== Écarts pour chaque numéro dans l'arrivée ===")
             for num in sorted(ecarts_numeros_arrivee.keys()):
@@ -762,7 +933,7 @@ class GestionnaireCourses:
         distance_selectionnee = distances[int(choix_distance) - 1]
         
         # Effectuer l'analyse
-        courses = self.db.get_courses()
+        courses = self.db.get_courses(analysees=True)
         resultats = analyser_par_discipline_et_distance_arrivee(courses, discipline_selectionnee, distance_selectionnee)
         
         if "erreur" in resultats:
@@ -789,15 +960,6 @@ class GestionnaireCourses:
         for triple, ecarts in resultats['ecarts_triples_arrivee'].items():
             print(f"Triple {triple} : Écart actuel = {ecarts['ecart_actuel']}, Écart max = {ecarts['ecart_max']}")
     
-    def obtenir_distances_disponibles_par_discipline(self, discipline: str) -> List[str]:
-        """
-        Retourne la liste des distances disponibles pour une discipline donnée.
-        """
-        with sqlite3.connect(self.db.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute('SELECT DISTINCT distance FROM courses WHERE type_course = ?', (discipline,))
-            return [row[0] for row in cur.fetchall()]
-        
     def obtenir_courses_filtrees(self, filters):
         """
         Retourne la liste des courses filtrées selon les critères spécifiés.
@@ -818,16 +980,14 @@ class GestionnaireCourses:
         """
         Analyse les numéros de la synthèse en trois tranches et affiche un graphique.
         """
-        courses = self.db.get_courses()
+        courses = self.db.get_courses(analysees=True)
         if not courses:
             print("Aucune donnée disponible pour l'analyse.")
             return
 
         print("\n=== Analyse par tranche de 5-5-reste ===")
         for course in courses:
-            synthese = course.get('synthese', '')
-            synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-            numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+            numeros = course.synthese_numeros
 
             # Initialisation des compteurs pour chaque tranche
             tranche_1 = 0  # 1 à 5
@@ -855,16 +1015,14 @@ class GestionnaireCourses:
         """
         Analyse les numéros de la synthèse en trois tranches et affiche un graphique.
         """
-        courses = self.db.get_courses()
+        courses = self.db.get_courses(analysees=True)
         if not courses:
             print("Aucune donnée disponible pour l'analyse.")
             return
 
         print("\n=== Analyse par tranche de 5-5-reste ===")
         for course in courses:
-            synthese = course.get('synthese', '')
-            synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-            numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+            numeros = course.synthese_numeros
 
             # Limiter l'analyse aux trois premiers numéros
             numeros = numeros[:3]
@@ -897,7 +1055,7 @@ class GestionnaireCourses:
         Analyse les tranches de 5-5-reste pour une discipline donnée.
         :param discipline: La discipline à filtrer (par exemple, "Plat", "Attelé").
         """
-        courses = self.db.get_courses(type_course=discipline)
+        courses = self.db.get_courses(type_course=discipline, analysees=True)
         if not courses:
             print(f"Aucune donnée disponible pour la discipline '{discipline}'.")
             return
@@ -909,7 +1067,7 @@ class GestionnaireCourses:
         Analyse les tranches de 5-5-reste pour une discipline donnée.
         :param discipline: La discipline à filtrer (par exemple, "Plat", "Attelé").
         """
-        courses = self.db.get_courses(type_course=discipline)
+        courses = self.db.get_courses(type_course=discipline, analysees=True)
         if not courses:
             print(f"Aucune donnée disponible pour la discipline '{discipline}'.")
             return
@@ -923,7 +1081,7 @@ class GestionnaireCourses:
         :param discipline: La discipline à filtrer (par exemple, "Plat", "Attelé").
         :param distance: La distance à filtrer (par exemple, "2700m", "3800m").
         """
-        courses = self.db.get_courses(type_course=discipline, distance=distance)
+        courses = self.db.get_courses(type_course=discipline, distance=distance, analysees=True)
         if not courses:
             print(f"Aucune donnée disponible pour la discipline '{discipline}' et la distance '{distance}'.")
             return
@@ -936,7 +1094,7 @@ class GestionnaireCourses:
         :param discipline: La discipline à filtrer (par exemple, "Plat", "Attelé").
         :param distance: La distance à filtrer (par exemple, "2700m", "3800m").
         """
-        courses = self.db.get_courses(type_course=discipline, distance=distance)
+        courses = self.db.get_courses(type_course=discipline, distance=distance, analysees=True)
         if not courses:
             print(f"Aucune donnée disponible pour la discipline '{discipline}' et la distance '{distance}'.")
             return
@@ -950,9 +1108,7 @@ class GestionnaireCourses:
             :param courses: Liste des courses à analyser.
             """
             for course in courses:
-                synthese = course.get('synthese', '')
-                synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-                numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+                numeros = course.synthese_numeros
 
                 # Initialisation des compteurs pour chaque tranche
                 tranche_1 = 0  # 1 à 5
@@ -982,9 +1138,7 @@ class GestionnaireCourses:
             :param courses: Liste des courses à analyser.
             """
             for course in courses:
-                synthese = course.get('synthese', '')
-                synthese_list = [x.strip() for x in synthese.split('-') if x.strip()]
-                numeros = [int(x.replace('e', '')) for x in synthese_list if x.replace('e', '').isdigit()]
+                numeros = course.synthese_numeros
 
                 # Initialisation des compteurs pour chaque tranche
                 tranche_1 = 0  # 1 à 5
@@ -1015,7 +1169,8 @@ class GestionnaireCourses:
             type_course=filters.get('type_course'),
             distance=filters.get('distance'),
             date_debut=filters.get('date_debut'),
-            date_fin=filters.get('date_fin')
+            date_fin=filters.get('date_fin'),
+            analysees=True
         )
         
         if 'lieu' in filters:
@@ -1040,11 +1195,13 @@ class GestionnaireCourses:
             key=lambda x: datetime.strptime(x["date_course"], "%Y-%m-%d")
         )
         
+        # Partants des seules courses du numéro, lus dans la table resultats
+        partants_par_course = self.db.get_partants(avec=[numero_cheval])
         for index, course in enumerate(courses_filtrees):
-            partants = list(map(int, course.get('partants', '').split(',')))
-            arrivee = list(map(int, course.get('arrivee', '').split('-')))
+            partants = partants_par_course.get(course['id'])
             
-            if numero_cheval in partants:
+            if partants:
+                arrivee = list(map(int, course.get('arrivee', '').split('-')))
                 autres_chevaux = [x for x in partants if x != numero_cheval]
                 
                 for cheval in autres_chevaux:
@@ -1129,11 +1286,13 @@ class GestionnaireCourses:
             key=lambda x: datetime.strptime(x["date_course"], "%Y-%m-%d")
         )
 
+        # Partants des seules courses où les deux numéros courent ensemble, lus dans la table resultats
+        partants_par_course = self.db.get_partants(avec=[num1, num2])
         for idx, course in enumerate(courses_triees):
-            partants = list(map(int, course.get('partants', '').split(',')))
-            arrivee = list(map(int, course.get('arrivee', '').split('-')))
+            partants = partants_par_course.get(course['id'])
 
-            if num1 in partants and num2 in partants:
+            if partants:
+                arrivee = list(map(int, course.get('arrivee', '').split('-')))
                 for autre_num in (n for n in partants if n not in {num1, num2}):
                     triple = tuple(sorted((num1, num2, autre_num)))
 
@@ -1288,7 +1447,7 @@ class GestionnaireCourses:
         analyser_paire_impaire_par_tranche_synthese(courses)
     def analyser_15_dernieres_courses(self):
         """Analyse sur les 15 dernières courses"""
-        courses = sorted(self.db.get_courses(), key=lambda x: x['date_course'], reverse=True)[:15]
+        courses = sorted(self.db.get_courses(analysees=True), key=lambda x: x['date_course'], reverse=True)[:15]
         if not courses:
             print("Aucune course disponible.")
             return
@@ -1296,7 +1455,7 @@ class GestionnaireCourses:
 
     def analyser_30_dernieres_courses(self):
         """Analyse sur les 30 dernières courses"""
-        courses = sorted(self.db.get_courses(), key=lambda x: x['date_course'], reverse=True)[:30]
+        courses = sorted(self.db.get_courses(analysees=True), key=lambda x: x['date_course'], reverse=True)[:30]
         if not courses:
             print("Aucune course disponible.")
             return
@@ -1308,21 +1467,15 @@ class GestionnaireCourses:
         Affiche les écarts spécifiques aux numéros ayant terminé premiers
         avec possibilité de filtrer par discipline et distance
         """
-        courses = self.db.get_courses()
-        
-        # Application des filtres
-        if type_course:
-            courses = [c for c in courses if c.get('type_course') == type_course]
-        if distance:
-            courses = [c for c in courses if c.get('distance') == distance]
-        
-        if not courses:
+        etat = self.db.etat_ecarts(type_course, distance)
+        if not etat.nombre_courses:
             print("Aucune donnée disponible pour ces critères")
             return
         
-        ecarts = calculer_ecarts_premiers_synthese(courses)
+        ecarts = etat.ecarts('synthese', rang=1)
         
-        print(f"\n=== ÉCARTS POUR LES VAINQUEURS ({len(courses)} courses analysées) ===")
+        print(f"\n=== ÉCARTS POUR LES VAINQUEURS ({etat.nombre_courses} courses analysées) ===")
+        print(MENTION_AGREGATS)
         for num in sorted(ecarts.keys()):
             stats = ecarts[num]
             print(f"Numéro {num}:")
@@ -1352,26 +1505,21 @@ class GestionnaireCourses:
             choix_dist = int(input("Choix (numéro) : "))
             distance = None if choix_dist == 0 else distances[choix_dist]
 
-            # Filtrage des courses
-            courses = self.db.get_courses()
-            if discipline:
-                courses = [c for c in courses if c.get('type_course') == discipline]
-            if distance:
-                courses = [c for c in courses if c.get('distance') == distance]
-
-            if not courses:
+            # Écarts lus dans l'état incrémental (courses filtrées)
+            etat = self.db.etat_ecarts(discipline, distance)
+            if not etat.nombre_courses:
                 print("\n⚠️ Aucune course correspondante")
                 return
 
-            # Calcul des écarts
-            ecarts = calculer_ecarts_premiers_synthese(courses)
+            ecarts = etat.ecarts('synthese', rang=1)
             
             if not ecarts:
                 print("\nℹ️ Aucun numéro n'a terminé premier dans ces courses")
                 return
 
             # Affichage détaillé
-            print(f"\n📊 ANALYSE DES VAINQUEURS - {len(courses)} courses")
+            print(f"\n📊 ANALYSE DES VAINQUEURS - {etat.nombre_courses} courses")
+            print(MENTION_AGREGATS)
             print(f"Discipline: {discipline or 'Toutes'} | Distance: {distance or 'Toutes'}")
             print("-" * 60)
             
@@ -1417,26 +1565,21 @@ class GestionnaireCourses:
             choix_dist = int(input("Choix (numéro) : "))
             distance = None if choix_dist == 0 else distances[choix_dist]
 
-            # Filtrage des courses
-            courses = self.db.get_courses()
-            if discipline:
-                courses = [c for c in courses if c.get('type_course') == discipline]
-            if distance:
-                courses = [c for c in courses if c.get('distance') == distance]
-
-            if not courses:
+            # Écarts lus dans l'état incrémental (courses filtrées)
+            etat = self.db.etat_ecarts(discipline, distance)
+            if not etat.nombre_courses:
                 print("\n⚠️ Aucune course correspondante")
                 return
 
-            # Calcul des écarts pour les deuxièmes places
-            ecarts = calculer_ecarts_deuxiemes_synthese(courses)
+            ecarts = etat.ecarts('synthese', rang=2)
 
             if not ecarts:
                 print("\nℹ️ Aucun numéro n'a terminé deuxième dans ces courses")
                 return
 
             # Affichage détaillé
-            print(f"\n📊 ANALYSE DES DEUXIÈMES - {len(courses)} courses")
+            print(f"\n📊 ANALYSE DES DEUXIÈMES - {etat.nombre_courses} courses")
+            print(MENTION_AGREGATS)
             print(f"Discipline: {discipline or 'Toutes'} | Distance: {distance or 'Toutes'}")
             print("-" * 60)
 
@@ -1481,26 +1624,21 @@ class GestionnaireCourses:
             choix_dist = int(input("Choix (numéro) : "))
             distance = None if choix_dist == 0 else distances[choix_dist]
 
-            # Filtrage des courses
-            courses = self.db.get_courses()
-            if discipline:
-                courses = [c for c in courses if c.get('type_course') == discipline]
-            if distance:
-                courses = [c for c in courses if c.get('distance') == distance]
-
-            if not courses:
+            # Écarts lus dans l'état incrémental (courses filtrées)
+            etat = self.db.etat_ecarts(discipline, distance)
+            if not etat.nombre_courses:
                 print("\n⚠️ Aucune course correspondante")
                 return
 
-            # Calcul des écarts pour les deuxièmes places
-            ecarts = calculer_ecarts_troisiemes_synthese(courses)
+            ecarts = etat.ecarts('synthese', rang=3)
 
             if not ecarts:
                 print("\nℹ️ Aucun numéro n'a terminé deuxième dans ces courses")
                 return
 
             # Affichage détaillé
-            print(f"\n📊 ANALYSE DES TROISIEMES - {len(courses)} courses")
+            print(f"\n📊 ANALYSE DES TROISIEMES - {etat.nombre_courses} courses")
+            print(MENTION_AGREGATS)
             print(f"Discipline: {discipline or 'Toutes'} | Distance: {distance or 'Toutes'}")
             print("-" * 60)
 
@@ -1546,26 +1684,21 @@ class GestionnaireCourses:
             choix_dist = int(input("Choix (numéro) : "))
             distance = None if choix_dist == 0 else distances[choix_dist]
 
-            # Filtrage des courses
-            courses = self.db.get_courses()
-            if discipline:
-                courses = [c for c in courses if c.get('type_course') == discipline]
-            if distance:
-                courses = [c for c in courses if c.get('distance') == distance]
-
-            if not courses:
+            # Écarts lus dans l'état incrémental (courses filtrées)
+            etat = self.db.etat_ecarts(discipline, distance)
+            if not etat.nombre_courses:
                 print("\n⚠️ Aucune course correspondante")
                 return
 
-            # Calcul des écarts pour les deuxièmes places
-            ecarts = calculer_ecarts_quatriemes_synthese(courses)
+            ecarts = etat.ecarts('synthese', rang=4)
 
             if not ecarts:
                 print("\nℹ️ Aucun numéro n'a terminé deuxième dans ces courses")
                 return
 
             # Affichage détaillé
-            print(f"\n📊 ANALYSE DES QUATRIEMES - {len(courses)} courses")
+            print(f"\n📊 ANALYSE DES QUATRIEMES - {etat.nombre_courses} courses")
+            print(MENTION_AGREGATS)
             print(f"Discipline: {discipline or 'Toutes'} | Distance: {distance or 'Toutes'}")
             print("-" * 60)
 
@@ -1611,26 +1744,21 @@ class GestionnaireCourses:
             choix_dist = int(input("Choix (numéro) : "))
             distance = None if choix_dist == 0 else distances[choix_dist]
 
-            # Filtrage des courses
-            courses = self.db.get_courses()
-            if discipline:
-                courses = [c for c in courses if c.get('type_course') == discipline]
-            if distance:
-                courses = [c for c in courses if c.get('distance') == distance]
-
-            if not courses:
+            # Écarts lus dans l'état incrémental (courses filtrées)
+            etat = self.db.etat_ecarts(discipline, distance)
+            if not etat.nombre_courses:
                 print("\n⚠️ Aucune course correspondante")
                 return
 
-            # Calcul des écarts pour les deuxièmes places
-            ecarts = calculer_ecarts_cinquiemes_synthese(courses)
+            ecarts = etat.ecarts('synthese', rang=5)
 
             if not ecarts:
                 print("\nℹ️ Aucun numéro n'a terminé deuxième dans ces courses")
                 return
 
             # Affichage détaillé
-            print(f"\n📊 ANALYSE DES CINQUIEMES - {len(courses)} courses")
+            print(f"\n📊 ANALYSE DES CINQUIEMES - {etat.nombre_courses} courses")
+            print(MENTION_AGREGATS)
             print(f"Discipline: {discipline or 'Toutes'} | Distance: {distance or 'Toutes'}")
             print("-" * 60)
 
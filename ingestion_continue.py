@@ -0,0 +1,226 @@
+# ingestion_continue.py
+import argparse
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from database import Database
+from file_parser import parse_file_encodage
+from gestionnaire_courses import GestionnaireCourses, SEPARATEUR_ARCHIVE
+
+# Marqueur de fin transmis au rédacteur lors de l'arrêt
+_FIN = object()
+# Premier élément du marqueur de fin d'archive : (_ARCHIVE, archive, taille, mtime_ns, lecture complète)
+_ARCHIVE = object()
+
+class IngestionContinue:
+    """
+    Ingestion en continu du dossier de notes.
+    Un fil scrute le dossier (notes et archives) à intervalle régulier et parse les notes nouvelles ou modifiées ;
+    les résultats passent par une file bornée vers un rédacteur unique qui les écrit par lots.
+    Chaque lot écrit déclenche le signal de la base (Database.abonner_version_donnees).
+    """
+
+    def __init__(self, gestionnaire: GestionnaireCourses, intervalle: float = 2.0, taille_file: int = 256,
+                 taille_lot: int = 50, delai_lot: float = 0.5):
+        """
+        :param gestionnaire: Gestionnaire du dossier de notes et de la base.
+        :param intervalle: Délai en secondes entre deux scrutations du dossier.
+        :param taille_file: Nombre maximal de notes parsées en attente d'écriture (le parsing attend au-delà).
+        :param taille_lot: Nombre maximal de notes écrites par transaction.
+        :param delai_lot: Temps maximal en secondes pour compléter un lot avant de l'écrire.
+        """
+        self.gestionnaire = gestionnaire
+        self.intervalle = intervalle
+        self.taille_lot = taille_lot
+        self.delai_lot = delai_lot
+        self.file: queue.Queue = queue.Queue(maxsize=taille_file)
+        self.lots_ecrits = 0
+        self._arret = threading.Event()
+        self._fils: List[threading.Thread] = []
+        # Notes transmises au rédacteur mais pas encore écrites, et notes en échec, avec leur signature
+        self._verrou = threading.Lock()
+        self._en_attente: Dict[str, Tuple[int, int, str]] = {}
+        self._echecs: Dict[str, Tuple[int, int, str]] = {}
+        # Archives en cours d'écriture, et celles dont une note n'a pas pu être enregistrée
+        self._archives_en_attente: Set[str] = set()
+        self._archives_en_echec: Set[str] = set()
+
+    def demarrer(self) -> None:
+        """Lance les fils de scrutation et d'écriture."""
+        if self._fils:
+            return
+        self._arret.clear()
+        self._fils = [
+            threading.Thread(target=self._ecrire, name="ingestion-redacteur", daemon=True),
+            threading.Thread(target=self._scruter, name="ingestion-scrutation", daemon=True),
+        ]
+        for fil in self._fils:
+            fil.start()
+        print(f"Ingestion continue de {self.gestionnaire.dossier_notes} (scrutation toutes les {self.intervalle} s)")
+
+    def arreter(self, delai: Optional[float] = None) -> None:
+        """Arrête la scrutation ; les notes déjà parsées sont écrites avant la fin du rédacteur."""
+        self._arret.set()
+        for fil in self._fils:
+            fil.join(delai)
+        self._fils = []
+
+    def executer(self) -> None:
+        """Lance l'ingestion et bloque jusqu'à une interruption clavier."""
+        self.demarrer()
+        try:
+            while any(fil.is_alive() for fil in self._fils):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\nArrêt de l'ingestion continue...")
+        finally:
+            self.arreter()
+
+    def scruter_une_fois(self) -> int:
+        """
+        Parcourt le dossier et place dans la file les notes à écrire.
+        :return: Nombre de notes transmises au rédacteur.
+        """
+        a_traiter, remplaces, doublons, signatures, inchanges = self.gestionnaire.planifier_ingestion()
+        if inchanges:
+            self.gestionnaire.db.mettre_a_jour_manifeste(inchanges)
+        with self._verrou:
+            # Une note déjà en file, ou en échec sans avoir changé depuis, n'est pas reprise
+            doublons = [(nom, original) for nom, original in doublons if self._en_attente.get(nom) != signatures[nom]]
+            a_traiter = [nom for nom in a_traiter
+                         if self._en_attente.get(nom) != signatures[nom] and self._echecs.get(nom) != signatures[nom]]
+            for nom in a_traiter + [nom for nom, _ in doublons]:
+                self._en_attente[nom] = signatures[nom]
+
+        for nom, original in doublons:
+            self.file.put((nom, None, signatures[nom], False, original))
+        cache = self.gestionnaire.cache_encodages
+        for nom in a_traiter:
+            chemin = self.gestionnaire.dossier_notes / nom
+            encodage_connu = cache.obtenir(chemin)
+            donnees, encodage = parse_file_encodage(chemin, encodage_connu)
+            if encodage and encodage_connu is None:
+                cache.enregistrer(chemin, encodage)
+            if donnees is None:
+                print(f"Erreur lors du traitement de {nom}.")
+                with self._verrou:
+                    del self._en_attente[nom]
+                    self._echecs[nom] = signatures[nom]
+                continue
+            # put bloque tant que la file est pleine : le parsing suit le rythme du rédacteur
+            self.file.put((nom, donnees, signatures[nom], nom in remplaces, None))
+        cache.sauvegarder()
+        return len(a_traiter) + len(doublons) + self._scruter_archives()
+
+    def _scruter_archives(self) -> int:
+        """Lit les archives nouvelles ou modifiées et place leurs notes dans la file, suivies d'un marqueur de fin."""
+        transmis = 0
+        for archive, taille, mtime_ns in self.gestionnaire.planifier_archives():
+            with self._verrou:
+                if archive in self._archives_en_attente or self._echecs.get(archive) == (taille, mtime_ns, None):
+                    continue
+                self._archives_en_attente.add(archive)
+            complete = True
+            try:
+                for element in self.gestionnaire.lire_archive(archive):
+                    if element[1] is None and element[4] is None:
+                        print(f"Erreur lors du traitement de {element[0]}.")
+                        complete = False
+                        continue
+                    self.file.put(element)
+                    transmis += 1
+            except Exception as e:
+                print(f"Erreur lors de la lecture de l'archive {archive} : {e}")
+                complete = False
+            if not complete:
+                with self._verrou:
+                    self._echecs[archive] = (taille, mtime_ns, None)
+            self.file.put((_ARCHIVE, archive, taille, mtime_ns, complete))
+        return transmis
+
+    def _scruter(self) -> None:
+        try:
+            while not self._arret.is_set():
+                try:
+                    self.scruter_une_fois()
+                except Exception as e:
+                    print(f"Erreur lors de la scrutation de {self.gestionnaire.dossier_notes} : {e}")
+                self._arret.wait(self.intervalle)
+        finally:
+            self.file.put(_FIN)
+
+    def _ecrire(self) -> None:
+        """Rédacteur unique : regroupe les notes de la file en lots (taille ou délai atteint) et les écrit."""
+        fin = False
+        while not fin:
+            element = self.file.get()
+            if element is _FIN:
+                break
+            lot = [element]
+            echeance = time.monotonic() + self.delai_lot
+            while len(lot) < self.taille_lot:
+                reste = echeance - time.monotonic()
+                if reste <= 0:
+                    break
+                try:
+                    element = self.file.get(timeout=reste)
+                except queue.Empty:
+                    break
+                if element is _FIN:
+                    fin = True
+                    break
+                lot.append(element)
+            try:
+                self._ecrire_lot(lot)
+            except Exception as e:
+                print(f"Erreur lors de l'écriture d'un lot de {len(lot)} notes : {e}")
+                with self._verrou:
+                    for nom, *_ in lot:
+                        self._en_attente.pop(nom, None)
+                    for element in lot:
+                        if element[0] is _ARCHIVE:
+                            self._archives_en_attente.discard(element[1])
+
+    def _ecrire_lot(self, lot: List[Tuple]) -> None:
+        archives = [element for element in lot if element[0] is _ARCHIVE]
+        lot = [element for element in lot if element[0] is not _ARCHIVE]
+        signatures = {nom: signature for nom, _, signature, _, _ in lot}
+        doublons = [(nom, original) for nom, donnees, _, _, original in lot if donnees is None]
+        courses = [(nom, donnees) for nom, donnees, _, _, _ in lot if donnees is not None]
+        if doublons:
+            self.gestionnaire.enregistrer_doublons(doublons, signatures)
+        if courses:
+            remplaces = {nom for nom, donnees, _, remplace, _ in lot if remplace}
+            enregistres = set(self.gestionnaire.sauvegarder_courses(courses, len(courses), remplaces, signatures))
+            for nom, _ in courses:
+                if nom not in enregistres and SEPARATEUR_ARCHIVE in nom:
+                    self._archives_en_echec.add(nom.split(SEPARATEUR_ARCHIVE, 1)[0])
+        # Une archive n'est inscrite au manifeste qu'une fois toutes ses notes enregistrées
+        for _, archive, taille, mtime_ns, complete in archives:
+            if complete and archive not in self._archives_en_echec:
+                self.gestionnaire.db.mettre_a_jour_manifeste([(archive, taille, mtime_ns, None, None)])
+            self._archives_en_echec.discard(archive)
+        with self._verrou:
+            for nom in signatures:
+                self._en_attente.pop(nom, None)
+                self._echecs.pop(nom, None)
+            for _, archive, *_ in archives:
+                self._archives_en_attente.discard(archive)
+        self.lots_ecrits += 1
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingestion continue du dossier de notes.")
+    parser.add_argument("dossier", nargs="?", default="notes", help="Dossier des notes (défaut : notes)")
+    parser.add_argument("--db", default="courses.db", help="Base SQLite (défaut : courses.db)")
+    parser.add_argument("--intervalle", type=float, default=2.0, help="Secondes entre deux scrutations (défaut : 2)")
+    parser.add_argument("--taille-lot", type=int, default=50, help="Notes écrites par transaction (défaut : 50)")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    db.abonner_version_donnees(lambda version: print(f"Données mises à jour (version {version})"))
+    IngestionContinue(GestionnaireCourses(args.dossier, db), intervalle=args.intervalle, taille_lot=args.taille_lot).executer()
+
+if __name__ == "__main__":
+    main()
@@ -541,10 +541,10 @@ def afficher_sous_menu_paire_impaire(gestionnaire):
         if choix == "1":
             afficher_sous_menu_premier(gestionnaire)  # Nouveau sous-menu
         elif choix == "2":
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             analyser_tierce_paire_impaire(courses)
         elif choix == "3":
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             analyser_quinte_paire_impaire(courses)
         elif choix == "4":
             afficher_sous_menu_tranche_synthese(gestionnaire)
@@ -567,7 +567,7 @@ def afficher_sous_menu_premier(gestionnaire):
         choix = input("Choix : ").strip()
 
         if choix == "1":
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             analyser_premiers_paire_impaire(courses)
             analyser_deuxieme_paire_impaire(courses)
             analyser_troisieme_paire_impaire(courses)
@@ -604,7 +604,7 @@ def afficher_sous_menu_tranche_synthese(gestionnaire):
         choix = input("Choix : ").strip()
 
         if choix == "1":
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             gestionnaire.analyser_paire_impaire_par_tranche_synthese(courses)
         elif choix == "2":
             gestionnaire.analyser_15_dernieres_courses()
@@ -656,17 +656,17 @@ def menu_frequence_ecart_synthese(gestionnaire):
 
         if choix == "1":
             numero = int(input("Entrez le numéro à analyser pour le premier : "))
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             resultats = analyse_ecart_position_generique(courses, numero, 0)
             gestionnaire.visualiser_resultats(resultats, "Premier")
         elif choix == "2":
             numero = int(input("Entrez le numéro à analyser pour le deuxième : "))
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             resultats = analyse_ecart_position_generique(courses, numero, 1)
             gestionnaire.visualiser_resultats(resultats, "Deuxième")
         elif choix == "3":
             numero = int(input("Entrez le numéro à analyser pour le troisieme : "))
-            courses = gestionnaire.db.get_courses()
+            courses = gestionnaire.db.get_courses(analysees=True)
             resultats = analyse_ecart_position_generique(courses, numero, 2)
             gestionnaire.visualiser_resultats(resultats, "Troisième")
         elif choix == "4":
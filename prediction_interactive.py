@@ -79,9 +79,8 @@ class PredictiveEngine:
         
     def load_historical_patterns(self) -> Dict[str, Any]:
         """Charge les modèles historiques depuis la base."""
-        conn = sqlite3.connect(self.db.db_path)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+        cur = self.db.connexion().cursor()
+        cur.row_factory = sqlite3.Row
         
         patterns = {
             'frequence_arrivee': {},
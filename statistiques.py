@@ -6,6 +6,7 @@ import seaborn as sns
 from typing import Dict, Any, List
 from datetime import datetime
 from database import Database
+from course_frame import instantane
 from analyse import calculer_ecarts_numeros_arrivee_avec_participation
 from prediction_avancee import (
     AnalyseTemporelle,
@@ -26,25 +27,20 @@ class AnalyseStatistiqueAvancee:
     
     def _preparer_donnees(self) -> pd.DataFrame:
         """Version corrigée avec gestion temporelle des écarts"""
-        courses = sorted(self.gestionnaire.db.get_courses(), key=lambda x: x['date_course'])
+        # Corpus trié par date, ouvert depuis l'instantané binaire de la base (régénéré si la base a changé)
+        corpus = instantane(self.gestionnaire.db)
         
         data = []
         historique_courses = []
-        for course in courses:
+        for indice in range(len(corpus)):
             # Accumuler les courses dans l'ordre chronologique
+            course = corpus.course(indice)
             historique_courses.append(course)
             
-            # Traitement de l'arrivée
-            arrivee = [x.strip() for x in course['arrivee'].split('-') if x.strip()]
-            arrivee = list(map(int, arrivee))
-            
-            # Traitement de la synthèse
-            synthese = [x.strip().replace('e', '') 
-                       for x in course['synthese'].split('-') if x.strip()]
-            synthese = list(map(int, synthese))
-            
-            # Traitement des partants
-            partants = list(map(int, course['partants'].split(','))) if course['partants'] else []
+            # Arrivée, synthèse et partants lus dans les colonnes du corpus (0 : position absente)
+            arrivee = [numero for numero in corpus.arrivee[indice].tolist() if numero]
+            synthese = [numero for numero in corpus.synthese[indice].tolist() if numero]
+            partants = corpus.numeros_partants(indice)
             
             # Calcul des écarts
             ecarts = calculer_ecarts_numeros_arrivee_avec_participation(historique_courses)
@@ -28,14 +28,20 @@ if menu_option == "Accueil":
     st.header("Bienvenue sur l'analyse des courses hippiques")
     st.write("Utilisez le menu de gauche pour naviguer entre les différentes sections.")
     
-    # Afficher les dernières courses
+    # Afficher les dernières courses, page par page (pagination sur la clé date/id, sans charger toute la table)
     st.subheader("Dernières courses enregistrées")
     try:
-        courses = db.get_courses()
+        pages = st.session_state.setdefault("pages_courses", [None])  # Clé de début de chaque page vue
+        courses = db.page_courses(apres=pages[-1], limite=20, decroissant=True)
         if courses:
-            # Convertir en DataFrame et afficher uniquement les 5 premières entrées
-            df_courses = pd.DataFrame(courses)
-            st.dataframe(df_courses.head(5))
+            st.dataframe(pd.DataFrame(courses))
+            precedente, suivante = st.columns(2)
+            if len(pages) > 1 and precedente.button("Plus récentes"):
+                pages.pop()
+                st.rerun()
+            if len(courses) == 20 and suivante.button("Plus anciennes"):
+                pages.append((courses[-1]['date_course'], courses[-1]['id']))
+                st.rerun()
         else:
             st.warning("Aucune course trouvée dans la base de données.")
     except Exception as e:
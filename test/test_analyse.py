@@ -1,5 +1,9 @@
 import unittest
-from analyse import analyse_frequence_synthese
+from analyse import (analyse_frequence_synthese, analyse_frequence_arrivee, analyser_ecarts_arrivee,
+                     analyser_ecarts_synthese, calculer_ecarts_numeros, calculer_ecarts_numeros_arrivee,
+                     analyser_couples_arrivee, calculer_ecarts_combinaisons, calculer_ecarts_deuxiemes_synthese,
+                     analyser_numero_synthese)
+from database import preparer_courses
 
 class TestAnalyse(unittest.TestCase):
     def test_analyse_frequence_synthese(self):
@@ -19,5 +23,53 @@ class TestAnalyse(unittest.TestCase):
         result = analyse_frequence_synthese(courses)
         self.assertEqual(result, {})
 
+    def test_analyses_sur_flux(self):
+        # Un flux chronologique (Database.iter_courses) est parcouru une seule fois, avec le même résultat qu'une liste
+        courses = [
+            {'date_course': '2025-01-18', 'arrivee': '3 - 7 - 12', 'synthese': '1e - 2e - 3e'},
+            {'date_course': '2025-01-19', 'arrivee': '7 - 1 - 3', 'synthese': '2e - 4e - 1e'},
+            {'date_course': '2025-01-20', 'arrivee': '5 - 3 - 9', 'synthese': '6e - 2e - 5e'},
+        ]
+        for analyse in (analyse_frequence_synthese, analyse_frequence_arrivee, analyser_ecarts_arrivee, analyser_ecarts_synthese):
+            self.assertEqual(analyse(iter(courses)), analyse(courses))
+        for analyse in (calculer_ecarts_numeros, calculer_ecarts_numeros_arrivee):
+            self.assertEqual(analyse(iter(courses), triees=True), analyse(courses))
+        self.assertEqual(analyse_frequence_arrivee(iter([])), {})
+        # Un flux annoncé trié mais qui ne l'est pas est refusé, pas compté dans le désordre
+        for analyse in (calculer_ecarts_numeros, calculer_ecarts_numeros_arrivee):
+            with self.assertRaises(ValueError):
+                analyse(iter(courses[::-1]), triees=True)
+
+    def test_courses_analysees(self):
+        # Courses lues une fois : mêmes résultats que les dictionnaires, lues comme eux mais non modifiables
+        courses = [
+            {'date_course': '2025-01-18', 'arrivee': '3 - 7 - 12', 'synthese': '1e - 2e - 3e', 'partants': '3,7,12'},
+            {'date_course': '2025-01-19', 'arrivee': '7 - 1 - 3', 'synthese': '2e - 4e - 10e', 'partants': '1,3,7'},
+            {'date_course': '2025-01-20', 'arrivee': '5 - 3 - 9', 'synthese': '6e - 2e - 5e', 'partants': ''},
+        ]
+        analysees = preparer_courses(courses)
+        self.assertEqual((analysees[1].arrivee_numeros, analysees[1].synthese_numeros, analysees[1].partants_numeros),
+                         ((7, 1, 3), (2, 4, 10), frozenset({1, 3, 7})))
+        self.assertEqual(analysees[0].jour + 2, analysees[2].jour)
+        self.assertEqual(analysees, courses)
+        self.assertEqual(analysees[0]['arrivee'], '3 - 7 - 12')
+        self.assertIs(preparer_courses(analysees)[0], analysees[0])
+        with self.assertRaises(TypeError):
+            analysees[0]['arrivee'] = ''
+        for analyse in (analyse_frequence_synthese, analyse_frequence_arrivee, analyser_ecarts_arrivee, analyser_ecarts_synthese,
+                        calculer_ecarts_numeros, calculer_ecarts_numeros_arrivee, analyser_couples_arrivee,
+                        calculer_ecarts_combinaisons, calculer_ecarts_deuxiemes_synthese):
+            self.assertEqual(analyse(analysees), analyse(courses))
+        self.assertEqual(analyser_numero_synthese(analysees, 2), analyser_numero_synthese(courses, 2))
+
+        # Un non-partant occupe sa position : les top_n premières positions sont prises avant d'écarter 'NP'
+        courses = [{'date_course': '2025-01-21', 'arrivee': '14 - NP - 3 - 5', 'synthese': '2e - NP - 4e'}]
+        analysees = preparer_courses(courses)
+        self.assertEqual((analysees[0].arrivee_positions, analysees[0].arrivee_numeros), ((14, 0, 3, 5), (14, 3, 5)))
+        for corpus in (courses, analysees):
+            self.assertEqual(analyse_frequence_arrivee(corpus, top_n=3), {14: 100.0, 3: 100.0})
+            self.assertEqual(calculer_ecarts_deuxiemes_synthese(corpus), {})
+            self.assertEqual(analyser_numero_synthese(corpus, 2)['presence_top3'], 0)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from database import Database
+from course_frame import (CourseFrame, COLONNE_TOP3, COLONNE_TOP5, chemin_instantane, cooccurrences, en_courses,
+                          instantane, matrice_positions)
+from analyse import (analyse_frequence_arrivee, analyse_frequence_synthese, analyser_couples_arrivee,
+                     analyser_couples_synthese, analyser_triples_arrivee, analyser_triples_synthese,
+                     calculer_ecarts_numeros_arrivee, calculer_ecarts_premiers_synthese,
+                     calculer_ecarts_troisiemes_synthese)
+
+class TestCourseFrame(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        base = {'lieu': 'Vincennes', 'type': 'Attelé', 'distance': '2700m'}
+        self.db.save_courses_bulk([
+            ("c.txt", dict(base, date='2025-01-20', lieu='Pau', partants=[9, 2, 14],
+                           arrivée='14 - 2 - 9', synthese='3e - 1e - 2e')),
+            ("a.txt", dict(base, date='2025-01-18', partants=[3, 7, 12, 15],
+                           arrivée='3 - 7 - 12 - 15 - 1', synthese='1e - 2e - 3e - 4e - 5e')),
+            ("b.txt", dict(base, date='2025-01-19', type='Plat', distance='1600m', partants=[1, 5],
+                           arrivée='5 - 1', synthese='2e - 1e')),
+        ])
+        self.frame = CourseFrame.depuis_base(self.db)
+
+    def tearDown(self):
+        self.db.fermer()
+
+    def test_colonnes(self):
+        self.assertEqual(len(self.frame), 3)
+        self.assertEqual(self.frame.arrivee.dtype, np.int8)
+        self.assertEqual(self.frame.arrivee.shape, (3, 5))
+        self.assertEqual(self.frame.arrivee[0].tolist(), [3, 7, 12, 15, 1])
+        self.assertEqual(self.frame.synthese[2].tolist(), [3, 1, 2, 0, 0])
+        self.assertEqual(self.frame.numeros_partants(2), [2, 9, 14])
+        self.assertEqual(int(self.frame.partants[1]), (1 << 1) | (1 << 5))
+        self.assertEqual(np.diff(self.frame.jours).tolist(), [1, 1])
+        self.assertEqual([self.frame.disciplines[code] for code in self.frame.types], ['Attelé', 'Plat', 'Attelé'])
+
+    def test_courses_identiques_a_la_base(self):
+        courses = self.db.get_courses()
+        for course in courses:
+            course['partants'] = ','.join(sorted(course['partants'].split(','), key=int))
+        self.assertEqual(en_courses(self.frame), courses)
+        # Les fonctions d'analyse acceptent le corpus tel quel
+        self.assertEqual(analyse_frequence_arrivee(self.frame), analyse_frequence_arrivee(courses))
+        self.assertEqual(calculer_ecarts_numeros_arrivee(self.frame), calculer_ecarts_numeros_arrivee(courses))
+
+    def test_vues_et_filtres(self):
+        vue = self.frame.entre('2025-01-19', '2025-01-20')
+        self.assertEqual(vue.ids.tolist(), self.frame.ids[1:].tolist())
+        self.assertTrue(np.shares_memory(vue.arrivee, self.frame.arrivee))
+        self.assertTrue(np.shares_memory(self.frame[-2:].partants, self.frame.partants))
+        self.assertEqual(self.frame[-1]['lieu'], 'Pau')
+
+        attele = self.frame.filtrer(type_course='Attelé', date_debut='2025-01-19')
+        self.assertEqual([c['id'] for c in attele],
+                         [c['id'] for c in self.db.get_courses(type_course='Attelé', date_debut='2025-01-19')])
+        self.assertEqual(len(self.frame.filtrer(distance='2700m', lieu='Vincennes')), 1)
+        self.assertEqual(len(self.frame.filtrer(type_course='Monté')), 0)
+
+    def test_frequences(self):
+        comptes, total = self.frame.frequences('arrivee')
+        self.assertEqual(total, 3)
+        self.assertEqual(comptes.shape, (128, 7))
+        self.assertEqual(comptes[1].tolist(), [0, 1, 0, 0, 1, 1, 2])
+        self.assertEqual(comptes[0, :5].tolist(), [0, 0, 1, 2, 2])  # positions absentes
+        self.assertEqual(comptes[1:, COLONNE_TOP5].sum(), 10)
+
+        # Mêmes pourcentages que les boucles sur les dictionnaires
+        courses = self.db.get_courses()
+        for top_n in (1, 3, 5):
+            self.assertEqual(analyse_frequence_arrivee(self.frame, top_n), analyse_frequence_arrivee(courses, top_n))
+        self.assertEqual(analyse_frequence_synthese(self.frame), analyse_frequence_synthese(courses))
+        synthese, _ = self.frame.frequences('synthese')
+        for position, ecarts in ((0, calculer_ecarts_premiers_synthese(courses)),
+                                 (2, calculer_ecarts_troisiemes_synthese(courses))):
+            self.assertEqual({num: e['total_occurrences'] for num, e in ecarts.items()},
+                             {num: int(synthese[num, position]) for num in np.flatnonzero(synthese[1:, position]) + 1})
+
+        # Filtres par masque : mêmes comptes que sur le corpus filtré
+        for filtres in ({'type_course': 'Attelé'}, {'distance': '2700m', 'lieu': 'Pau'}, {'lieu': 'Chantilly'},
+                        {'type_course': 'Attelé', 'date_debut': '2025-01-19'}):
+            comptes, total = self.frame.frequences('synthese', **filtres)
+            filtre = self.frame.filtrer(**filtres)
+            self.assertEqual(total, len(filtre))
+            self.assertEqual(comptes[:, COLONNE_TOP3].tolist(), frequences_positions_top3(filtre))
+
+    def test_cooccurrences(self):
+        combinaisons = self.frame.cooccurrences('arrivee')
+        self.assertEqual(combinaisons.couple(7, 3), 1)
+        self.assertEqual(combinaisons.couple(5, 1), 1)
+        self.assertEqual(combinaisons.couple(2, 3), 0)
+        self.assertEqual(combinaisons.triple(15, 1, 3), 1)
+        self.assertEqual(combinaisons.triple(1, 5, 99), 0)
+        self.assertEqual(len(dict(combinaisons.iter_triples())), 10 + 1)
+
+        # Les quatre analyses, depuis le corpus ou depuis les dictionnaires, donnent les pourcentages des boucles
+        courses = self.db.get_courses()
+        attendus = {
+            analyser_couples_arrivee: {(1, 3): 1 / 3 * 100, (2, 14): 1 / 3 * 100},
+            analyser_triples_synthese: {(1, 2, 3): 2 / 3 * 100},
+        }
+        for analyse, extrait in attendus.items():
+            for corpus in (self.frame, courses):
+                resultat = analyse(corpus)
+                self.assertEqual({cle: resultat[cle] for cle in extrait}, extrait)
+        for analyse in (analyser_couples_arrivee, analyser_couples_synthese, analyser_triples_arrivee, analyser_triples_synthese):
+            self.assertEqual(analyse(self.frame), analyse(courses))
+            self.assertEqual(analyse(self.frame.filtrer(type_course='Attelé')),
+                             analyse(self.db.get_courses(type_course='Attelé')))
+        self.assertEqual(self.frame.cooccurrences('synthese', distance='1600m').pourcentages_couples(), {(1, 2): 100.0})
+
+        # Numéro répété dans une course : mêmes combinaisons que itertools.combinations
+        repetitions = cooccurrences(matrice_positions([(4, 4, 6), (), (6, 4)]))
+        self.assertEqual(list(repetitions.iter_couples()), [((4, 4), 1), ((4, 6), 3)])
+        self.assertEqual(list(repetitions.iter_triples()), [((4, 4, 6), 1)])
+        self.assertEqual(repetitions.nombre_courses, 3)
+
+        # Mémoire selon les numéros distincts, pas selon le plus grand : 1500 n'alloue pas 1501**3 comptes
+        grands = [{'date_course': '2025-01-01', 'arrivee': '3 - 12 - 1500 - 4 - 5'},
+                  {'date_course': '2025-01-02', 'arrivee': '12 - 1500 - 7'}]
+        self.assertEqual(analyser_couples_arrivee(grands)[(12, 1500)], 100.0)
+        self.assertEqual(analyser_triples_arrivee(grands)[(3, 12, 1500)], 50.0)
+        combinaisons = cooccurrences(matrice_positions([(3, 12, 1500, 4, 5), (12, 1500, 7)]))
+        self.assertEqual(combinaisons.taille, 7)  # 0 puis les six numéros présents
+        self.assertEqual((combinaisons.couple(1500, 12), combinaisons.couple(1500, 6)), (2, 0))
+        self.assertEqual(combinaisons.triple(7, 1500, 12), 1)
+
+    def test_instantane(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "courses.db"))
+            db.save_courses_bulk((f"{nom}.txt", course) for nom, course in zip("ab", [
+                {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 4],
+                 'arrivée': '4 - 1', 'synthese': '2e - 1e'},
+                {'date': '2025-01-19', 'lieu': None, 'type': 'Attelé', 'distance': '2700m', 'partants': [], 'arrivée': ''},
+            ]))
+            corpus = instantane(db)
+            self.assertTrue(os.path.exists(chemin_instantane(db)))
+            self.assertIsInstance(corpus.arrivee.base, np.memmap)
+            self.assertEqual(list(corpus), list(CourseFrame.depuis_base(db)))
+
+            # Instantané à jour : ouvert sans relire la base ; écriture en base : régénéré
+            self.assertEqual(CourseFrame.ouvrir(chemin_instantane(db))[1], db.version_base())
+            db.save_course("c.txt", {'date': '2025-01-20', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m',
+                                     'partants': [2], 'arrivée': '2'})
+            self.assertEqual(len(instantane(db)), 3)
+            self.assertEqual(len(corpus), 2)  # L'ancien instantané reste lisible par qui l'a ouvert
+
+            with open(chemin_instantane(db), 'wb') as fichier:
+                fichier.write(b'corrompu')
+            with self.assertRaises(ValueError):
+                CourseFrame.ouvrir(chemin_instantane(db))
+            self.assertEqual(len(instantane(db)), 3)
+            db.fermer()
+
+def frequences_positions_top3(corpus):
+    comptes = [0] * 128
+    for ligne in corpus.synthese.tolist():
+        for numero in ligne[:3]:
+            comptes[numero] += 1
+    return comptes
+
+if __name__ == "__main__":
+    unittest.main()
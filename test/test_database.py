@@ -1,6 +1,9 @@
 import unittest
+import os
 import sqlite3
-from database import Database
+import tempfile
+import threading
+from database import Database, MIGRATIONS, STATUT_SUCCES, STATUT_DEJA_TRAITE, STATUT_ERREUR
 
 class TestDatabase(unittest.TestCase):
     def setUp(self):
@@ -8,6 +11,9 @@ class TestDatabase(unittest.TestCase):
         self.db_path = ":memory:"
         self.db = Database(self.db_path)
 
+    def tearDown(self):
+        self.db.fermer()
+
     def test_save_course(self):
         # Test de sauvegarde d'une course
         donnees = {
@@ -21,8 +27,8 @@ class TestDatabase(unittest.TestCase):
         result = self.db.save_course("18-01-25.txt", donnees)
         self.assertTrue(result)
 
-        # Vérifier que la course a bien été insérée
-        with sqlite3.connect(self.db_path) as conn:
+        # Vérifier que la course a bien été insérée (même base en mémoire : connexion de l'instance)
+        with self.db.connexion() as conn:
             cur = conn.cursor()
             cur.execute('SELECT * FROM courses WHERE nom_fichier = ?', ("18-01-25.txt",))
             course = cur.fetchone()
@@ -42,5 +48,425 @@ class TestDatabase(unittest.TestCase):
         result = self.db.save_course("18-01-25.txt", donnees)  # Tentative de doublon
         self.assertFalse(result)
 
+    def test_save_courses_bulk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "courses.db")
+            db = Database(db_path)
+            donnees = {
+                'date': '2025-01-18',
+                'lieu': 'Vincennes',
+                'type': 'Attelé',
+                'distance': '2700m',
+                'arrivée': '3 - 8 - 12 - 4 - 9',
+                'synthese': '1e - 3e - 2e - 4e - 11e',
+                'partants': [3, 8, 12, 4, 9]
+            }
+            db.save_course("18-01-25.txt", donnees)
+            courses = [(f"{jour:02d}-02-25.txt", dict(donnees, date=f"2025-02-{jour:02d}")) for jour in range(1, 6)]
+            courses += [("18-01-25.txt", donnees), ("01-02-25.txt", donnees), ("incomplet.txt", {'date': '2025-02-06'})]
+
+            resultats = db.save_courses_bulk(courses, taille_lot=2)
+            self.assertEqual([nom for nom, _ in resultats], [nom for nom, _ in courses])
+            self.assertEqual([statut for _, statut in resultats],
+                             [STATUT_SUCCES] * 5 + [STATUT_DEJA_TRAITE, STATUT_DEJA_TRAITE, STATUT_ERREUR])
+
+            with sqlite3.connect(db_path) as conn:
+                cur = conn.cursor()
+                cur.execute('SELECT nom_fichier, partants FROM courses ORDER BY id')
+                lignes = cur.fetchall()
+                cur.execute('SELECT COUNT(*) FROM fichiers_traites')
+                self.assertEqual(cur.fetchone()[0], 6)
+            conn.close()
+            self.assertEqual(len(lignes), 6)
+            self.assertEqual(lignes[1], ("01-02-25.txt", "3,8,12,4,9"))
+
+    def test_resultats_et_requetes_typees(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "courses.db"))
+            classement = [{'rang': 1, 'numero': 7, 'nom': 'Alpha', 'gains': 900},
+                          {'rang': 2, 'numero': 3, 'nom': 'Beta', 'gains': 400}]
+            base = {'date': '2025-01-18', 'lieu': 'Vincennes', 'type': 'Attelé', 'distance': '2700m',
+                    'arrivée': '3 - 7', 'synthese': '1e - 2e'}
+            db.save_courses_bulk([
+                ("a.txt", dict(base, partants=[7, 3, 9], classement=classement)),
+                ("b.txt", dict(base, date='2025-01-19', type='Plat', partants=[3, 9])),
+            ])
+            courses = db.get_courses()
+            ids = [course['id'] for course in courses]
+            self.assertEqual(db.get_partants(), {ids[0]: [3, 7, 9], ids[1]: [3, 9]})
+            self.assertEqual(db.get_partants(avec=[7, 9]), {ids[0]: [3, 7, 9]})
+            self.assertEqual(db.get_partants(type_course='Plat'), {ids[1]: [3, 9]})
+            self.assertEqual(db.get_resultats(ids[0]), [
+                {'rang': 1, 'numero': 7, 'nom': 'Alpha', 'gains': 900},
+                {'rang': 2, 'numero': 3, 'nom': 'Beta', 'gains': 400},
+                {'rang': None, 'numero': 9, 'nom': None, 'gains': None},
+            ])
+            self.assertEqual(db.compter_participations([3, 7, 12]), {3: 2, 7: 1, 12: 0})
+            self.assertEqual(db.compter_participations([3], date_debut='2025-01-19'), {3: 1})
+            self.assertEqual(db.compter_courses_communes([3, 9]), 2)
+            self.assertEqual(db.compter_courses_communes([3, 7, 9]), 1)
+
+            # Une note modifiée remplace aussi ses résultats
+            db.save_courses_bulk([("b.txt", dict(base, partants=[4]))], remplacer={"b.txt"})
+            self.assertEqual(sorted(db.get_partants().values()), [[3, 7, 9], [4]])
+
+    def test_migration_resultats(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "ancienne.db")
+            # Base créée avant la table resultats : partants stockés en chaîne uniquement
+            with sqlite3.connect(db_path) as conn:
+                conn.execute('''CREATE TABLE courses (id INTEGER PRIMARY KEY, date_course DATE, lieu TEXT, type_course TEXT,
+                                distance TEXT, arrivee TEXT, synthese TEXT, partants TEXT, nom_fichier TEXT)''')
+                conn.execute("INSERT INTO courses (date_course, arrivee, partants, nom_fichier) VALUES ('2025-01-18', '1 - 2', '5,1,2', 'a.txt')")
+                conn.execute("INSERT INTO courses (date_course, arrivee, partants, nom_fichier) VALUES ('2025-01-19', '1 - 2', '', 'b.txt')")
+            conn.close()
+
+            db = Database(db_path)
+            self.assertEqual(db.get_partants(), {1: [1, 2, 5]})
+            with sqlite3.connect(db_path) as conn:
+                self.assertEqual(conn.execute('PRAGMA user_version').fetchone()[0], len(MIGRATIONS))
+            conn.close()
+            Database(db_path)  # Une seconde ouverture ne rejoue pas la migration
+            self.assertEqual(db.compter_participations([5]), {5: 1})
+            # Positions reprises des chaînes existantes, puis agrégats
+            self.assertEqual([c['arrivee_numeros'] for c in db.get_courses(positions=True)], [(1, 2, None, None, None)] * 2)
+            self.assertEqual(db.frequences_combinaisons('arrivee', 2), {(1, 2): 100.0})
+
+    def test_positions(self):
+        base = {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2, 3]}
+        self.db.save_courses_bulk([
+            ("a.txt", dict(base, arrivée='3 - 14 - 9 - 12 - 15', synthese='12e - 5e - 15e - 2e - 9e')),
+            ("b.txt", dict(base, arrivée='14 - NP - 3', synthese='5e - 12e', type='Attelé')),
+        ])
+        courses = self.db.get_courses(positions=True)
+        # Positions conservées : 3 reste troisième derrière un non-partant
+        self.assertEqual([c['arrivee_numeros'] for c in courses], [(3, 14, 9, 12, 15), (14, None, 3, None, None)])
+        self.assertEqual([c['synthese_numeros'] for c in courses], [(12, 5, 15, 2, 9), (5, 12, None, None, None)])
+        self.assertNotIn('arrivee_numeros', self.db.get_courses()[0])
+
+        arrivees = self.db.compter_positions('arrivee')
+        self.assertEqual(arrivees[3], [1, 0, 1, 0, 0])
+        self.assertEqual(arrivees[15], [0, 0, 0, 0, 1])
+        self.assertEqual(self.db.compter_positions('synthese', type_course='Attelé'), {5: [1, 0, 0, 0, 0], 12: [0, 1, 0, 0, 0]})
+        with self.assertRaises(ValueError):
+            self.db.compter_positions('partants')
+
+    def test_cache_courses(self):
+        base = {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2]}
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "courses.db")
+            db = Database(db_path, taille_cache=2)
+            db.save_course("a.txt", base)
+            self.assertEqual(len(db.get_courses()), 1)
+            courses = db.get_courses()
+            courses[0]['lieu'] = 'Modifié'  # Les dictionnaires renvoyés n'altèrent pas le cache
+            self.assertEqual(db.get_courses()[0]['lieu'], 'Pau')
+            self.assertEqual(db.statistiques_cache(), {'succes': 2, 'echecs': 1, 'entrees': 1})
+
+            # Une écriture d'un autre processus (autre connexion) change la version stockée en base
+            autre = Database(db_path)
+            autre.save_courses_bulk([("b.txt", dict(base, date='2025-01-19'))])
+            autre.fermer()
+            self.assertEqual(len(db.get_courses()), 2)
+            self.assertEqual(db.statistiques_cache()['echecs'], 2)
+
+            # Taille bornée : le filtre le moins récemment utilisé est évincé
+            db.get_courses(type_course='Plat')
+            db.get_courses(date_debut='2025-01-19')
+            self.assertEqual(db.statistiques_cache()['entrees'], 2)
+            db.get_courses()
+            self.assertEqual(db.statistiques_cache()['echecs'], 5)
+
+            # Courses lues une fois pour les analyses : non modifiables, partagées entre les appels
+            analysees = db.get_courses(analysees=True)
+            self.assertEqual(analysees, db.get_courses())
+            self.assertIs(db.get_courses(analysees=True)[0], analysees[0])
+            self.assertEqual(analysees[0].partants_numeros, frozenset({1, 2}))
+            db.fermer()
+
+    def test_iter_et_pages_courses(self):
+        base = {'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2]}
+        # Plusieurs courses le même jour : l'id départage les pages
+        self.db.save_courses_bulk([(f"{i}.txt", dict(base, date=f"2025-01-{10 + i % 4:02d}", type=['Plat', 'Attelé'][i % 2]))
+                                   for i in range(11)])
+        courses = self.db.get_courses()
+        self.assertEqual(list(self.db.iter_courses(taille_lot=3)), courses)
+        self.assertEqual(list(self.db.iter_courses(type_course='Attelé', positions=True)),
+                         self.db.get_courses(type_course='Attelé', positions=True))
+
+        for decroissant, filtres in ((False, {}), (True, {}), (False, {'type_course': 'Plat'}), (True, {'type_course': 'Plat'})):
+            pages, apres = [], None
+            while True:
+                page = self.db.page_courses(apres=apres, limite=3, decroissant=decroissant, **filtres)
+                if not page:
+                    break
+                pages.append(page)
+                apres = (page[-1]['date_course'], page[-1]['id'])
+            attendu = self.db.get_courses(**filtres)
+            self.assertEqual([c for page in pages for c in page], attendu[::-1] if decroissant else attendu)
+            self.assertTrue(all(len(page) <= 3 for page in pages))
+
+    def test_agregats_frequences(self):
+        from analyse import (analyse_frequence_arrivee, analyse_frequence_synthese, analyser_couples_arrivee,
+                             analyser_triples_synthese)
+        base = {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2]}
+        self.db.save_courses_bulk([
+            ("a.txt", dict(base, arrivée='3 - 14 - 9 - 12 - 15', synthese='12e - 5e - 15e - 2e - 9e')),
+            ("b.txt", dict(base, arrivée='14 - 3 - 9', synthese='5e - 12e', type='Attelé')),
+            ("c.txt", dict(base, arrivée='3 - 9 - 1 - 2 - 4', synthese='1e - 5e - 12e - 3e - 2e', lieu='Vincennes')),
+        ])
+
+        def verifier():
+            for filtres in ({}, {'type_course': 'Plat'}, {'type_course': 'Plat', 'distance': '1600m'}):
+                courses = self.db.get_courses(**filtres)
+                self.assertEqual(self.db.frequences_numeros('arrivee', range(1, 4), **filtres), analyse_frequence_arrivee(courses))
+                self.assertEqual(self.db.frequences_numeros('synthese', **filtres), analyse_frequence_synthese(courses))
+                self.assertEqual(self.db.frequences_combinaisons('arrivee', 2, **filtres), analyser_couples_arrivee(courses))
+                self.assertEqual(self.db.frequences_combinaisons('synthese', 3, **filtres), analyser_triples_synthese(courses))
+        verifier()
+        self.assertEqual(self.db.compter_courses_agregees(lieu='Vincennes'), 1)
+
+        # Remplacement et suppression d'une course : les agrégats suivent
+        self.db.save_courses_bulk([("a.txt", dict(base, arrivée='1 - 2 - 3', synthese='7e - 8e'))], remplacer={"a.txt"})
+        self.db.enregistrer_doublons([("c.txt", "b.txt")])
+        verifier()
+        self.assertEqual(self.db.frequences_numeros('arrivee', type_course='Monté'), {})
+        with self.assertRaises(ValueError):
+            self.db.frequences_combinaisons('arrivee', 4)
+
+    def test_dimensions_et_facettes(self):
+        base = {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'arrivée': '3 - 14', 'partants': [1, 2]}
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "courses.db")
+            db = Database(db_path)
+            db.save_courses_bulk([("a.txt", base), ("b.txt", dict(base, lieu='Vincennes')),
+                                  ("c.txt", dict(base, type='Attelé', distance='2700m', lieu=None))])
+            db.save_course("d.txt", dict(base, distance='2400m'))
+            self.assertEqual(db.facettes(), {'Plat': {'1600m': {'Pau': 1, 'Vincennes': 1}, '2400m': {'Pau': 1}},
+                                             'Attelé': {'2700m': {None: 1}}})
+            self.assertEqual(db.obtenir_disciplines_disponibles(), ['Attelé', 'Plat'])
+            self.assertEqual(db.obtenir_distances_disponibles(), ['1600m', '2400m', '2700m'])
+            self.assertEqual(db.obtenir_distances_disponibles('Plat'), ['1600m', '2400m'])
+            self.assertEqual(db.obtenir_lieux_disponibles(), ['Pau', 'Vincennes', None])
+            self.assertEqual(db.obtenir_lieux_disponibles_par_discipline_et_distance('Plat', '1600m'), ['Pau', 'Vincennes'])
+            self.assertTrue(db.combinaison_existe('Plat', '2400m', 'Pau'))
+            self.assertFalse(db.combinaison_existe('Plat', '2400m', 'Vincennes'))
+
+            # Les courses référencent les dimensions par leur clé entière
+            with sqlite3.connect(db_path) as conn:
+                lignes = conn.execute('''
+                    SELECT c.type_course, d.nom, c.lieu, l.nom FROM courses c
+                    JOIN disciplines d ON d.id = c.discipline_id LEFT JOIN lieux l ON l.id = c.lieu_id
+                ''').fetchall()
+            conn.close()
+            self.assertEqual(len(lignes), 4)
+            self.assertTrue(all(ligne[0] == ligne[1] and ligne[2] == ligne[3] for ligne in lignes))
+
+            # Remplacement d'une course : l'arbre est mis à jour sur place, sans relecture
+            db.save_courses_bulk([("b.txt", dict(base, type='Monté'))], remplacer={"b.txt"})
+            self.assertEqual(db._facettes[0], db.version_base())
+            self.assertEqual(db.facettes()['Plat']['1600m'], {'Pau': 1})
+            self.assertEqual(db.facettes()['Monté'], {'1600m': {'Pau': 1}})
+
+            # Écritures d'un autre processus puis suppression d'un doublon : l'arbre est reconstruit
+            autre = Database(db_path)
+            autre.save_courses_bulk([("e.txt", dict(base, lieu='Deauville'))])
+            autre.fermer()
+            self.assertTrue(db.combinaison_existe('Plat', '1600m', 'Deauville'))
+            db.enregistrer_doublons([("c.txt", "a.txt")])
+            self.assertNotIn('Attelé', db.facettes())
+            with sqlite3.connect(db_path) as conn:
+                attendu = sorted(conn.execute('SELECT DISTINCT type_course, distance, lieu FROM courses').fetchall())
+            conn.close()
+            self.assertEqual(sorted((d, di, l) for d, distances in db.facettes().items()
+                                    for di, lieux in distances.items() for l in lieux), attendu)
+            db.fermer()
+
+    def test_partitions_par_saison(self):
+        base = {'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2, 3]}
+        notes = [(f"{annee}-{mois}.txt", dict(base, date=f"{annee}-{mois:02d}-15", arrivée=f"{mois} - {annee % 10}",
+                                              type='Plat' if mois == 3 else 'Attelé'))
+                 for annee in (2023, 2024, 2025) for mois in (3, 9)]
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "courses.db"))
+            db.save_courses_bulk(notes)
+            avant = (db.get_courses(positions=True), db.frequences_numeros('arrivee'), db.facettes(), db.get_global_stats())
+            partants = db.get_partants(avec=[2])
+
+            self.assertEqual(db.archiver_saison(2023), 'saison_2023')
+            db.archiver_saison(2024, lecture_seule=False, compacter=False)
+            self.assertEqual([(nom, os.path.basename(chemin), lecture_seule) for nom, chemin, _, _, lecture_seule in db.partitions()],
+                             [('saison_2023', 'courses_2023.db', True), ('saison_2024', 'courses_2024.db', False)])
+            with sqlite3.connect(os.path.join(tmp, "courses.db")) as conn:
+                self.assertEqual(conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0], 2)
+            conn.close()
+
+            # Lectures fusionnées dans l'ordre chronologique ; agrégats et facettes inchangés
+            self.assertEqual((db.get_courses(positions=True), db.frequences_numeros('arrivee'), db.facettes(),
+                              db.get_global_stats()), avant)
+            self.assertEqual(db.get_partants(avec=[2]), partants)
+            self.assertEqual(list(db.iter_courses(taille_lot=1)), db.get_courses())
+            self.assertEqual([c['date_course'] for c in db.page_courses(apres=('2023-09-15', 2), limite=2)],
+                             ['2024-03-15', '2024-09-15'])
+            self.assertEqual(db.get_resultats(1), [{'rang': None, 'numero': numero, 'nom': None, 'gains': None} for numero in (1, 2, 3)])
+            self.assertEqual(db.compter_participations([1], type_course='Plat'), {1: 3})
+
+            # Seules les saisons qui recoupent les filtres de dates sont interrogées
+            db.fermer()
+            db.connexion().setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 1)  # Nouvelle connexion : une seule saison attachée à la fois
+            self.assertEqual([s for s, _ in db._sources('2024-06-01', '2025-12-31')], ['saison_2024', 'main'])
+            self.assertEqual(len(db.get_courses(date_debut='2023-01-01', date_fin='2023-12-31')), 2)
+            self.assertEqual(list(db._local.partitions), ['saison_2023'])
+            self.assertEqual(len(db.get_courses()), 6)
+
+            with self.assertRaises(ValueError):
+                db.archiver_saison(2024)  # Déjà archivée
+            with self.assertRaises(ValueError):
+                db.archiver_saison(2025)  # Contient la dernière course enregistrée
+            db.fermer()
+        with self.assertRaises(ValueError):
+            self.db.archiver_saison(2025)
+
+    def test_remplacement_apres_archivage(self):
+        base = {'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2, 3]}
+        notes = [(f"{annee}.txt", dict(base, date=f"{annee}-03-15", arrivée="1 - 2")) for annee in (2023, 2024, 2025)]
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, "courses.db"))
+            db.save_courses_bulk(notes)
+            db.archiver_saison(2023)
+            db.archiver_saison(2024, lecture_seule=False)
+
+            # Saison modifiable : la course archivée est remplacée, une seule fois, agrégats compris
+            modifiee = ("2024.txt", dict(base, date="2024-03-15", arrivée="3 - 1"))
+            self.assertEqual(db.save_courses_bulk([modifiee], remplacer={"2024.txt"}), [("2024.txt", STATUT_SUCCES)])
+            courses = [(c['date_course'], c['arrivee']) for c in db.get_courses()]
+            self.assertEqual(courses, [('2023-03-15', '1 - 2'), ('2024-03-15', '3 - 1'), ('2025-03-15', '1 - 2')])
+            with tempfile.TemporaryDirectory() as tmp_reference:
+                reference = Database(os.path.join(tmp_reference, "courses.db"))
+                reference.save_courses_bulk([notes[0], modifiee, notes[2]])
+                self.assertEqual(db.frequences_numeros('arrivee'), reference.frequences_numeros('arrivee'))
+                self.assertEqual(db.frequences_combinaisons('arrivee', 2), reference.frequences_combinaisons('arrivee', 2))
+                reference.fermer()
+
+            # Saison en lecture seule : le remplacement est refusé, la course reste unique
+            figee = ("2023.txt", dict(base, date="2023-03-15", arrivée="3 - 1"))
+            self.assertEqual(db.save_courses_bulk([figee], remplacer={"2023.txt"}), [("2023.txt", STATUT_ERREUR)])
+            self.assertEqual(db.enregistrer_doublons([("2023.txt", "2025.txt")]), [])
+            self.assertEqual([c['arrivee'] for c in db.get_courses(date_debut='2023-01-01', date_fin='2023-12-31')], ['1 - 2'])
+
+            # Note archivée devenue un doublon : sa course quitte la partition et les agrégats
+            self.assertEqual(db.enregistrer_doublons([("2024.txt", "2025.txt")]), ["2024.txt"])
+            self.assertEqual([c['date_course'] for c in db.get_courses()], ['2023-03-15', '2025-03-15'])
+            self.assertEqual(db.frequences_numeros('arrivee'), {1: 100.0, 2: 100.0})
+            db.fermer()
+
+    def test_miroir(self):
+        notes = [(f"{i}.txt", {'date': f"2025-01-{i:02d}", 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m',
+                               'arrivée': f"{i} - 2", 'partants': [i, 2, 3]}) for i in range(1, 5)]
+        tables = ('courses', 'resultats', 'agregats_numeros', 'disciplines', 'meta')
+
+        def contenu(conn):
+            return [conn.execute(f'SELECT * FROM {table} ORDER BY 1').fetchall() for table in tables]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "courses.db")
+            Database(db_path).save_courses_bulk(notes[:2])
+            db = Database(db_path, miroir=True)
+            self.assertEqual(len(db.get_courses()), 2)
+
+            # Écritures validées sur le disque puis rejouées sur la copie en mémoire
+            db.save_course(*notes[2])
+            db.save_courses_bulk([("1.txt", dict(notes[0][1], arrivée="3 - 1"))])
+            with sqlite3.connect(db_path) as conn:
+                self.assertEqual(contenu(db.connexion()), contenu(conn))
+            conn.close()
+
+            # Écriture d'un autre processus : visible après rafraichir_miroir
+            Database(db_path).save_course(*notes[3])
+            self.assertEqual(len(db.get_courses()), 3)
+            self.assertTrue(db.rafraichir_miroir())
+            self.assertFalse(db.rafraichir_miroir())
+            self.assertEqual(len(db.get_courses()), 4)
+
+            # Lectures depuis un autre fil, puis retour au disque après fermeture
+            lues = []
+            fil = threading.Thread(target=lambda: lues.append(len(db.get_courses())))
+            fil.start()
+            fil.join()
+            self.assertEqual(lues, [4])
+            db.fermer()
+            self.assertEqual(len(db.get_courses()), 4)
+            db.fermer()
+
+    def test_migration_dates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "ancienne.db")
+            with sqlite3.connect(db_path) as conn:
+                conn.execute('''CREATE TABLE courses (id INTEGER PRIMARY KEY, date_course DATE, lieu TEXT, type_course TEXT,
+                                distance TEXT, arrivee TEXT, synthese TEXT, partants TEXT, nom_fichier TEXT)''')
+                conn.executemany("INSERT INTO courses (date_course, type_course, partants, nom_fichier) VALUES (?, 'Plat', '1', ?)",
+                                 [('2025-01-20 00:00:00', 'a.txt'), ('19/01/2025', 'b.txt'), ('2025-01-18', 'c.txt')])
+            conn.close()
+
+            db = Database(db_path)
+            self.assertEqual([c['date_course'] for c in db.get_courses()], ['2025-01-18', '2025-01-19', '2025-01-20'])
+            # Les bornes sont normalisées comme les dates stockées
+            self.assertEqual([c['id'] for c in db.get_courses(date_debut='19/01/2025', date_fin='2025-01-19 12:00')], [2])
+            db.fermer()
+
+    def test_plans_requetes_courses(self):
+        # Les filtres des menus et le tri chronologique sont servis par un index, sans tri temporaire
+        conn = self.db.connexion()
+        filtres = [(), ('Plat',), ('Plat', '2025-01-01', '2025-02-01'), ('Plat', None, None, '1600m'),
+                   ('Plat', '2025-01-01', None, '1600m'), (None, '2025-01-01', '2025-03-01')]
+        for filtre in filtres:
+            query, params = self.db._requete_courses(*filtre)
+            plan = ' '.join(ligne[3] for ligne in conn.execute('EXPLAIN QUERY PLAN ' + query, params))
+            self.assertIn('USING INDEX', plan, filtre)
+            self.assertNotIn('TEMP B-TREE', plan, filtre)
+        for query in ('SELECT DISTINCT lieu FROM courses WHERE type_course = ? AND distance = ?',
+                      'SELECT COUNT(*) FROM courses WHERE type_course = ? AND distance = ? AND lieu = ?'):
+            plan = ' '.join(ligne[3] for ligne in conn.execute('EXPLAIN QUERY PLAN ' + query, ('Plat', '1600m', 'Pau')[:query.count('?')]))
+            self.assertIn('COVERING INDEX', plan, query)
+
+    def test_connexions_par_fil(self):
+        conn = self.db.connexion()
+        self.assertIs(self.db.connexion(), conn)
+        self.db.save_course("a.txt", {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2]})
+
+        # Un autre fil a sa propre connexion, sur la même base en mémoire
+        vus = {}
+        def lire():
+            vus['conn'] = self.db.connexion()
+            vus['courses'] = self.db.get_courses()
+        fil = threading.Thread(target=lire)
+        fil.start()
+        fil.join()
+        self.assertIsNot(vus['conn'], conn)
+        self.assertEqual([c['lieu'] for c in vus['courses']], ['Pau'])
+
+        self.db.fermer()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+    def test_profils(self):
+        with self.assertRaises(ValueError):
+            Database(":memory:", profil="inconnu")
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "courses.db")
+            db = Database(db_path, profil="performance")
+            conn = db.connexion()
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)
+            db.save_course("a.txt", {'date': '2025-01-18', 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [1, 2]})
+            db.fermer()
+            # Le checkpoint de fermeture vide le journal WAL
+            self.assertFalse(os.path.exists(db_path + "-wal") and os.path.getsize(db_path + "-wal"))
+            if 'COURSES_DB_PROFIL' not in os.environ:
+                # Sans profil choisi, la base garde le journal d'origine de SQLite
+                db = Database(os.path.join(tmp, "defaut.db"))
+                self.assertEqual(db.connexion().execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+                db.fermer()
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
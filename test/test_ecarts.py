@@ -0,0 +1,167 @@
+import unittest
+import contextlib
+import io
+import numpy as np
+from database import Database
+from course_frame import CourseFrame
+from ecarts import EtatEcarts, ecarts_occurrences, ecarts_presence
+from analyse import (calculer_ecarts_numeros, calculer_ecarts_numeros_arrivee, calculer_ecarts_couples_arrivee,
+                     calculer_ecarts_triples_arrivee, calculer_ecarts_combinaisons,
+                     calculer_ecarts_numeros_arrivee_avec_participation, calculer_ecarts_premiers_synthese,
+                     calculer_ecarts_deuxiemes_synthese, calculer_ecarts_troisiemes_synthese, calculer_ecarts_cinquiemes_synthese,
+                     analyse_ecart_position_generique, analyse_ecart_positions_combinees, _ecarts_combinaisons)
+
+class TestEcarts(unittest.TestCase):
+    def test_noyau(self):
+        # Clé 0 aux courses 2, 3 et 7 ; clé 1 jamais ; clé 2 à la course 9 (sur 10)
+        presence = np.zeros((10, 3), dtype=bool)
+        presence[[2, 3, 7], 0] = True
+        presence[9, 2] = True
+        ecarts = ecarts_presence(presence)
+        self.assertEqual(ecarts.cles.tolist(), [0, 2])
+        self.assertEqual(ecarts.occurrences.tolist(), [3, 1])
+        self.assertEqual(ecarts.ecart_initial.tolist(), [2, 9])
+        self.assertEqual(ecarts.ecart_actuel.tolist(), [2, 0])
+        self.assertEqual(ecarts.ecart_max.tolist(), [3, 0])  # écart initial exclu
+        self.assertEqual(ecarts.ecart_max_complet.tolist(), [3, 9])
+        self.assertEqual(ecarts.ecart_min.tolist(), [0, 0])
+        self.assertEqual(ecarts.ecarts_cle(0), [2, 0, 3, 2])
+        self.assertEqual(ecarts.ecart_moyen.tolist(), [7 / 4, 9 / 2])
+        self.assertEqual(ecarts.ecart_moyen_interne.tolist(), [3 / 2, 0])
+        self.assertEqual(ecarts.histogramme(0), {2: 2, 0: 1, 3: 1})
+        indices, valeurs, comptes = ecarts.histogrammes()
+        self.assertEqual(list(zip(indices.tolist(), valeurs.tolist(), comptes.tolist())),
+                         [(0, 0, 1), (0, 2, 2), (0, 3, 1), (1, 0, 1), (1, 9, 1)])
+        self.assertEqual(ecarts.indice(2), 1)
+        with self.assertRaises(KeyError):
+            ecarts.indice(1)
+
+        # Forme creuse : une clé répétée dans une course compte une occurrence, et une apparition de plus
+        creux = ecarts_occurrences([7, 2, 3, 3, 9], [0, 0, 0, 0, 2], 10)
+        for attribut in ('cles', 'occurrences', 'ecart_actuel', 'ecart_max', 'ecart_moyen'):
+            self.assertEqual(getattr(creux, attribut).tolist(), getattr(ecarts, attribut).tolist())
+        self.assertEqual(creux.apparitions.tolist(), [4, 1])
+        self.assertEqual(creux.lignes_cle(0, repetitions=True).tolist(), [2, 3, 3, 7])
+        self.assertEqual(len(ecarts_occurrences([], [], 4)), 0)
+
+    def test_vues_des_analyses(self):
+        courses = [
+            {'date_course': '2025-01-20', 'arrivee': '5 - 3 - 9', 'synthese': '6e - 2e - 5e'},
+            {'date_course': '2025-01-18', 'arrivee': '3 - 7 - 12', 'synthese': '1e - 2e - 3e'},
+            {'date_course': '2025-01-19', 'arrivee': '7 - 1 - 3', 'synthese': '2e - 4e - 1e'},
+            {'date_course': '2025-01-21', 'arrivee': '8 - 3', 'synthese': ''},
+        ]
+        self.assertEqual(calculer_ecarts_numeros_arrivee(courses)[7],
+                         {'derniere_occurrence': 1, 'ecart_actuel': 2, 'ecart_max': 2})
+        self.assertEqual(calculer_ecarts_numeros_arrivee_avec_participation(courses)[3]['courses_participées'], 4)
+        self.assertEqual(calculer_ecarts_couples_arrivee(courses)[(3, 7)],
+                         {'derniere_occurrence': 1, 'ecart_actuel': 2, 'ecart_max': 2})
+        self.assertEqual(set(calculer_ecarts_triples_arrivee(courses)), {(3, 7, 12), (1, 3, 7), (3, 5, 9)})
+        self.assertEqual(calculer_ecarts_numeros(courses)[2]['ecart_max'], 1)
+        # Combinaisons de la synthèse : l'écart avant la première occurrence compte dans l'écart maximum
+        self.assertEqual(calculer_ecarts_combinaisons(courses, 2)[(2, 5)],
+                         {'derniere_occurrence': 2, 'ecart_actuel': 1, 'ecart_max': 2, 'occurrences': [2]})
+        # Positions de la synthèse : courses datées avec une synthèse
+        self.assertEqual(calculer_ecarts_premiers_synthese(courses)[2],
+                         {'derniere_occurrence': 1, 'ecart_actuel': 1, 'ecart_max': 1, 'total_occurrences': 1,
+                          'occurrences': ['2025-01-19'], 'frequence': 1 / 3 * 100})
+        self.assertEqual(calculer_ecarts_cinquiemes_synthese(courses), {})
+        # Une synthèse qui commence par un non-partant compte pour les autres positions, dans les deux formes
+        syntheses = ['3e - 5e - 7e', 'NP - 5e - 7e', '3e - 4e - 7e', 'NP - 5e - 8e']
+        db = Database(":memory:")
+        db.save_courses_bulk([(f"{i}.txt", {'date': f"2025-03-0{i + 1}", 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m',
+                                            'partants': [], 'arrivée': '1 - 2 - 3', 'synthese': synthese})
+                              for i, synthese in enumerate(syntheses)])
+        for forme in (db.get_courses(), CourseFrame.depuis_base(db)):
+            deuxiemes = calculer_ecarts_deuxiemes_synthese(forme)[5]
+            self.assertEqual((deuxiemes['total_occurrences'], deuxiemes['frequence']), (3, 75.0))
+        db.fermer()
+
+        chronologiques = sorted(courses, key=lambda c: c['date_course'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = analyse_ecart_position_generique(chronologiques, 2, 1)
+            combinees = analyse_ecart_positions_combinees(chronologiques, 2, [0, 1])
+            self.assertIsNone(analyse_ecart_position_generique(chronologiques, 9, 0))
+        self.assertEqual((stats['total_apparitions'], stats['ecart_initial'], stats['ecart_actuel'], stats['ecart_max']),
+                         (2, 0, 1, 1))
+        self.assertEqual(stats['ecarts'], {0: 1, 1: 2})
+        self.assertEqual([a['depuis_derniere'] for a in combinees['apparitions']], [None, 0, 0])
+        self.assertEqual(combinees['ecart_moyen_interne'], 0)
+
+    def test_corpus(self):
+        # Un CourseFrame donne les mêmes écarts que la liste de dictionnaires de la base
+        db = Database(":memory:")
+        db.save_courses_bulk([(f"{i}.txt", {
+            'date': f"2025-01-{1 + i % 28:02d}", 'lieu': 'Pau', 'type': 'Plat', 'distance': '1600m', 'partants': [],
+            'arrivée': ' - '.join(str(1 + (i * k) % 9) for k in (1, 2, 5)),
+            # Un non-partant en première position une fois sur cinq : la course compte pour les rangs suivants
+            'synthese': ' - '.join('NP' if k == 0 and i % 5 == 0 else f"{1 + (i + k) % 7}e" for k in range(i % 6)),
+        }) for i in range(40)])
+        courses, corpus = db.get_courses(), CourseFrame.depuis_base(db)
+        for analyse in (calculer_ecarts_numeros, calculer_ecarts_numeros_arrivee, calculer_ecarts_couples_arrivee,
+                        calculer_ecarts_triples_arrivee, calculer_ecarts_numeros_arrivee_avec_participation,
+                        calculer_ecarts_premiers_synthese, calculer_ecarts_deuxiemes_synthese,
+                        calculer_ecarts_troisiemes_synthese):
+            self.assertEqual(analyse(corpus), analyse(courses))
+        self.assertEqual(calculer_ecarts_combinaisons(corpus, 3), calculer_ecarts_combinaisons(courses, 3))
+        db.fermer()
+
+    def test_etat_incremental(self):
+        def course(i, jour):
+            return f"{i}.txt", {
+                'date': f"2025-02-{jour:02d}", 'lieu': 'Pau', 'type': 'Plat' if i % 3 else 'Attelé', 'distance': '1600m',
+                'partants': [], 'arrivée': ' - '.join(str(1 + (i * k) % 9) for k in (1, 2, 5)),
+                # Un non-partant en deuxième position une fois sur quatre, en première une fois sur cinq :
+                # les rangs suivants sont conservés et la course compte pour eux
+                'synthese': ' - '.join('NP' if (k == 1 and i % 4 == 0) or (k == 0 and i % 5 == 0) else f"{1 + (i + k) % 7}e"
+                                       for k in range(i % 6)),
+            }
+
+        def champs(ecarts, noms=('derniere_occurrence', 'ecart_actuel', 'ecart_max')):
+            return {cle: {nom: valeurs[nom] for nom in noms} for cle, valeurs in ecarts.items()}
+
+        def verifier(etat, corpus, courses):
+            self.assertEqual(champs(etat.ecarts('arrivee')), calculer_ecarts_numeros_arrivee(corpus))
+            self.assertEqual(champs(etat.ecarts('arrivee', 3)), calculer_ecarts_triples_arrivee(corpus))
+            self.assertEqual(champs(etat.ecarts('synthese')), calculer_ecarts_numeros(corpus))
+            self.assertEqual(champs(etat.ecarts('synthese', 2, ecart_initial=True)),
+                             champs(calculer_ecarts_combinaisons(corpus, 2)))
+            # Positions de la synthèse : comparées à la liste de dictionnaires de la base, pas au CourseFrame
+            noms = ('derniere_occurrence', 'ecart_actuel', 'ecart_max', 'total_occurrences', 'frequence')
+            for rang, analyse in ((1, calculer_ecarts_premiers_synthese), (2, calculer_ecarts_deuxiemes_synthese),
+                                  (3, calculer_ecarts_troisiemes_synthese)):
+                self.assertEqual(champs(etat.ecarts('synthese', rang=rang), noms), champs(analyse(courses), noms))
+
+        db = Database(":memory:")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.save_courses_bulk([course(i, 1 + i % 20) for i in range(40)])
+            etat = db.etat_ecarts()
+            verifier(etat, CourseFrame.depuis_base(db), db.get_courses())
+            # Courses suivantes : le même état est complété, course par course
+            for i in range(40, 45):
+                db.save_course(*course(i, 25))
+            self.assertIs(db.etat_ecarts(), etat)
+            corpus = CourseFrame.depuis_base(db)
+            verifier(etat, corpus, db.get_courses())
+            # Dates des trois dernières occurrences, au lieu de toutes
+            self.assertEqual({num: valeurs['occurrences'] for num, valeurs in etat.ecarts('synthese', rang=1).items()},
+                             {num: valeurs['occurrences'][-3:] for num, valeurs in calculer_ecarts_premiers_synthese(corpus).items()})
+            # Relu en base (sans les états en mémoire), avec les histogrammes des écarts
+            db.vider_cache()
+            relu = db.etat_ecarts()
+            self.assertIsNot(relu, etat)
+            self.assertEqual(relu.ecarts('arrivee', 2), etat.ecarts('arrivee', 2))
+            ecarts, combinaisons = _ecarts_combinaisons(corpus, 'arrivee', 2)
+            self.assertEqual(db.histogramme_ecarts(combinaisons[3]), ecarts.histogramme(3))
+            self.assertEqual(db.histogramme_ecarts(42), {})
+            # Une course antérieure rend l'état périmé : il est recalculé
+            db.save_course(*course(45, 1))
+            recalcule = db.etat_ecarts()
+            self.assertIsNot(recalcule, relu)
+            verifier(recalcule, CourseFrame.depuis_base(db), db.get_courses())
+            verifier(db.etat_ecarts('Attelé'), CourseFrame.depuis_base(db, 'Attelé'), db.get_courses(type_course='Attelé'))
+        self.assertEqual(EtatEcarts.depuis_corpus(CourseFrame.depuis_base(db, 'Trot')).nombre_courses, 0)
+        db.fermer()
+
+if __name__ == "__main__":
+    unittest.main()
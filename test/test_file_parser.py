@@ -6,7 +6,18 @@ import os
 # Ajouter le chemin du projet au PYTHONPATH
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from file_parser.file_parser import parse_file  # Import correct
+import codecs
+import tempfile
+from pathlib import Path
+from unittest import mock
+from file_parser import parse_file, parse_contenu, detect_encoding  # Import correct
+from file_parser import resoudre_encodage, CacheEncodages
+
+# Ancienne extraction, conservée dans le benchmark du parser comme référence
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+from bench_file_parser import ancienne_extraction
+
+DOSSIER_NOTES = Path(__file__).resolve().parent.parent / "dist" / "notes"
 
 class TestFileParser(unittest.TestCase):
     def test_parse_file_valid(self):
@@ -26,5 +37,56 @@ class TestFileParser(unittest.TestCase):
         result = parse_file(file_path)
         self.assertIsNone(result)
 
+    def test_parse_contenu_identique_a_l_ancien_parser(self):
+        # Le parser en une passe doit produire le même dictionnaire que l'ancienne extraction
+        for note in sorted(DOSSIER_NOTES.glob('*.txt')):
+            with open(note, 'r', encoding=detect_encoding(note), errors='replace') as f:
+                content = f.read()
+            result = parse_contenu(content, note.name)
+            classement = result.pop('classement')
+            self.assertEqual(result, ancienne_extraction(content, note.name), note.name)
+            self.assertEqual({ligne['numero'] for ligne in classement}, set(result['partants']))
+
+    def test_parse_file_classement(self):
+        result = parse_file(DOSSIER_NOTES / "01-02-25.txt")
+        self.assertEqual(result['arrivée'], "3 - 14 - 9 - 12 - 15")
+        self.assertEqual(result['classement'][0], {'rang': 1, 'numero': 16, 'nom': 'Murciano', 'gains': 5358})
+        self.assertEqual(result['classement'][14], {'rang': 15, 'numero': 9, 'nom': 'Rêve de Vallarsa', 'gains': 384})
+        self.assertEqual(len(result['classement']), 16)
+
+    def test_parse_contenu_arrivee_sur_la_ligne_d_entete(self):
+        content = "01/02/2025\nPau / 1ère course\nPlat\n1er 4 Abc 12\nArrivée du Tiercé/Quarté+/Quinté+ 4 - 2\n1 - 3\nFin"
+        self.assertEqual(parse_contenu(content)['arrivée'], ancienne_extraction(content)['arrivée'])
+
+    def test_resoudre_encodage_sans_chardet(self):
+        texte = "Arrivée du Tiercé/Quarté+/Quinté+"
+        with mock.patch('file_parser.chardet.detect') as detect:
+            self.assertEqual(resoudre_encodage(texte.encode('utf-8')), 'utf-8')
+            self.assertEqual(resoudre_encodage(texte.encode('cp1252')), 'cp1252')
+            self.assertEqual(resoudre_encodage(codecs.BOM_UTF8 + texte.encode('utf-8')), 'utf-8-sig')
+            # Un "é" coupé en fin d'extrait ne doit pas faire échouer le décodage strict
+            self.assertEqual(resoudre_encodage(texte.encode('utf-8')[:6], complet=False), 'utf-8')
+            detect.assert_not_called()
+
+    def test_cache_encodages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            note = Path(tmp) / "note.txt"
+            note.write_bytes((DOSSIER_NOTES / "01-02-25.txt").read_text(encoding='utf-8').encode('cp1252'))
+            cache = CacheEncodages(Path(tmp) / "encodages.json")
+            self.assertEqual(parse_file(note, cache)['lieu'], parse_file(DOSSIER_NOTES / "01-02-25.txt")['lieu'])
+            self.assertEqual(cache.obtenir(note), 'cp1252')
+            cache.sauvegarder()
+
+            # Le cache relu évite toute détection tant que le fichier n'a pas changé
+            cache = CacheEncodages(Path(tmp) / "encodages.json")
+            with mock.patch('file_parser.resoudre_encodage') as resoudre:
+                self.assertEqual(detect_encoding(note, cache), 'cp1252')
+                resoudre.assert_not_called()
+
+            # Un fichier modifié (taille ou mtime) est de nouveau analysé
+            note.write_text("01/02/2025\n", encoding='utf-8')
+            self.assertIsNone(cache.obtenir(note))
+            self.assertEqual(detect_encoding(note, cache), 'utf-8')
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock
+from database import Database
+import gestionnaire_courses
+from gestionnaire_courses import GestionnaireCourses
+
+DOSSIER_NOTES = Path(__file__).resolve().parent.parent / "dist" / "notes"
+
+class TestGestionnaireCourses(unittest.TestCase):
+    def setUp(self):
+        # Copie d'une partie des notes dans un dossier temporaire
+        self.tmp = tempfile.mkdtemp()
+        self.dossier = Path(self.tmp) / "notes"
+        self.dossier.mkdir()
+        for note in sorted(DOSSIER_NOTES.glob('*.txt'))[:20]:
+            shutil.copy(note, self.dossier / note.name)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _lignes_courses(self, db_path):
+        with sqlite3.connect(db_path) as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT id, date_course, lieu, type_course, distance, arrivee, synthese, partants, nom_fichier FROM courses ORDER BY id')
+            return cur.fetchall()
+
+    def test_traitement_parallele_identique_au_sequentiel(self):
+        db_seq = os.path.join(self.tmp, "sequentiel.db")
+        db_par = os.path.join(self.tmp, "parallele.db")
+        GestionnaireCourses(str(self.dossier), Database(db_seq)).traiter_fichiers()
+        GestionnaireCourses(str(self.dossier), Database(db_par)).traiter_fichiers(processus=2, taille_lot=7)
+
+        lignes_seq = self._lignes_courses(db_seq)
+        self.assertEqual(len(lignes_seq), 20)
+        self.assertEqual(lignes_seq, self._lignes_courses(db_par))
+
+    def test_rescan_incremental(self):
+        db_path = os.path.join(self.tmp, "courses.db")
+        gestionnaire = GestionnaireCourses(str(self.dossier), Database(db_path))
+        gestionnaire.traiter_fichiers()
+        self.assertEqual(gestionnaire.scanner_nouveaux_fichiers(), [])
+        # Cache des encodages à côté de la base : le dossier des notes ne contient que les notes
+        self.assertTrue(os.path.exists(db_path + gestionnaire_courses.SUFFIXE_CACHE_ENCODAGES))
+        self.assertEqual(sorted(os.listdir(self.dossier)), sorted(note.name for note in self.dossier.glob('*.txt')))
+
+        notes = sorted(self.dossier.glob('*.txt'))
+        # Note modifiée : nouvelle arrivée ; note seulement touchée ; copie à l'identique sous un autre nom
+        modifiee = notes[0]
+        contenu = modifiee.read_text(encoding='utf-8')
+        arrivee = gestionnaire_courses.parse_file_encodage(modifiee)[0]['arrivée']
+        modifiee.write_text(contenu.replace(arrivee, "1 - 2 - 3 - 4 - 5"), encoding='utf-8')
+        os.utime(notes[1], ns=(0, notes[1].stat().st_mtime_ns + 10**9))
+        copie = self.dossier / (notes[2].stem + "b.txt")
+        shutil.copy(notes[2], copie)
+
+        with mock.patch('gestionnaire_courses.parse_file_encodage', wraps=gestionnaire_courses.parse_file_encodage) as parse:
+            self.assertEqual(gestionnaire.scanner_nouveaux_fichiers(), [modifiee.name])
+            gestionnaire.traiter_fichiers()
+            self.assertEqual([appel.args[0].name for appel in parse.call_args_list], [modifiee.name])
+
+        with sqlite3.connect(db_path) as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT arrivee FROM courses WHERE nom_fichier = ?', (modifiee.name,))
+            self.assertEqual(cur.fetchall(), [("1 - 2 - 3 - 4 - 5",)])
+            cur.execute('SELECT COUNT(*) FROM courses')
+            self.assertEqual(cur.fetchone()[0], 20)
+            cur.execute('SELECT statut_traitement FROM fichiers_traites WHERE nom_fichier = ?', (copie.name,))
+            self.assertEqual(cur.fetchone()[0], "doublon")
+            cur.execute('SELECT doublon_de FROM manifeste_ingestion WHERE nom_fichier = ?', (copie.name,))
+            self.assertEqual(cur.fetchone()[0], notes[2].name)
+        conn.close()
+        self.assertEqual(gestionnaire.scanner_nouveaux_fichiers(), [])
+
+    def test_fichiers_anterieurs_au_manifeste(self):
+        db_path = os.path.join(self.tmp, "courses.db")
+        gestionnaire = GestionnaireCourses(str(self.dossier), Database(db_path))
+        gestionnaire.traiter_fichiers()
+        # Base ingérée avant l'introduction du manifeste, puis une note modifiée
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('DELETE FROM manifeste_ingestion')
+        conn.close()
+        modifiee = sorted(self.dossier.glob('*.txt'))[0]
+        arrivee = gestionnaire_courses.parse_file_encodage(modifiee)[0]['arrivée']
+        modifiee.write_text(modifiee.read_text(encoding='utf-8').replace(arrivee, "1 - 2 - 3 - 4 - 5"), encoding='utf-8')
+        avant = self._lignes_courses(db_path)
+
+        # Le scan n'écrit rien ; seule la note modifiée depuis sa course est à traiter
+        self.assertEqual(gestionnaire.scanner_nouveaux_fichiers(), [modifiee.name])
+        self.assertEqual(gestionnaire.db.get_manifeste(), {})
+        gestionnaire.traiter_fichiers()
+        self.assertEqual(len(gestionnaire.db.get_manifeste()), 20)
+        apres = self._lignes_courses(db_path)
+        self.assertEqual([ligne for ligne in apres if ligne[-1] != modifiee.name],
+                         [ligne for ligne in avant if ligne[-1] != modifiee.name])
+        self.assertEqual([ligne[5] for ligne in apres if ligne[-1] == modifiee.name], ["1 - 2 - 3 - 4 - 5"])
+        self.assertEqual(gestionnaire.scanner_nouveaux_fichiers(), [])
+
+    def test_archives(self):
+        notes = sorted(DOSSIER_NOTES.glob('*.txt'))[20:30]
+        with zipfile.ZipFile(self.dossier / "janvier.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+            for note in notes[:5]:
+                archive.write(note, f"janvier/{note.name}")
+            # Copie d'une note déjà présente dans le dossier : doublon
+            archive.write(sorted(self.dossier.glob('*.txt'))[0], "janvier/copie.txt")
+        with tarfile.open(self.dossier / "fevrier.tar.gz", "w:gz") as archive:
+            for note in notes[5:]:
+                archive.add(note, note.name)
+
+        db_path = os.path.join(self.tmp, "courses.db")
+        gestionnaire = GestionnaireCourses(str(self.dossier), Database(db_path))
+        gestionnaire.traiter_fichiers()
+        self.assertEqual(gestionnaire.planifier_archives(), [])
+
+        with sqlite3.connect(db_path) as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(*) FROM courses')
+            self.assertEqual(cur.fetchone()[0], 30)
+            cur.execute("SELECT date_course FROM courses WHERE nom_fichier = ?", (f"janvier.zip::janvier/{notes[0].name}",))
+            jour, mois, annee = notes[0].stem.split('-')
+            self.assertEqual(cur.fetchone()[0], f"20{annee}-{mois}-{jour}")
+            cur.execute("SELECT statut_traitement FROM fichiers_traites WHERE nom_fichier = 'janvier.zip::janvier/copie.txt'")
+            self.assertEqual(cur.fetchone()[0], "doublon")
+            cur.execute("SELECT COUNT(*) FROM fichiers_traites WHERE nom_fichier LIKE 'fevrier.tar.gz::%'")
+            self.assertEqual(cur.fetchone()[0], 5)
+        conn.close()
+
+        # Archive complétée : seul le nouveau membre est parsé
+        with zipfile.ZipFile(self.dossier / "janvier.zip", "a") as archive:
+            archive.write(sorted(DOSSIER_NOTES.glob('*.txt'))[30], "janvier/ajout.txt")
+        with mock.patch('gestionnaire_courses.parse_octets', wraps=gestionnaire_courses.parse_octets) as parse:
+            gestionnaire.traiter_fichiers()
+            self.assertEqual([appel.args[1] for appel in parse.call_args_list], ["janvier.zip::janvier/ajout.txt"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from database import Database
+from gestionnaire_courses import GestionnaireCourses
+from ingestion_continue import IngestionContinue
+
+DOSSIER_NOTES = Path(__file__).resolve().parent.parent / "dist" / "notes"
+
+class TestIngestionContinue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.dossier = Path(self.tmp) / "notes"
+        self.dossier.mkdir()
+        self.notes = sorted(DOSSIER_NOTES.glob('*.txt'))[:14]
+        for note in self.notes[:10]:
+            shutil.copy(note, self.dossier / note.name)
+        self.db_path = os.path.join(self.tmp, "courses.db")
+        self.db = Database(self.db_path)
+        self.versions = []
+        self.db.abonner_version_donnees(self.versions.append)
+        self.ingestion = IngestionContinue(GestionnaireCourses(str(self.dossier), self.db),
+                                           intervalle=0.05, taille_file=4, taille_lot=3, delai_lot=0.05)
+
+    def tearDown(self):
+        self.ingestion.arreter(5)
+        shutil.rmtree(self.tmp)
+
+    def _attendre_courses(self, nombre, delai=10):
+        fin = time.monotonic() + delai
+        while time.monotonic() < fin:
+            with sqlite3.connect(self.db_path) as conn:
+                total = conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0]
+            conn.close()
+            if total >= nombre:
+                return total
+            time.sleep(0.05)
+        return total
+
+    def test_ingestion_continue(self):
+        self.ingestion.demarrer()
+        self.assertEqual(self._attendre_courses(10), 10)
+        # File bornée à 4 et lots de 3 : plusieurs lots, un signal par lot écrit
+        self.assertGreaterEqual(self.ingestion.lots_ecrits, 4)
+        self.assertEqual(self.versions, list(range(1, len(self.versions) + 1)))
+
+        # Une note déposée pendant l'exécution est prise en compte, une seule fois
+        for note in self.notes[10:12]:
+            shutil.copy(note, self.dossier / note.name)
+        self.assertEqual(self._attendre_courses(12), 12)
+
+        # Une archive déposée est lue sans extraction puis inscrite au manifeste
+        with tarfile.open(self.dossier / "archive.tar.gz", "w:gz") as archive:
+            for note in self.notes[12:]:
+                archive.add(note, note.name)
+        self.assertEqual(self._attendre_courses(14), 14)
+        self.ingestion.arreter(5)
+        self.assertEqual(self.ingestion.gestionnaire.planifier_archives(), [])
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM courses').fetchone()[0], 14)
+        conn.close()
+
+if __name__ == "__main__":
+    unittest.main()